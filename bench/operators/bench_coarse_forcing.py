@@ -0,0 +1,138 @@
+"""Benchmark of the copies between coarse and large arrays in spectral space
+===========================================================================
+
+These copies (``put_coarse_array_in_array_fft`` and
+``coarse_seq_from_fft_loc``) are done for each computation of the coarse
+forcings (for example ``tcrandom``). The loop implementation (sequential
+version of the previous implementation) is also timed for comparison.
+
+To run::
+
+  python bench_coarse_forcing.py
+  python bench_coarse_forcing.py --nh 256 --nkmax-forcing 16
+  mpirun -np 4 python bench_coarse_forcing.py --nh 256
+
+"""
+
+import argparse
+from copy import deepcopy
+from time import perf_counter
+
+import numpy as np
+
+from fluiddyn.util import mpi
+
+from fluidsim.operators.operators3d import (
+    OperatorsPseudoSpectral3D,
+    _ik_from_ikc,
+)
+
+
+def put_coarse_loops(arr_coarse, arr, shapeK_coarse, shapeK_seq):
+    nkzc, nkyc, nkxc = shapeK_coarse
+    nkz, nky, nkx = shapeK_seq
+    for ikzc in range(nkzc):
+        ikz = _ik_from_ikc(ikzc, nkzc, nkz)
+        for ikyc in range(nkyc):
+            iky = _ik_from_ikc(ikyc, nkyc, nky)
+            for ikxc in range(nkxc):
+                arr[ikz, iky, ikxc] = arr_coarse[ikzc, ikyc, ikxc]
+
+
+def coarse_from_fft_loops(f_fft, shapeK_coarse, shapeK_seq):
+    nkzc, nkyc, nkxc = shapeK_coarse
+    nkz, nky, nkx = shapeK_seq
+    fc_fft = np.empty(shapeK_coarse, np.complex128)
+    for ikzc in range(nkzc):
+        ikz = _ik_from_ikc(ikzc, nkzc, nkz)
+        for ikyc in range(nkyc):
+            iky = _ik_from_ikc(ikyc, nkyc, nky)
+            for ikxc in range(nkxc):
+                fc_fft[ikzc, ikyc, ikxc] = f_fft[ikz, iky, ikxc]
+    return fc_fft
+
+
+def timeit(func, nb_repeat):
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+    t_start = perf_counter()
+    for _ in range(nb_repeat):
+        func()
+    return (perf_counter() - t_start) / nb_repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nh", type=int, default=128)
+    parser.add_argument("--nkmax-forcing", type=int, default=12)
+    parser.add_argument("--nb-vars", type=int, default=3)
+    parser.add_argument("--nb-repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    params = OperatorsPseudoSpectral3D._create_default_params()
+    params.oper.nx = params.oper.ny = params.oper.nz = args.nh
+    oper = OperatorsPseudoSpectral3D(params=params)
+
+    fft_size = 2 * args.nkmax_forcing
+    params_coarse = deepcopy(params)
+    params_coarse.oper.type_fft = "sequential"
+    params_coarse.oper.coef_dealiasing = 1.0
+    params_coarse.oper.nx = params_coarse.oper.ny = fft_size
+    params_coarse.oper.nz = fft_size
+    oper_coarse = OperatorsPseudoSpectral3D(params=params_coarse)
+    shapeK_coarse = oper_coarse.shapeK_loc
+
+    nb_vars = args.nb_vars
+    arr_coarse = np.ones((nb_vars,) + shapeK_coarse, dtype=np.complex128)
+    arr = np.zeros((nb_vars,) + tuple(oper.shapeK_loc), dtype=np.complex128)
+
+    mpi.printby0(
+        f"nh = {args.nh}, coarse shape {shapeK_coarse}, {nb_vars} variables, "
+        f"{mpi.nb_proc} process(es)"
+    )
+
+    # the index maps are computed during the first call
+    duration_init = timeit(
+        lambda: oper._get_maps_coarse(shapeK_coarse), nb_repeat=1
+    )
+    duration_put = timeit(
+        lambda: oper.put_coarse_array_in_array_fft(
+            arr_coarse, arr, oper_coarse, shapeK_coarse
+        ),
+        args.nb_repeat,
+    )
+    duration_gather = timeit(
+        lambda: oper.coarse_seq_from_fft_loc(arr, shapeK_coarse),
+        args.nb_repeat,
+    )
+    mpi.printby0(
+        f"maps (once):    {duration_init:.2e} s\n"
+        f"put (all vars): {duration_put:.2e} s\n"
+        f"gather:         {duration_gather:.2e} s"
+    )
+
+    if mpi.nb_proc > 1:
+        return
+
+    def put_loops():
+        for ivar in range(nb_vars):
+            put_coarse_loops(
+                arr_coarse[ivar], arr[ivar], shapeK_coarse, oper.shapeK_seq
+            )
+
+    def gather_loops():
+        for ivar in range(nb_vars):
+            coarse_from_fft_loops(arr[ivar], shapeK_coarse, oper.shapeK_seq)
+
+    duration_put_loops = timeit(put_loops, args.nb_repeat)
+    duration_gather_loops = timeit(gather_loops, args.nb_repeat)
+    print(
+        f"put loops:      {duration_put_loops:.2e} s "
+        f"(speedup {duration_put_loops / duration_put:.0f})\n"
+        f"gather loops:   {duration_gather_loops:.2e} s "
+        f"(speedup {duration_gather_loops / duration_gather:.0f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark of the batched transforms used in the ns3d tendencies
+==================================================================
+
+``oper.fft_as_arg_stack`` and ``oper.ifft_as_arg_stack`` transform a stack of
+fields. With the sequential pyfftw classes, this is done with one execution
+of a batched FFTW plan. With the other fft classes (in particular the MPI
+ones), the fields are transformed one by one, so that under MPI there is no
+aggregation of the communications (one global transposition per field).
+
+The script times the transforms of 3 fields done one by one and with the
+stack functions, and counts the number of Python calls to the transform
+methods of the operator in one evaluation of ``Simul.tendencies_nonlin`` for
+ns3d and ns3d.strat (9 and 10 calls before the stack functions were used).
+The transforms done in ``oper.div_vb_fft_from_vb`` (ns3d.strat) are not
+counted. These numbers are not numbers of MPI messages: with the MPI
+classes, a call to a stack function leads to one transform per field.
+
+For the sequential pyfftw classes, the batched plans are not much faster than
+the loops. With MPI, the stack functions and the loops are equivalent.
+
+To run::
+
+  python bench_fft_stack.py
+  python bench_fft_stack.py --nh 128
+  mpirun -np 4 python bench_fft_stack.py --nh 128
+
+"""
+
+import argparse
+from importlib import import_module
+from time import perf_counter
+
+import numpy as np
+
+from fluiddyn.util import mpi
+
+from fluidsim.operators.operators3d import OperatorsPseudoSpectral3D
+
+
+def timeit(func, nb_repeat):
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+    t_start = perf_counter()
+    for _ in range(nb_repeat):
+        func()
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+    return (perf_counter() - t_start) / nb_repeat
+
+
+def count_calls_tendencies(solver, nh):
+    """Number of Python calls to the transform methods in ``tendencies_nonlin``
+
+    With the MPI classes, a call to a stack function is counted once but
+    transforms the fields one by one (one global transposition per field).
+
+    """
+    Simul = import_module(f"fluidsim.solvers.{solver}.solver").Simul
+    params = Simul.create_default_params()
+    params.output.HAS_TO_SAVE = False
+    params.output.ONLINE_PLOT_OK = False
+    params.oper.nx = params.oper.ny = params.oper.nz = nh
+    params.init_fields.type = "noise"
+    sim = Simul(params)
+    oper = sim.oper
+
+    nb_calls = 0
+    names = ("fft", "ifft", "fft_as_arg", "ifft_as_arg", "ifft_as_arg_destroy")
+    methods = {name: getattr(oper, name) for name in names}
+
+    def make_counted(method):
+        def counted(*args, **kwargs):
+            nonlocal nb_calls
+            nb_calls += 1
+            return method(*args, **kwargs)
+
+        return counted
+
+    for name, method in methods.items():
+        setattr(oper, name, make_counted(method))
+
+    plans = [oper._get_plans_stack(n) for n in (3, 4)]
+    for plan in plans:
+        if plan is None:
+            continue
+        for key in ("fft", "ifft"):
+            plan[key] = make_counted(plan[key])
+
+    state_spect = sim.state.state_spect.copy()
+    sim.tendencies_nonlin(state_spect)
+    duration = timeit(lambda: sim.tendencies_nonlin(state_spect), 5)
+    # the first call is not timed
+    nb_calls_per_eval = nb_calls // 6
+    return nb_calls_per_eval, duration
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nh", type=int, default=64)
+    parser.add_argument("--nb-repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    params = OperatorsPseudoSpectral3D._create_default_params()
+    params.oper.nx = params.oper.ny = params.oper.nz = args.nh
+    oper = OperatorsPseudoSpectral3D(params=params)
+
+    mpi.printby0(
+        f"{args.nh}**3, {mpi.nb_proc} process(es), {oper.type_fft}, "
+        f"batched plans: {oper._get_plans_stack(3) is not None}"
+    )
+
+    fields = np.array([oper.create_arrayX_random() for _ in range(3)])
+    fields_fft = np.empty((3,) + tuple(oper.shapeK_loc), dtype=np.complex128)
+
+    def fft_loop():
+        for field, field_fft in zip(fields, fields_fft):
+            oper.fft_as_arg(field, field_fft)
+
+    def ifft_loop():
+        for field_fft, field in zip(fields_fft, fields):
+            oper.ifft_as_arg(field_fft, field)
+
+    for name, func in (
+        ("fft loop", fft_loop),
+        ("fft stack", lambda: oper.fft_as_arg_stack(fields, fields_fft)),
+        ("ifft loop", ifft_loop),
+        ("ifft stack", lambda: oper.ifft_as_arg_stack(fields_fft, fields)),
+    ):
+        func()
+        duration = timeit(func, args.nb_repeat)
+        mpi.printby0(f"{name + ':':14s}{duration:.2e} s")
+
+    for solver in ("ns3d", "ns3d.strat"):
+        nb_calls, duration = count_calls_tendencies(solver, args.nh)
+        mpi.printby0(
+            f"{solver + ' tendencies:':24s}{nb_calls} calls to transform methods, "
+            f"{duration:.2e} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
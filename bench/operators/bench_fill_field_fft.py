@@ -0,0 +1,120 @@
+"""Benchmark of the modification of the resolution in spectral space
+=====================================================================
+
+:class:`fluidsim.base.init_fields.FillFieldFFTDistributed` is used by
+``InitFieldsFromSimul`` and ``modif_resolution_from_dir_memory_efficient``.
+The loop implementation (previous implementation of ``fill_field_fft_3d``)
+is also timed for comparison (only in sequential and for small grids).
+
+To run::
+
+  python bench_fill_field_fft.py
+  python bench_fill_field_fft.py --nh 128 --coef 1.5
+  mpirun -np 4 python bench_fill_field_fft.py --nh 256
+
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from fluiddyn.util import mpi
+
+from fluidsim.base.init_fields import FillFieldFFTDistributed
+from fluidsim.operators.operators3d import OperatorsPseudoSpectral3D
+
+
+def fill_field_fft_3d_loops(field_fft_in, field_fft_out, oper_in, oper_out):
+    [nk0, nk1, nk2] = field_fft_out.shape
+    [nk0_in, nk1_in, nk2_in] = field_fft_in.shape
+
+    nk0_min = min(nk0, nk0_in)
+    nk1_min = min(nk1, nk1_in)
+    nk2_min = min(nk2, nk2_in)
+
+    for ik0 in range(nk0_min):
+        for ik1 in range(nk1_min):
+            for ik2 in range(nk2_min):
+                kx_adim, ky_adim, kz_adim = oper_in.kadim_from_ik012rank(
+                    ik0, ik1, ik2
+                )
+                oper_out.set_value_spect(
+                    field_fft_out,
+                    field_fft_in[ik0, ik1, ik2],
+                    kx_adim,
+                    ky_adim,
+                    kz_adim,
+                )
+
+
+def create_oper(nh):
+    params = OperatorsPseudoSpectral3D._create_default_params()
+    params.oper.nx = params.oper.ny = params.oper.nz = nh
+    return OperatorsPseudoSpectral3D(params=params)
+
+
+def timeit(func, nb_repeat):
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+    t_start = perf_counter()
+    for _ in range(nb_repeat):
+        func()
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+    return (perf_counter() - t_start) / nb_repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nh", type=int, default=64)
+    parser.add_argument("--coef", type=float, default=2.0)
+    parser.add_argument("--nb-repeat", type=int, default=10)
+    parser.add_argument("--nh-max-loops", type=int, default=32)
+    args = parser.parse_args()
+
+    nh_out = int(round(args.nh * args.coef))
+    oper_in = create_oper(args.nh)
+    oper_out = create_oper(nh_out)
+
+    field_fft_in = oper_in.create_arrayK_random()
+    field_fft_out = oper_out.create_arrayK(value=0.0)
+
+    nb_modes = int(np.prod(oper_in.shapeK_seq))
+    mpi.printby0(
+        f"{args.nh}**3 -> {nh_out}**3 ({nb_modes:.2e} input modes), "
+        f"{mpi.nb_proc} process(es)"
+    )
+
+    fill = None
+
+    def init():
+        nonlocal fill
+        fill = FillFieldFFTDistributed(oper_in, oper_out)
+
+    duration_init = timeit(init, nb_repeat=1)
+    duration = timeit(lambda: fill(field_fft_in, field_fft_out), args.nb_repeat)
+    mpi.printby0(
+        f"init (once):   {duration_init:.2e} s\n"
+        f"fill:          {duration:.2e} s ({nb_modes / duration:.2e} modes/s)"
+    )
+
+    if mpi.nb_proc > 1 or args.nh > args.nh_max_loops:
+        return
+
+    field_fft_loops = oper_out.create_arrayK(value=0.0)
+    duration_loops = timeit(
+        lambda: fill_field_fft_3d_loops(
+            field_fft_in, field_fft_loops, oper_in, oper_out
+        ),
+        nb_repeat=1,
+    )
+    print(
+        f"loops:         {duration_loops:.2e} s "
+        f"({nb_modes / duration_loops:.2e} modes/s, "
+        f"speedup {duration_loops / duration:.0f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark of the saving of time series in hdf5 files by specific outputs
+==========================================================================
+
+Compare the number of saves per second of the default path (the file is
+opened and all datasets are resized at each save) with the buffered writer
+(``params.output.buffer_size_hdf5 > 0``).
+
+To run::
+
+  python bench_buffered_hdf5.py
+  python bench_buffered_hdf5.py --nb-saves 2000 --buffer-size 64
+
+"""
+
+import argparse
+from time import perf_counter
+
+from fluidsim.solvers.ns2d.solver import Simul
+
+
+def create_sim(nh, buffer_size):
+    params = Simul.create_default_params()
+    params.short_name_type_run = f"bench_hdf5_buffer{buffer_size}"
+    params.output.sub_directory = "bench"
+    params.oper.nx = params.oper.ny = nh
+    params.init_fields.type = "noise"
+    params.output.buffer_size_hdf5 = buffer_size
+    params.output.periods_save.spectra = 1.0
+    params.output.periods_print.print_stdout = 0
+    return Simul(params)
+
+
+def bench(nh, buffer_size, nb_saves):
+    sim = create_sim(nh, buffer_size)
+    spectra = sim.output.spectra
+    dict_spectra1D, dict_spectra2D = spectra.compute()
+
+    t_start = perf_counter()
+    for _ in range(nb_saves):
+        sim.time_stepping.t += 1.0
+        spectra._add_dict_arrays_to_file(spectra.path_file1D, dict_spectra1D)
+        spectra._add_dict_arrays_to_file(spectra.path_file2D, dict_spectra2D)
+    spectra._close_hdf5_writers()
+    duration = perf_counter() - t_start
+    return nb_saves / duration
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nh", type=int, default=128)
+    parser.add_argument("--nb-saves", type=int, default=500)
+    parser.add_argument("--buffer-size", type=int, default=32)
+    args = parser.parse_args()
+
+    for buffer_size in (0, args.buffer_size):
+        saves_per_sec = bench(args.nh, buffer_size, args.nb_saves)
+        print(
+            f"buffer_size_hdf5 = {buffer_size:4d}: {saves_per_sec:9.1f} saves/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark of the Crank-Nicolson time stepping of the finite-difference solvers
+================================================================================
+
+Compare one time step of ``TimeSteppingFiniteDiffCrankNicolson`` (LU
+factorization of the implicit operator computed once per time step ``dt``,
+solution written in place in ``state_phys``) with the previous implementation
+(matrix ``identity - dt/2*L`` built and factorized by ``spsolve`` at each
+time step, solution deep-copied in ``state_phys``), for the solver ad1d and
+different grid sizes.
+
+To run::
+
+  python bench_crank_nicolson.py
+  python bench_crank_nicolson.py --nxs 1000 100000
+
+"""
+
+import argparse
+from copy import deepcopy
+from time import perf_counter
+
+import numpy as np
+import scipy.sparse as sparse
+
+from fluidsim.solvers.ad1d.solver import Simul
+
+
+def time_step_old(time_stepping):
+    """Previous implementation of ``_time_step_RK2``"""
+    dt = time_stepping.deltat
+    sim = time_stepping.sim
+    identity = sparse.identity(sim.state.state_phys.size)
+    tendenciesNL_0 = sim.tendencies_nonlin()
+    rhs_A1dt = time_stepping.right_hand_side(
+        sim.state.state_phys, tendenciesNL_0, dt
+    )
+    A_A1dt = identity - dt / 2 * time_stepping.L
+    sim.state.state_phys = deepcopy(
+        time_stepping.invert_to_get_solution(A_A1dt, rhs_A1dt)
+    )
+
+
+def timeit(func, nb_repeat):
+    func()
+    t_start = perf_counter()
+    for _ in range(nb_repeat):
+        func()
+    return (perf_counter() - t_start) / nb_repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--nxs", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--nb-repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for nx in args.nxs:
+        params = Simul.create_default_params()
+        params.output.HAS_TO_SAVE = False
+        params.oper.nx = nx
+        params.oper.Lx = 1.0
+        params.nu_2 = 0.01
+        params.init_fields.type = "gaussian"
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 1e-4
+        sim = Simul(params)
+        time_stepping = sim.time_stepping
+
+        state_phys = sim.state.state_phys
+        state_init = state_phys.copy()
+        time_stepping.one_time_step_computation()
+        state_new = state_phys.copy()
+        state_phys[:] = state_init
+        time_step_old(time_stepping)
+        assert np.allclose(sim.state.state_phys, state_new)
+
+        duration_new = timeit(
+            time_stepping.one_time_step_computation, args.nb_repeat
+        )
+        duration_old = timeit(
+            lambda: time_step_old(time_stepping), args.nb_repeat
+        )
+        print(
+            f"nx = {nx:9d}: new {duration_new:.2e} s, old {duration_old:.2e} s, "
+            f"speedup {duration_old / duration_new:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
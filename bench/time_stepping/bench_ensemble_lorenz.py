@@ -0,0 +1,74 @@
+"""Benchmark of an ensemble of Lorenz simulations
+==============================================
+
+Compare the time to advance ``nb_members`` Lorenz simulations (with different
+values of ``rho``) computed as one ensemble (``params.oper.nb_members``) with
+the time to advance them one after the other.
+
+To run::
+
+  python bench_ensemble_lorenz.py
+  python bench_ensemble_lorenz.py --nbs-members 10 1000
+
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from fluidsim.solvers.models0d.lorenz.solver import Simul
+
+
+def create_params(rhos, nb_steps):
+    params = Simul.create_default_params()
+    params.output.HAS_TO_SAVE = False
+    params.output.periods_print.print_stdout = 0
+    params.time_stepping.USE_T_END = False
+    params.time_stepping.it_end = nb_steps
+    params.time_stepping.deltat0 = 0.01
+    params.oper.nb_members = len(rhos)
+    params.rho = rhos
+    return params
+
+
+def run(params):
+    sim = Simul(params)
+    sim.state.state_phys.set_var("X", sim.Xs0 + 1.0)
+    sim.state.state_phys.set_var("Y", sim.Ys0 * np.ones(sim.oper.shapeX_loc))
+    sim.state.state_phys.set_var("Z", sim.Zs0 * np.ones(sim.oper.shapeX_loc))
+    t_start = perf_counter()
+    sim.time_stepping.start()
+    return perf_counter() - t_start, sim
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--nbs-members", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    parser.add_argument("--nb-steps", type=int, default=200)
+    args = parser.parse_args()
+
+    for nb_members in args.nbs_members:
+        rhos = np.linspace(20.0, 30.0, nb_members)
+
+        duration_ensemble, sim = run(create_params(list(rhos), args.nb_steps))
+
+        duration_loop = 0.0
+        for index, rho in enumerate(rhos):
+            duration, sim_member = run(create_params([rho], args.nb_steps))
+            duration_loop += duration
+            assert np.allclose(
+                sim_member.state.state_phys, sim.state.state_phys[:, index]
+            )
+
+        print(
+            f"{nb_members:5d} members: ensemble {duration_ensemble:.2e} s, "
+            f"loop {duration_loop:.2e} s, "
+            f"speedup {duration_loop / duration_ensemble:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark of ensembles of pseudo-spectral simulations
+=====================================================
+
+Compare the time to advance ``nb_members`` simulations (with different
+viscosities) computed as one ensemble
+(:class:`fluidsim.base.solvers.ensemble.SimulEnsemblePseudoSpectral`) with the
+time to advance them one after the other.
+
+To run::
+
+  python bench_ensemble_pseudo_spect.py
+  python bench_ensemble_pseudo_spect.py --solver burgers1d --nbs-members 10 100
+
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from fluidsim import import_simul_class_from_key
+from fluidsim.base.solvers.ensemble import SimulEnsemblePseudoSpectral
+
+
+def create_params(Simul, solver, nu_2, nb_steps, n):
+    params = Simul.create_default_params()
+    params.output.HAS_TO_SAVE = False
+    params.output.periods_print.print_stdout = 0
+    params.time_stepping.USE_T_END = False
+    params.time_stepping.it_end = nb_steps
+    params.time_stepping.USE_CFL = False
+    params.time_stepping.deltat0 = 1e-3
+    params.nu_2 = nu_2
+    if solver == "burgers1d":
+        params.oper.nx = n
+        params.oper.Lx = 1.0
+        params.init_fields.type = "gaussian"
+    else:
+        params.oper.nx = params.oper.ny = n
+        params.init_fields.type = "noise"
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solver", default="ns2d")
+    parser.add_argument("-n", type=int, default=64)
+    parser.add_argument("--nbs-members", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--nb-steps", type=int, default=50)
+    args = parser.parse_args()
+
+    Simul = import_simul_class_from_key(args.solver)
+
+    for nb_members in args.nbs_members:
+        nus = np.linspace(1e-3, 2e-3, nb_members)
+        sims = [
+            Simul(create_params(Simul, args.solver, nu, args.nb_steps, args.n))
+            for nu in nus
+        ]
+        states_init = [sim.state.state_spect.copy() for sim in sims]
+
+        duration_loop = 0.0
+        for sim in sims:
+            t_start = perf_counter()
+            sim.time_stepping.start()
+            duration_loop += perf_counter() - t_start
+        states_loop = [sim.state.state_spect.copy() for sim in sims]
+
+        sims_ensemble = []
+        for nu, state_init in zip(nus, states_init):
+            sim = Simul(
+                create_params(Simul, args.solver, nu, args.nb_steps, args.n)
+            )
+            sim.state.state_spect[:] = state_init
+            sim.state.statephys_from_statespect()
+            sims_ensemble.append(sim)
+        ensemble = SimulEnsemblePseudoSpectral(sims_ensemble)
+        t_start = perf_counter()
+        ensemble.time_stepping.start()
+        duration_ensemble = perf_counter() - t_start
+
+        for sim, state_loop in zip(sims_ensemble, states_loop):
+            assert np.allclose(sim.state.state_spect, state_loop)
+
+        print(
+            f"{args.solver} n = {args.n}, {nb_members:4d} members: "
+            f"ensemble {duration_ensemble:.2e} s, loop {duration_loop:.2e} s, "
+            f"speedup {duration_loop / duration_ensemble:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark of the Smagorinsky model
+===================================
+
+Compare ``SmagorinskyModel.get_forcing`` (preallocated workspace, 6 strain
+components computed in spectral space, batched transforms) with the previous
+implementation (9 gradients, about 30 temporary full-size arrays per call).
+
+The time per call and the peak memory allocated during one call (measured with
+:mod:`tracemalloc`) are printed.
+
+Note that without Pythran, ``oper.grad_fft_from_arr_fft`` (used in the
+previous implementation) is a pure Python loop, so the previous implementation
+is only timed for small resolutions in this case (see ``--nh-max-old``).
+
+To run::
+
+  python bench_smagorinsky.py
+  python bench_smagorinsky.py --nh 128
+
+"""
+
+import argparse
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from fluidsim.base.turb_model import extend_simul_class, SmagorinskyModel
+from fluidsim.operators import operators3d
+from fluidsim.solvers.ns3d.solver import Simul as SimulNotExtended
+
+
+def get_forcing_old(model, vx_fft, vy_fft, vz_fft):
+    """Previous implementation of ``SmagorinskyModel.get_forcing``"""
+    stress_tensor = model.stress_tensor
+    Sxx, Syy, Szz, Syx, Szx, Szy = stress_tensor.compute_stress_tensor(
+        vx_fft, vy_fft, vz_fft
+    )
+    norm = stress_tensor.compute_norm(Sxx, Syy, Szz, Syx, Szx, Szy)
+
+    nu_T_2 = 2 * model.C_nu_T * norm
+
+    oper = model.sim.oper
+    fft = oper.fft
+
+    nuT_2_Sxx_fft = fft(nu_T_2 * Sxx)
+    nuT_2_Syy_fft = fft(nu_T_2 * Syy)
+    nuT_2_Szz_fft = fft(nu_T_2 * Szz)
+    nuT_2_Syx_fft = fft(nu_T_2 * Syx)
+    nuT_2_Szx_fft = fft(nu_T_2 * Szx)
+    nuT_2_Szy_fft = fft(nu_T_2 * Szy)
+
+    Kx = oper.Kx
+    Ky = oper.Ky
+    Kz = oper.Kz
+
+    fx_fft = 2j * (Kx * nuT_2_Sxx_fft + Ky * nuT_2_Syx_fft + Kz * nuT_2_Szx_fft)
+    fy_fft = 2j * (Kx * nuT_2_Syx_fft + Ky * nuT_2_Syy_fft + Kz * nuT_2_Szy_fft)
+    fz_fft = 2j * (Kx * nuT_2_Szx_fft + Ky * nuT_2_Szy_fft + Kz * nuT_2_Szz_fft)
+
+    model.forcing_fft.set_var("vx_fft", fx_fft)
+    model.forcing_fft.set_var("vy_fft", fy_fft)
+    model.forcing_fft.set_var("vz_fft", fz_fft)
+    return model.forcing_fft
+
+
+def measure(func, nb_repeat):
+    # first call (initialization of the workspace and of the plans)
+    func()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t_start = perf_counter()
+    for _ in range(nb_repeat):
+        func()
+    return (perf_counter() - t_start) / nb_repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nh", type=int, default=256)
+    parser.add_argument("--nb-repeat", type=int, default=5)
+    parser.add_argument("--nh-max-old", type=int, default=None)
+    args = parser.parse_args()
+
+    Simul = extend_simul_class(SimulNotExtended, SmagorinskyModel)
+    params = Simul.create_default_params()
+    params.output.HAS_TO_SAVE = False
+    params.oper.nx = params.oper.ny = params.oper.nz = args.nh
+    params.init_fields.type = "noise"
+    params.turb_model.enable = True
+    params.turb_model.type = "smagorinsky"
+    sim = Simul(params)
+
+    model = sim.turb_model._model
+    kwargs = {
+        key: sim.state.state_spect.get_var(key)
+        for key in ("vx_fft", "vy_fft", "vz_fft")
+    }
+    nbytes_field = sim.oper.create_arrayX().nbytes
+
+    print(f"{args.nh}**3 (size of a real field: {nbytes_field / 1e6:.1f} Mo)")
+
+    def print_result(name, duration, peak):
+        print(
+            f"{name:8s}: {duration:.2e} s, peak memory {peak / 1e6:.1f} Mo "
+            f"({peak / nbytes_field:.1f} real fields)"
+        )
+
+    forcing_fft = model.forcing_fft
+    duration, peak = measure(lambda: model.get_forcing(**kwargs), args.nb_repeat)
+    print_result("new", duration, peak)
+    forcing_new = forcing_fft.copy()
+
+    nh_max_old = args.nh_max_old
+    if nh_max_old is None:
+        nh_max_old = 10_000 if operators3d.ts.is_compiled else 32
+    if args.nh > nh_max_old:
+        return
+
+    duration_old, peak = measure(
+        lambda: get_forcing_old(model, **kwargs), args.nb_repeat
+    )
+    print_result("old", duration_old, peak)
+    print(f"speedup: {duration_old / duration:.1f}")
+    assert np.allclose(forcing_fft, forcing_new)
+
+
+if __name__ == "__main__":
+    main()
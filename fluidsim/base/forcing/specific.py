@@ -139,6 +139,8 @@ class SpecificForcingPseudoSpectralCoarse(SpecificForcing):
 
     tag = "pseudo_spectral"
     _key_forced_default = "rot_fft"
+    # if True, the forcing is computed by all processes in their local arrays
+    _is_distributed = False
 
     @staticmethod
     def _check_forcing_shape(shape_forcing, shape):
@@ -201,7 +203,7 @@ class SpecificForcingPseudoSpectralCoarse(SpecificForcing):
 
         self._check_forcing_shape([fft_size], sim.oper.shapeX_seq)
 
-        if mpi.rank == 0:
+        if mpi.rank == 0 or self._is_distributed:
             params_coarse = self._create_params_coarse(fft_size)
 
             self.oper_coarse = sim.oper.__class__(params=params_coarse)
@@ -233,7 +235,7 @@ class SpecificForcingPseudoSpectralCoarse(SpecificForcing):
         else:
             self.shapeK_loc_coarse = None
 
-        if mpi.nb_proc > 1:
+        if mpi.nb_proc > 1 and not self._is_distributed:
             self.shapeK_loc_coarse = mpi.comm.bcast(
                 self.shapeK_loc_coarse, root=0
             )
@@ -469,9 +471,106 @@ class NormalizedForcing(SpecificForcingPseudoSpectralCoarse):
                 'only for params.forcing.normalized.type == "2nd_degree_eq"'
             )
 
+    def _init_distributed(self):
+        """Initialize the computation of the forcing in the local arrays
+
+        The forced modes of the local arrays are the modes of the coarse
+        array (sequential order) for which the forcing is not zero. For the
+        modes with kx = 0, the forcing depends also on the opposite mode so
+        that the forcing corresponds to a real field.
+
+        """
+        params_norm = self.params.forcing.normalized
+        if (
+            params_norm.type != "2nd_degree_eq"
+            or params_norm.constant_rate_of is not None
+        ):
+            raise NotImplementedError(
+                "Distributed forcing is only implemented for "
+                'params.forcing.normalized.type == "2nd_degree_eq" and '
+                "params.forcing.normalized.constant_rate_of is None"
+            )
+
+        shape_coarse = tuple(self.shapeK_loc_coarse)
+        maps = self.oper._get_maps_coarse(shape_coarse)
+        is_forced = np.logical_not(self.COND_NO_F).ravel()
+
+        flat_coarse = maps["flat_coarse"]
+        iks_coarse = np.unravel_index(flat_coarse, shape_coarse)
+        is_kx0 = iks_coarse[-1] == 0
+        flat_opposite = np.ravel_multi_index(
+            tuple((-ik) % n for ik, n in zip(iks_coarse[:-1], shape_coarse))
+            + (iks_coarse[-1],),
+            shape_coarse,
+        )
+        is_opposite_forced = is_kx0 & is_forced[flat_opposite]
+        cond = is_forced[flat_coarse] | is_opposite_forced
+
+        self._flat_coarse_forced = flat_coarse[cond]
+        self._flat_coarse_opposite = flat_opposite[cond]
+        self._is_forced_loc = is_forced[flat_coarse][cond]
+        self._is_opposite_forced_loc = is_opposite_forced[cond]
+        self._is_kx0_loc = is_kx0[cond]
+        self._indices_forced = tuple(
+            indices[cond] for indices in maps["indices_loc"]
+        )
+        # as in sum_wavenumbers (the modes kx > 0 represent also -kx)
+        self._weights_forced = np.where(self._is_kx0_loc, 1.0, 2.0)
+
+        self.fstate = self.sim.state.__class__(self.sim, oper=self.oper)
+        self._arr_forcing = self.oper.create_arrayK(value=0.0)
+
+    def _compute_distributed(self):
+        """Compute the forcing in the local arrays (only one allreduce)"""
+        if isinstance(self.key_forced, (list, tuple)):
+            keys_forced = self.key_forced
+        else:
+            keys_forced = [self.key_forced]
+
+        deltat = self.sim.time_stepping.deltat
+        weights = self._weights_forced
+        forcings = []
+        coefs_ab = np.empty(2 * len(keys_forced))
+        for index, key_forced in enumerate(keys_forced):
+            try:
+                a_fft = self.sim.state.state_spect.get_var(key_forced)
+            except ValueError:
+                a_fft = self.sim.state.get_var(key_forced)
+            a_forced = a_fft[self._indices_forced]
+            fa_forced = self.forcingc_raw_each_time(a_forced)
+            coefs_ab[2 * index] = (
+                deltat / 2 * np.sum(weights * abs(fa_forced) ** 2)
+            )
+            coefs_ab[2 * index + 1] = np.sum(
+                weights * (a_forced.conj() * fa_forced).real
+            )
+            forcings.append(fa_forced)
+
+        if mpi.nb_proc > 1:
+            mpi.comm.Allreduce(mpi.MPI.IN_PLACE, coefs_ab, op=mpi.MPI.SUM)
+
+        arr = self._arr_forcing
+        for index, (key_forced, fa_forced) in enumerate(
+            zip(keys_forced, forcings)
+        ):
+            a, b = coefs_ab[2 * index : 2 * index + 2]
+            arr[self._indices_forced] = (
+                fa_forced
+                * self.coef_normalization_from_abc(a, b, -self.forcing_rate)
+            )
+            self.fstate.init_statespect_from(**{key_forced: arr})
+            if index == 0:
+                self.forcing_fft[:] = self.fstate.state_spect
+            else:
+                self.forcing_fft += self.fstate.state_spect
+
     def compute(self):
         """compute a forcing normalize with a 2nd degree eq."""
 
+        if self._is_distributed:
+            self._compute_distributed()
+            return
+
         if isinstance(self.key_forced, (list, tuple)):
             keys_forced = self.key_forced
         else:
@@ -741,9 +840,32 @@ class RandomSimplePseudoSpectral(NormalizedForcing):
         try:
             params.forcing.random
         except AttributeError:
-            params.forcing._set_child("random", {"only_positive": False})
+            params.forcing._set_child(
+                "random", {"only_positive": False, "distributed": False}
+            )
+            params.forcing.random._set_doc(
+                """
+only_positive: bool (default False)
+
+    If True, the real and imaginary parts of the random forcing are positive.
+
+distributed: bool (default False)
+
+    If True, each process computes the forcing of the modes of its local
+    arrays (no computation in the process 0 and no broadcast). The random
+    numbers are given by a counter-based generator so that the forcing does
+    not depend on the number of processes. The normalization coefficients are
+    computed with one allreduce.
+"""
+            )
 
     def __init__(self, sim):
+        try:
+            self._is_distributed = sim.params.forcing.random.distributed
+        except AttributeError:
+            # loading an old simulation?
+            self._is_distributed = False
+
         super().__init__(sim)
 
         if self.params.forcing.random.only_positive:
@@ -751,6 +873,45 @@ class RandomSimplePseudoSpectral(NormalizedForcing):
         else:
             self._min_val = -1
 
+        if self._is_distributed:
+            self._init_distributed()
+            self._seed = self._draw_seed()
+            self._nb_draws = 0
+
+    def _draw_seed(self):
+        """Draw a seed in process 0 (broadcast if the forcing is distributed)"""
+        seed = np.random.randint(0, 2**31) if mpi.rank == 0 else None
+        if self._is_distributed and mpi.nb_proc > 1:
+            seed = mpi.comm.bcast(seed, root=0)
+        return seed
+
+    def _compute_forcing_raw_loc(self, seed, stream=0):
+        """Random forcing of the forced modes of the local arrays
+
+        The values only depend on ``seed``, ``stream`` and the indices of the
+        modes in the coarse array.
+
+        """
+        min_val = 0 if self._min_val is None else self._min_val
+
+        def random_values(flat_coarse):
+            real = _uniform_counter_based(seed, stream, 2 * flat_coarse)
+            imag = _uniform_counter_based(seed, stream, 2 * flat_coarse + 1)
+            return min_val + (1 - min_val) * (real + 1j * imag)
+
+        f_forced = np.where(
+            self._is_forced_loc, random_values(self._flat_coarse_forced), 0.0
+        )
+        # projection on real fields for kx = 0: (f(k) + f(-k)^*) / 2
+        kx0 = self._is_kx0_loc
+        f_opposite = np.where(
+            self._is_opposite_forced_loc,
+            random_values(self._flat_coarse_opposite),
+            0.0,
+        )
+        f_forced[kx0] = 0.5 * (f_forced[kx0] + f_opposite[kx0].conj())
+        return f_forced
+
     def compute_forcingc_raw(self):
         """Random coarse forcing.
 
@@ -762,6 +923,9 @@ class RandomSimplePseudoSpectral(NormalizedForcing):
         return f_fft
 
     def forcingc_raw_each_time(self, _):
+        if self._is_distributed:
+            self._nb_draws += 1
+            return self._compute_forcing_raw_loc(self._seed, self._nb_draws)
         return self.compute_forcingc_raw()
 
 
@@ -807,11 +971,30 @@ class TimeCorrelatedRandomPseudoSpectral(RandomSimplePseudoSpectral):
                 self._seed1 = np.random.randint(0, 2**31)
                 self._save_state()
 
-            np.random.seed(self._seed0)
-            self.forcing0 = self.compute_forcingc_raw()
-            np.random.seed(self._seed1)
-            self.forcing1 = self.compute_forcingc_raw()
+            if not self._is_distributed:
+                np.random.seed(self._seed0)
+                self.forcing0 = self.compute_forcingc_raw()
+                np.random.seed(self._seed1)
+                self.forcing1 = self.compute_forcingc_raw()
+
+        if self._is_distributed:
+            if mpi.nb_proc > 1:
+                (
+                    self.t_last_change,
+                    self._seed0,
+                    self._seed1,
+                ) = mpi.comm.bcast(
+                    (
+                        getattr(self, "t_last_change", None),
+                        getattr(self, "_seed0", None),
+                        getattr(self, "_seed1", None),
+                    ),
+                    root=0,
+                )
+            self.forcing0 = self._compute_forcing_raw_loc(self._seed0)
+            self.forcing1 = self._compute_forcing_raw_loc(self._seed1)
 
+        if mpi.rank == 0 or self._is_distributed:
             pforcing = self.params.forcing
             try:
                 time_correlation = pforcing[self.tag].time_correlation
@@ -834,16 +1017,20 @@ class TimeCorrelatedRandomPseudoSpectral(RandomSimplePseudoSpectral):
             self.t_last_change = tsim
             self._seed0 = self._seed1
             self.forcing0 = self.forcing1
-            self._seed1 = np.random.randint(0, 2**31)
-            np.random.seed(self._seed1)
-            self.forcing1 = self.compute_forcingc_raw()
+            if self._is_distributed:
+                self._seed1 = self._draw_seed()
+                self.forcing1 = self._compute_forcing_raw_loc(self._seed1)
+            else:
+                self._seed1 = np.random.randint(0, 2**31)
+                np.random.seed(self._seed1)
+                self.forcing1 = self.compute_forcingc_raw()
             self._save_state()
 
         f_fft = self.forcingc_from_f0f1()
         return f_fft
 
     def _save_state(self):
-        if not self.params.output.HAS_TO_SAVE:
+        if not self.params.output.HAS_TO_SAVE or mpi.rank > 0:
             return
 
         with open(self._forcing_state_file_path, "w") as file:
@@ -866,3 +1053,27 @@ class TimeCorrelatedRandomPseudoSpectral(RandomSimplePseudoSpectral):
         )
 
         return f_fft
+
+
+def _splitmix64(values):
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _uniform_counter_based(seed, stream, counters):
+    """Uniform random numbers in [0, 1) from a counter-based generator
+
+    The value for one counter only depends on ``seed``, ``stream`` and the
+    counter (SplitMix64 hash), so that the numbers can be computed
+    independently by the different processes.
+
+    """
+    with np.errstate(over="ignore"):
+        key = _splitmix64(
+            np.array([seed], dtype=np.uint64)
+            ^ _splitmix64(np.array([stream], dtype=np.uint64))
+        )
+        bits = _splitmix64(key ^ np.asarray(counters, dtype=np.uint64))
+    return (bits >> np.uint64(11)) * 2.0**-53
@@ -7,6 +7,10 @@ Provides:
    :members:
    :private-members:
 
+.. autoclass:: FillFieldFFTDistributed
+   :members:
+   :private-members:
+
 """
 
 import os
@@ -124,6 +128,7 @@ modif_after_init: bool (default False)
             self.params.init_fields.modif_after_init
         )
         self._specific_init_fields()
+        self.sim.state.invalidate_computed()
 
 
 class SpecificInitFields:
@@ -162,10 +167,7 @@ path: str
 
         if mpi.rank == 0:
             try:
-                if os.path.splitext(path_file)[1] == ".nc":
-                    h5file = h5netcdf.File(path_file, "r")
-                else:
-                    h5file = h5py.File(path_file, "r")
+                h5file = self._open_file(path_file)
             except Exception:
                 raise ValueError(
                     "Is file " + path_file + " really a netCDF4/HDF5 file?"
@@ -254,27 +256,6 @@ path: str
                     )
 
             keys_state_phys_file = list(group_state_phys.keys())
-        else:
-            keys_state_phys_file = {}
-        if mpi.nb_proc > 1:
-            keys_state_phys_file = mpi.comm.bcast(keys_state_phys_file)
-        state_phys = self.sim.state.state_phys
-        keys_phys_needed = self.sim.info.solver.classes.State.keys_phys_needed
-        for k in keys_phys_needed:
-            if k in keys_state_phys_file:
-                if mpi.rank == 0:
-                    field_seq = group_state_phys[k][...]
-                else:
-                    field_seq = None
-
-                if mpi.nb_proc > 1:
-                    field_loc = self.sim.oper.scatter_Xspace(field_seq)
-                else:
-                    field_loc = field_seq
-                state_phys.set_var(k, field_loc)
-            else:
-                state_phys.set_var(k, self.sim.oper.create_arrayX(value=0.0))
-        if mpi.rank == 0:
             time = group_state_phys.attrs["time"]
             try:
                 it = group_state_phys.attrs["it"]
@@ -283,19 +264,102 @@ path: str
                 it = 0
             h5file.close()
         else:
+            keys_state_phys_file = {}
             time = 0.0
             it = 0
 
         if mpi.nb_proc > 1:
+            keys_state_phys_file = mpi.comm.bcast(keys_state_phys_file)
             time = mpi.comm.bcast(time)
             it = mpi.comm.bcast(it)
 
+        state_phys = self.sim.state.state_phys
+        keys_phys_needed = self.sim.info.solver.classes.State.keys_phys_needed
+        keys_to_read = [k for k in keys_phys_needed if k in keys_state_phys_file]
+        for k, field_loc in self._iter_fields_loc(path_file, keys_to_read):
+            state_phys.set_var(k, field_loc)
+        for k in keys_phys_needed:
+            if k not in keys_to_read:
+                state_phys.set_var(k, self.sim.oper.create_arrayX(value=0.0))
+
         if hasattr(self.sim.state, "statespect_from_statephys"):
             self.sim.state.statespect_from_statephys()
             self.sim.state.statephys_from_statespect()
         self.sim.time_stepping.t = time
         self.sim.time_stepping.it = it
 
+    def _open_file(self, path_file):
+        if os.path.splitext(path_file)[1] == ".nc":
+            return h5netcdf.File(path_file, "r")
+        return h5py.File(path_file, "r")
+
+    def _iter_fields_loc(self, path_file, keys):
+        """Read the local parts of the fields
+
+        With MPI, each process reads its hyperslab collectively if h5py
+        supports MPI. Otherwise, the process 0 reads the hyperslabs one by one
+        and sends them so that it never holds a whole sequential field.
+
+        """
+        oper = self.sim.oper
+
+        if mpi.nb_proc == 1:
+            with self._open_file(path_file) as h5file:
+                group_state_phys = h5file["/state_phys"]
+                for key in keys:
+                    yield key, group_state_phys[key][...]
+            return
+
+        if h5py.h5.get_config().mpi:
+            slices_loc = _get_slices_loc(
+                oper.seq_indices_first_X, oper.shapeX_loc
+            )
+            with h5py.File(
+                path_file, "r", driver="mpio", comm=mpi.comm
+            ) as h5file:
+                group_state_phys = h5file["/state_phys"]
+                for key in keys:
+                    dset = group_state_phys[key]
+                    with dset.collective:
+                        field_loc = dset[slices_loc]
+                    yield key, field_loc
+            return
+
+        slices_all = [
+            _get_slices_loc(starts, shape)
+            for starts, shape in mpi.comm.allgather(
+                (oper.seq_indices_first_X, oper.shapeX_loc)
+            )
+        ]
+        h5file = self._open_file(path_file) if mpi.rank == 0 else None
+        try:
+            for key in keys:
+                field_loc = oper.create_arrayX()
+                if mpi.rank == 0:
+                    dset = h5file["/state_phys"][key]
+                    for rank, slices in enumerate(slices_all):
+                        if rank == 0:
+                            field_loc[...] = dset[slices]
+                            continue
+                        slab = np.ascontiguousarray(
+                            dset[slices], dtype=field_loc.dtype
+                        )
+                        mpi.comm.Send(slab, dest=rank)
+                        del slab
+                else:
+                    mpi.comm.Recv(field_loc, source=0)
+                yield key, field_loc
+        finally:
+            if h5file is not None:
+                h5file.close()
+
+
+def _get_slices_loc(seq_indices_first, shape_loc):
+    return tuple(
+        slice(start, start + size)
+        for start, size in zip(seq_indices_first, shape_loc)
+    )
+
 
 def fill_field_fft_2d(field_fft_in, field_fft_out):
     [nk0_seq, nk1_seq] = field_fft_out.shape
@@ -314,27 +378,153 @@ def fill_field_fft_2d(field_fft_in, field_fft_out):
             field_fft_out[-ik0, ik1] = field_fft_in[-ik0, ik1]
 
 
+def _indices_fill_field_fft(nk_in, nk_out, is_r2c):
+    """Indices in the output array of the modes of the input array along one
+    dimension (-1 for the modes which are not kept)
+
+    The semantics are the same as for :func:`fill_field_fft_3d` and
+    ``fill_field_fft_2d``.
+
+    """
+    iks = np.arange(nk_in)
+    nk_min = min(nk_in, nk_out)
+    if is_r2c:
+        return np.where(iks < nk_min, iks, -1)
+    indices = np.full(nk_in, -1)
+    positive = iks <= nk_min // 2
+    indices[positive] = iks[positive]
+    negative = (iks >= nk_in - nk_min // 2 + 1) & ~positive
+    indices[negative] = iks[negative] - nk_in + nk_out
+    return indices
+
+
+class FillFieldFFTDistributed:
+    """Fill a spectral array with the modes of an array of another resolution
+
+    The modes are truncated or padded with zeros (same semantics as
+    :func:`fluidsim.util.mini_oper_modif_resol.fill_field_fft_3d`). The input
+    and output arrays can be distributed over the MPI processes (slab or
+    pencil decompositions). The source and destination indices are computed
+    at initialization so that each call only needs one fancy indexing and
+    (with MPI) one ``Alltoallv``. The memory used is proportional to the size
+    of the local arrays.
+
+    """
+
+    def __init__(self, oper_in, oper_out):
+        dimX_K = oper_in._get_dimX_K()
+        if oper_out._get_dimX_K() != dimX_K:
+            raise ValueError("Operators with different layouts in spectral space")
+        ndim = len(dimX_K)
+        dim_r2c = dimX_K.index(ndim - 1)
+        if oper_in._is_distributed_K() != oper_out._is_distributed_K():
+            raise ValueError("Sequential and distributed operators")
+        nb_proc = mpi.nb_proc if oper_in._is_distributed_K() else 1
+        self._nb_proc = nb_proc
+
+        # local indices of the kept input modes and sequential indices of
+        # these modes in the output arrays
+        iks_loc_in = []
+        iks_seq_out = []
+        for dim, (start, nk_loc) in enumerate(
+            zip(oper_in.seq_indices_first_K, oper_in.shapeK_loc)
+        ):
+            indices = _indices_fill_field_fft(
+                oper_in.shapeK_seq[dim], oper_out.shapeK_seq[dim], dim == dim_r2c
+            )[start : start + nk_loc]
+            kept = np.nonzero(indices >= 0)[0]
+            iks_loc_in.append(kept)
+            iks_seq_out.append(indices[kept])
+
+        # decomposition of the output arrays (a tensor product of intervals)
+        box = (tuple(oper_out.seq_indices_first_K), tuple(oper_out.shapeK_loc))
+        if nb_proc > 1:
+            boxes = mpi.comm.allgather(box)
+        else:
+            boxes = [box]
+        ranks = [rank for rank, box in enumerate(boxes) if np.prod(box[1]) > 0]
+
+        starts_dims = []
+        sizes_dims = []
+        for dim in range(ndim):
+            intervals = sorted(
+                {(boxes[rank][0][dim], boxes[rank][1][dim]) for rank in ranks}
+            )
+            starts_dims.append(np.array([start for start, _ in intervals]))
+            sizes_dims.append(np.array([size for _, size in intervals]))
+
+        rank_from_intervals = np.full([s.size for s in starts_dims], -1)
+        for rank in ranks:
+            starts = boxes[rank][0]
+            index = tuple(
+                np.searchsorted(starts_dims[dim], starts[dim])
+                for dim in range(ndim)
+            )
+            rank_from_intervals[index] = rank
+
+        # for each kept mode: destination process and local flat index
+        intervals = [
+            np.searchsorted(starts, iks, side="right") - 1
+            for starts, iks in zip(starts_dims, iks_seq_out)
+        ]
+        ranks_dest = rank_from_intervals[np.ix_(*intervals)]
+        indices_dest = 0
+        for dim in range(ndim):
+            interval = intervals[dim]
+            ik_loc = iks_seq_out[dim] - starts_dims[dim][interval]
+            size = sizes_dims[dim][interval]
+            shape = [1] * ndim
+            shape[dim] = -1
+            indices_dest = indices_dest * size.reshape(shape) + ik_loc.reshape(
+                shape
+            )
+        indices_src = np.ravel_multi_index(
+            np.ix_(*iks_loc_in), tuple(oper_in.shapeK_loc)
+        )
+        indices_src, indices_dest = np.broadcast_arrays(indices_src, indices_dest)
+
+        ranks_dest = ranks_dest.ravel()
+        order = np.argsort(ranks_dest, kind="stable")
+        self._indices_send = indices_src.ravel()[order]
+        indices_dest = indices_dest.ravel()[order]
+
+        if nb_proc == 1:
+            self._indices_recv = indices_dest
+            return
+
+        self._counts_send = np.bincount(ranks_dest, minlength=nb_proc)
+        self._counts_recv = np.empty_like(self._counts_send)
+        mpi.comm.Alltoall(self._counts_send, self._counts_recv)
+        self._displs_send = np.r_[0, np.cumsum(self._counts_send)[:-1]]
+        self._displs_recv = np.r_[0, np.cumsum(self._counts_recv)[:-1]]
+
+        self._indices_recv = np.empty(self._counts_recv.sum(), dtype=np.int64)
+        self._alltoallv(indices_dest.astype(np.int64), self._indices_recv)
+
+    def _alltoallv(self, sendbuf, recvbuf):
+        mpi.comm.Alltoallv(
+            [sendbuf, (self._counts_send, self._displs_send)],
+            [recvbuf, (self._counts_recv, self._displs_recv)],
+        )
+
+    def __call__(self, field_fft_in, field_fft_out):
+        """Fill ``field_fft_out`` (the other modes are not modified)"""
+        values = field_fft_in.ravel()[self._indices_send]
+        if self._nb_proc > 1:
+            values_recv = np.empty(self._indices_recv.size, dtype=values.dtype)
+            self._alltoallv(values, values_recv)
+            values = values_recv
+        field_fft_out.reshape(-1)[self._indices_recv] = values
+
+
 def fill_field_fft_3d(field_fft_in, field_fft_out, oper_in, oper_out):
-    [nk0, nk1, nk2] = field_fft_out.shape
-    [nk0_in, nk1_in, nk2_in] = field_fft_in.shape
+    """Fill field_fft_out with the modes of field_fft_in
 
-    nk0_min = min(nk0, nk0_in)
-    nk1_min = min(nk1, nk1_in)
-    nk2_min = min(nk2, nk2_in)
+    To fill many arrays, it is more efficient to create only one
+    :class:`FillFieldFFTDistributed` object.
 
-    for ik0 in range(nk0_min):
-        for ik1 in range(nk1_min):
-            for ik2 in range(nk2_min):
-                kx_adim, ky_adim, kz_adim = oper_in.kadim_from_ik012rank(
-                    ik0, ik1, ik2
-                )
-                oper_out.set_value_spect(
-                    field_fft_out,
-                    field_fft_in[ik0, ik1, ik2],
-                    kx_adim,
-                    ky_adim,
-                    kz_adim,
-                )
+    """
+    FillFieldFFTDistributed(oper_in, oper_out)(field_fft_in, field_fft_out)
 
 
 class InitFieldsFromSimul(SpecificInitFields):
@@ -351,6 +541,12 @@ class InitFieldsFromSimul(SpecificInitFields):
         ):
             return deepcopy(sim_in.state.state_spect)
 
+        if mpi.nb_proc > 1:
+            raise NotImplementedError(
+                "THIS METHOD WON'T BE IMPLEMENTED IN MPI (2d). "
+                "The resolution has to be modified in sequential."
+            )
+
         # modify resolution
         state_spect = SetOfVariables(like=sim.state.state_spect, value=0.0)
         keys_state_spect = sim_in.info.solver.classes.State["keys_state_spect"]
@@ -376,10 +572,11 @@ class InitFieldsFromSimul(SpecificInitFields):
         # modify resolution
         state_spect = SetOfVariables(like=sim.state.state_spect, value=0.0)
         keys_state_spect = sim_in.info.solver.classes.State["keys_state_spect"]
+        fill_field_fft = FillFieldFFTDistributed(oper_in, sim.oper)
         for index_key in range(len(keys_state_spect)):
             field_fft_in = sim_in.state.state_spect[index_key]
             field_fft_new_res = state_spect[index_key]
-            fill_field_fft_3d(field_fft_in, field_fft_new_res, oper_in, sim.oper)
+            fill_field_fft(field_fft_in, field_fft_new_res)
 
         return state_spect
 
@@ -388,12 +585,6 @@ class InitFieldsFromSimul(SpecificInitFields):
         # We have to write something more general.
         # It should be done directly in the operators.
 
-        if mpi.nb_proc > 1:
-            raise NotImplementedError(
-                "THIS METHOD WON'T BE IMPLEMENTED IN MPI. "
-                "The resolution has to be modified in sequential."
-            )
-
         sim = self.sim
         sim.time_stepping.t = sim_in.time_stepping.t
 
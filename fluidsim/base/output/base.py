@@ -20,6 +20,10 @@ Provides:
    :members:
    :private-members:
    :noindex:
+
+.. autoclass:: BufferedHDF5Writer
+   :members:
+   :private-members:
 """
 
 import datetime
@@ -91,6 +95,7 @@ class OutputBase(OutputCore):
             "period_refresh_plots": 1,
             "HAS_TO_SAVE": True,
             "sub_directory": "",
+            "buffer_size_hdf5": 0,
         }
         p_output = params._set_child("output", attribs=attribs)
 
@@ -114,6 +119,14 @@ HAS_TO_SAVE: bool (default: True)
 sub_directory: str (default: "")
 
     A name of a subdirectory where the directory of the simulation is saved.
+
+buffer_size_hdf5: int (default: 0)
+
+    If larger than 0, the specific outputs saving time series in hdf5 files
+    keep their files open and buffer ``buffer_size_hdf5`` times in memory
+    before writing them in one go (see :class:`BufferedHDF5Writer`). The
+    buffers are flushed when the files are closed and when a stop signal is
+    received. If 0, the files are opened and resized at each save.
 """
         )
 
@@ -342,14 +355,34 @@ are called.
                 ax = fig.subplots()
             return fig, ax
 
+    def _get_specific_outputs(self):
+        return [
+            obj
+            for obj in list(self.__dict__.values())
+            if isinstance(obj, SpecificOutput)
+        ]
+
+    def flush_files(self):
+        """Write to disk the data buffered by the specific outputs"""
+        if not self._has_to_save:
+            return
+        # called by all processes since some outputs (probes) write on all
+        # processes and can flush with collective communications
+        for spec_output in self._get_specific_outputs():
+            spec_output._flush_hdf5_writers()
+
     def close_files(self):
-        if mpi.rank == 0 and self._has_to_save:
+        if not self._has_to_save:
+            return
+        if mpi.rank == 0:
             self.print_stdout.close()
             for k in self.params.periods_save._get_key_attribs():
                 period = self.params.periods_save.__dict__[k]
                 if period != 0:
                     if hasattr(self.__dict__[k], "_close_file"):
                         self.__dict__[k]._close_file()
+        for spec_output in self._get_specific_outputs():
+            spec_output._close_hdf5_writers()
 
     def end_of_simul(self, total_time):
         # self.path_run: str
@@ -359,6 +392,7 @@ are called.
             self.one_time_step()
             if self.sim.output.phys_fields.t_last_save < self.sim.time_stepping.t:
                 self.phys_fields.save()
+            self.phys_fields.wait_background_saves()
 
         path_run = Path(self.path_run)
         self.print_stdout(
@@ -394,12 +428,11 @@ are called.
                 print(f"move result directory in directory:\n{new_path_run}")
 
             self.path_run = str(new_path_run)
-            for spec_output in list(self.__dict__.values()):
-                if isinstance(spec_output, SpecificOutput):
-                    try:
-                        spec_output._init_path_files()
-                    except AttributeError:
-                        pass
+            for spec_output in self._get_specific_outputs():
+                try:
+                    spec_output._init_path_files()
+                except AttributeError:
+                    pass
 
             if mpi.nb_proc > 1:
                 mpi.comm.barrier()
@@ -521,6 +554,65 @@ class OutputBasePseudoSpectral(OutputBase):
         return self.sum_wavenumbers(energy_fft)
 
 
+class BufferedHDF5Writer:
+    """Append time series to a hdf5 file kept open, by blocks of times
+
+    The rows (one per saved time) are accumulated in memory and written with
+    only one resize per dataset when ``buffer_size`` rows are buffered or when
+    :meth:`flush` is called. The datasets created by
+    :meth:`SpecificOutput._create_file_from_dict_arrays` are chunked with the
+    same number of rows so that each flush writes whole chunks.
+
+    """
+
+    def __init__(self, path_file, buffer_size):
+        self.path_file = path_file
+        self.buffer_size = buffer_size
+        self._file = None
+        self._times = []
+        self._rows = {}
+
+    def append(self, time, dict_arrays):
+        """Buffer the values at one time and flush if the buffer is full"""
+        self._times.append(time)
+        for key, value in dict_arrays.items():
+            self._rows.setdefault(key, []).append(value)
+        if len(self._times) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows to the file"""
+        nb_new = len(self._times)
+        if nb_new == 0:
+            return
+
+        if self._file is None:
+            self._file = open_patient(self.path_file, "r+")
+        file = self._file
+
+        dset_times = file["times"]
+        nb_saved_times = dset_times.shape[0]
+        nb_times = nb_saved_times + nb_new
+        dset_times.resize((nb_times,))
+        dset_times[nb_saved_times:] = self._times
+
+        for key, rows in self._rows.items():
+            dset = file[key]
+            dset.resize((nb_times,) + dset.shape[1:])
+            dset[nb_saved_times:] = np.array(rows)
+
+        file.flush()
+        self._times = []
+        self._rows = {}
+
+    def close(self):
+        """Flush the buffers and close the file"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 class SpecificOutput:
     """Small class for features useful for specific outputs"""
 
@@ -557,6 +649,13 @@ class SpecificOutput:
         self.period_show = params.output.period_refresh_plots
         self.t_last_show = 0.0
 
+        try:
+            self._buffer_size_hdf5 = params.output.buffer_size_hdf5
+        except AttributeError:
+            # loading an old simulation?
+            self._buffer_size_hdf5 = 0
+        self._hdf5_writers = {}
+
         self._init_path_files()
 
         if hasattr(self, "_cls_movies"):
@@ -624,8 +723,20 @@ class SpecificOutput:
 
                 self.sim.info._save_as_hdf5(hdf5_parent=file)
 
+                if self._buffer_size_hdf5 > 0:
+                    nb_rows_chunk = self._buffer_size_hdf5
+                else:
+                    nb_rows_chunk = None
+
+                def get_chunks(shape):
+                    if nb_rows_chunk is None:
+                        return True
+                    return (nb_rows_chunk,) + shape
+
                 times = np.array([self.sim.time_stepping.t], dtype=np.float64)
-                file.create_dataset("times", data=times, maxshape=(None,))
+                file.create_dataset(
+                    "times", data=times, maxshape=(None,), chunks=get_chunks(())
+                )
 
                 for k, v in list(arrays_1st_time.items()):
                     file.create_dataset(k, data=v)
@@ -634,12 +745,17 @@ class SpecificOutput:
                     if isinstance(v, numbers.Number):
                         arr = np.array([v], dtype=v.__class__)
                         arr.resize((1,))
-                        file.create_dataset(k, data=arr, maxshape=(None,))
+                        file.create_dataset(
+                            k, data=arr, maxshape=(None,), chunks=get_chunks(())
+                        )
                     else:
                         arr = np.array(v)
                         arr.resize((1,) + v.shape)
                         file.create_dataset(
-                            k, data=arr, maxshape=((None,) + v.shape)
+                            k,
+                            data=arr,
+                            maxshape=((None,) + v.shape),
+                            chunks=get_chunks(v.shape),
                         )
 
     def _add_dict_arrays_to_file(self, path_file, dict_matrix):
@@ -647,6 +763,11 @@ class SpecificOutput:
             raise ValueError("can not add dict arrays in nonexisting file!")
 
         elif mpi.rank == 0:
+            if self._buffer_size_hdf5 > 0:
+                writer = self._get_hdf5_writer(path_file)
+                writer.append(self.sim.time_stepping.t, dict_matrix)
+                return
+
             with open_patient(path_file, "r+") as file:
                 dset_times = file["times"]
                 nb_saved_times = dset_times.shape[0]
@@ -662,6 +783,24 @@ class SpecificOutput:
                         dset_k.resize((nb_saved_times + 1,) + v.shape)
                         dset_k[nb_saved_times] = v
 
+    def _get_hdf5_writer(self, path_file):
+        try:
+            return self._hdf5_writers[path_file]
+        except KeyError:
+            writer = self._hdf5_writers[path_file] = BufferedHDF5Writer(
+                path_file, self._buffer_size_hdf5
+            )
+            return writer
+
+    def _flush_hdf5_writers(self):
+        for writer in self._hdf5_writers.values():
+            writer.flush()
+
+    def _close_hdf5_writers(self):
+        for writer in self._hdf5_writers.values():
+            writer.close()
+        self._hdf5_writers.clear()
+
     def _add_dict_arrays_to_open_file(self, file, dict_arrays, nb_saved_times):
         if mpi.rank == 0:
             dset_times = file["times"]
@@ -62,6 +62,9 @@ class HorizontalMeans(SpecificOutput, SimulExtender):
     _tag = "horiz_means"
     _module_name = "fluidsim.base.output.horiz_means"
     _name_file = _tag + ".h5"
+    _keys_velocities = ("vx", "vy", "vz")
+    # <vxp vxp>, <vyp vyp>, <vzp vzp>, <vyp vxp>, <vzp vxp>, <vzp vyp>
+    _indices_products = ((0, 0), (1, 1), (2, 2), (1, 0), (2, 0), (2, 1))
 
     @classmethod
     def get_modif_info_solver(cls):
@@ -89,41 +92,32 @@ class HorizontalMeans(SpecificOutput, SimulExtender):
     def complete_params_with_default(cls, params):
         params.output.periods_save._set_attrib(cls._tag, 0)
 
-    def _compute_hmean(self, arr3d):
-        if mpi.nb_proc == 1:
-            return np.mean(arr3d, axis=(1, 2))
-
-        # here (MPI case) it gets a bit more complicated!
-        sum_local = np.sum(arr3d, axis=(1, 2))
-        if mpi.rank == 0:
-            sum_global = np.zeros(self.nz)
-
-        # MPI messages and summation
-        for rank in range(mpi.nb_proc):
-            if mpi.rank == 0:
-                nz_loc = self.nzs_local[rank]
-
-            if rank == 0 and mpi.rank == 0:
-                data = sum_local
-            else:
-                if mpi.rank == 0:
-                    data = np.empty(nz_loc)
-                    mpi.comm.Recv(data, source=rank, tag=42 * rank)
-                elif mpi.rank == rank:
-                    mpi.comm.Send(sum_local, dest=0, tag=42 * rank)
+    def _reduce_profiles(self, sums_local, to_all=False):
+        """Horizontal means from the local sums (one collective communication)
 
-            if mpi.rank == 0:
-                iz_start = self.izs_start[rank]
-                sum_global[iz_start : iz_start + nz_loc] += data
+        ``sums_local`` has the shape ``(nb_profiles, nz_local)``. The local
+        sums of all profiles are put in one z-indexed buffer, which is summed
+        over the processes with ``Allreduce`` (``to_all=True``) or with
+        ``Reduce`` (the result is then only returned by the process 0).
 
-        if mpi.rank == 0:
-            return sum_global / self.nh
+        """
+        if mpi.nb_proc == 1:
+            return sums_local / self.nh
+
+        sums = np.zeros((sums_local.shape[0], self.nz))
+        sums[:, self.iz_start : self.iz_start + self.nz_local] = sums_local
+        if to_all:
+            mpi.comm.Allreduce(mpi.MPI.IN_PLACE, sums, op=mpi.MPI.SUM)
+        elif mpi.rank == 0:
+            mpi.comm.Reduce(mpi.MPI.IN_PLACE, sums, op=mpi.MPI.SUM, root=0)
+        else:
+            mpi.comm.Reduce(sums, None, op=mpi.MPI.SUM, root=0)
+            return
+        return sums / self.nh
 
     def _hmean_to_3d_local(self, profile):
-        if mpi.nb_proc != 1:
-            profile = mpi.comm.bcast(profile, root=0)
-            profile = profile[self.iz_start : self.iz_start + self.nz_local]
-
+        """Broadcast to the local 3d shape a profile known by all processes"""
+        profile = profile[self.iz_start : self.iz_start + self.nz_local]
         return np.broadcast_to(
             profile[:, np.newaxis, np.newaxis], self.shapeX_loc
         )
@@ -134,23 +128,12 @@ class HorizontalMeans(SpecificOutput, SimulExtender):
         params = sim.params
 
         self.shapeX_loc = sim.oper.shapeX_loc
+        self.nz_local = self.shapeX_loc[0]
 
         if mpi.nb_proc > 1:
             self.iz_start, _, _ = sim.oper.oper_fft.get_seq_indices_first_X()
-            self.izs_start = mpi.comm.gather(self.iz_start, root=0)
-
-            nh_local = self.shapeX_loc[1] * self.shapeX_loc[2]
-            self.nhs_local = mpi.comm.gather(nh_local, root=0)
-
-            self.nz_local = self.shapeX_loc[0]
-            self.nzs_local = mpi.comm.gather(self.nz_local, root=0)
-
-            if mpi.rank == 0:
-                assert len(self.izs_start) == mpi.nb_proc
-                assert len(self.nhs_local) == mpi.nb_proc
-                assert len(self.nzs_local) == mpi.nb_proc
-
-                print(self.izs_start, self.nhs_local, self.nzs_local)
+        else:
+            self.iz_start = 0
 
         self.nz = params.oper.nz
         self.nh = params.oper.nx * params.oper.ny
@@ -164,36 +147,35 @@ class HorizontalMeans(SpecificOutput, SimulExtender):
         )
 
     def compute(self):
-        data = {}
         get_var = self.sim.state.state_phys.get_var
-        vx = get_var("vx")
-        vy = get_var("vy")
-        vz = get_var("vz")
-
-        def _extend_data_with_hmean(arr3d, name: str):
-            result = data[name] = self._compute_hmean(arr3d)
-            return result
-
-        vx_mean = _extend_data_with_hmean(vx, "vx")
-        vy_mean = _extend_data_with_hmean(vy, "vy")
-        vz_mean = _extend_data_with_hmean(vz, "vz")
-
-        vx_mean3d = self._hmean_to_3d_local(vx_mean)
-        vy_mean3d = self._hmean_to_3d_local(vy_mean)
-        vz_mean3d = self._hmean_to_3d_local(vz_mean)
-
-        vxp = vx - vx_mean3d
-        vyp = vy - vy_mean3d
-        vzp = vz - vz_mean3d
-
-        _extend_data_with_hmean(vxp**2, "vxp_vxp")
-        _extend_data_with_hmean(vyp**2, "vyp_vyp")
-        _extend_data_with_hmean(vzp**2, "vzp_vzp")
+        velocities = [get_var(key) for key in self._keys_velocities]
+
+        sums_local = np.empty((3, self.nz_local))
+        for index, velocity in enumerate(velocities):
+            velocity.sum(axis=(1, 2), out=sums_local[index])
+        means = self._reduce_profiles(sums_local, to_all=True)
+
+        fluctuations = [
+            velocity - self._hmean_to_3d_local(mean)
+            for velocity, mean in zip(velocities, means)
+        ]
+
+        # the products are summed without 3d temporary arrays
+        sums_local = np.empty((len(self._indices_products), self.nz_local))
+        for index, (index0, index1) in enumerate(self._indices_products):
+            sums_local[index] = np.einsum(
+                "ijk,ijk->i", fluctuations[index0], fluctuations[index1]
+            )
+        moments = self._reduce_profiles(sums_local)
 
-        _extend_data_with_hmean(vyp * vxp, "vyp_vxp")
-        _extend_data_with_hmean(vzp * vxp, "vzp_vxp")
-        _extend_data_with_hmean(vzp * vyp, "vzp_vyp")
+        if mpi.rank > 0:
+            return {}
 
+        data = dict(zip(self._keys_velocities, means))
+        for (index0, index1), moment in zip(self._indices_products, moments):
+            key0 = self._keys_velocities[index0]
+            key1 = self._keys_velocities[index1]
+            data[f"{key0}p_{key1}p"] = moment
         return data
 
     def load(self, tmin=None, tmax=None, verbose=False):
@@ -27,7 +27,13 @@ from fluiddyn.util import mpi
 
 from fluidsim_core.output.phys_fields import SetOfPhysFieldFilesBase
 
-from fluidsim.util.output import save_file, h5pack, ext
+from fluidsim.util.output import (
+    save_file,
+    h5pack,
+    ext,
+    BackgroundSaver,
+    get_index_state_phys,
+)
 
 from .base import SpecificOutput
 
@@ -41,7 +47,36 @@ class PhysFieldsBase(SpecificOutput):
     def _complete_params_with_default(params):
         tag = "phys_fields"
         params.output._set_child(
-            tag, attribs={"field_to_plot": "ux", "file_with_it": False}
+            tag,
+            attribs={
+                "field_to_plot": "ux",
+                "file_with_it": False,
+                "save_in_background": False,
+                "nb_buffers_background": 2,
+            },
+        )
+        params.output[tag]._set_doc(
+            """
+field_to_plot: str (default: "ux")
+
+    Key of the field plotted by default.
+
+file_with_it: bool (default: False)
+
+    If True, the index of the time step is included in the file names.
+
+save_in_background: bool (default: False)
+
+    If True, the fields are copied (gathered with MPI) in a buffer and the files
+    are written by a thread while the time stepping continues. The pending
+    saves are completed at the end of the simulation.
+
+nb_buffers_background: int (default: 2)
+
+    Maximum number of states held in memory while waiting to be written (only
+    used if save_in_background is True). When all buffers are used, the
+    saves block until one of them is released.
+"""
         )
 
         params.output.periods_save._set_attrib(tag, 0)
@@ -55,6 +90,9 @@ class PhysFieldsBase(SpecificOutput):
         if hasattr(self, "_init_skip_quiver"):
             self._init_skip_quiver()
 
+        self._background_saver = None
+        self._str_width = None
+
         self.key_vec_xaxis = "ux"
         self.key_vec_yaxis = "uy"
         self._equation = None
@@ -137,23 +175,30 @@ class PhysFieldsBase(SpecificOutput):
 
         path_run = Path(self.output.path_run)
 
-        if params.time_stepping.USE_T_END:
+        if self._str_width is not None and params is self.params:
+            str_width = self._str_width
+        elif params.time_stepping.USE_T_END:
             # check if some state_phys files already exist
-            try:
-                path_test = next(path_run.glob("state_phys*"))
-            except StopIteration:
+            str_width = None
+            if mpi.rank == 0 and path_run.exists():
+                index = get_index_state_phys(path_run)
+                if index:
+                    # file does exist : get str_width from file name
+                    # file name is something like 'state_phys_tYYYY.YYY.nc'
+                    str_width = len(index[0]["name"][12:-3])
+            if mpi.nb_proc > 1:
+                str_width = mpi.comm.bcast(str_width, root=0)
+            if str_width is None:
                 # file does not exist : get str_width from t_end
                 # max number of digits = int(log10(t_end)) + 1
                 # add .3f precision = 4 additional characters
                 # +2 by anticipation of potential restarts
                 str_width = int(np.log10(params.time_stepping.t_end)) + 7
-            else:
-                # file does exist : get str_width from file name
-                # file name is something like 'state_phys_tYYYY.YYY.nc'
-                str_width = len(path_test.name[12:-3])
         else:
             # dynamic width not implemented if USE_T_END==False
             str_width = 7
+        if params is self.params:
+            self._str_width = str_width
 
         if mpi.rank == 0:
             path_run.mkdir(exist_ok=True)
@@ -167,9 +212,14 @@ class PhysFieldsBase(SpecificOutput):
 
         path_file = path_run / name_save
 
+        background_saver = self._get_background_saver(params)
+
         does_path_exist = None
+        it_pending = None
         if mpi.rank == 0:
-            does_path_exist = path_file.exists()
+            if background_saver is not None:
+                it_pending = background_saver.get_pending_it(path_file)
+            does_path_exist = it_pending is not None or path_file.exists()
         if mpi.nb_proc > 1:
             does_path_exist = mpi.comm.bcast(does_path_exist, root=0)
 
@@ -177,8 +227,11 @@ class PhysFieldsBase(SpecificOutput):
             # do not save if the file corresponds to the same it
             it_file = None
             if mpi.rank == 0:
-                with h5pack.File(str(path_file), "r") as file:
-                    it_file = file["state_phys"].attrs["it"]
+                if it_pending is not None:
+                    it_file = it_pending
+                else:
+                    with h5pack.File(str(path_file), "r") as file:
+                        it_file = file["state_phys"].attrs["it"]
             if mpi.nb_proc > 1:
                 it_file = mpi.comm.bcast(it_file, root=0)
             if it_file == self.sim.time_stepping.it:
@@ -189,7 +242,12 @@ class PhysFieldsBase(SpecificOutput):
             path_file = path_run / name_save
         self.output.print_stdout("save state_phys in file " + name_save)
 
-        save_file(
+        if background_saver is not None:
+            save = background_saver.save
+        else:
+            save = save_file
+
+        save(
             path_file,
             state_phys,
             self.sim.info,
@@ -200,6 +258,26 @@ class PhysFieldsBase(SpecificOutput):
             particular_attr,
         )
 
+    def _get_background_saver(self, params):
+        try:
+            params_phys_fields = params.output.phys_fields
+            save_in_background = params_phys_fields.save_in_background
+        except AttributeError:
+            # loading an old simulation?
+            return None
+        if not save_in_background:
+            return None
+        if self._background_saver is None:
+            self._background_saver = BackgroundSaver(
+                params_phys_fields.nb_buffers_background
+            )
+        return self._background_saver
+
+    def wait_background_saves(self):
+        """Wait until the files saved in background are written"""
+        if self._background_saver is not None:
+            self._background_saver.close()
+
     def get_field_to_plot(
         self,
         key=None,
@@ -343,6 +421,16 @@ class SetOfPhysFieldFiles(SetOfPhysFieldFilesBase):
 
     time_from_path = staticmethod(time_from_path)
 
+    def update_times(self):
+        """Initialize the times from the index of the state_phys files"""
+        entries = get_index_state_phys(self.path_dir)
+
+        if hasattr(self, "path_files") and len(self.path_files) == len(entries):
+            return
+
+        self.path_files = [self.path_dir / entry["name"] for entry in entries]
+        self.times = np.array([entry["time"] for entry in entries])
+
     def _get_field_to_plot_from_file(
         self, path_file, key, equation, skip_vars=()
     ):
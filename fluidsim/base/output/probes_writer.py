@@ -0,0 +1,391 @@
+"""Buffered writer of probes
+==========================
+
+Provides:
+
+.. autoclass:: ProbesWriter
+   :members:
+   :private-members:
+
+.. autofunction:: consolidate_probes_files
+
+.. autofunction:: get_time_last_saved
+
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from fluiddyn.util import mpi
+from fluidsim.util import open_patient
+
+# maximum number of values in one hdf5 chunk of the probes datasets
+NB_VALUES_CHUNK = 2**16
+
+
+def get_time_last_saved(paths, default=None):
+    """Get the last time saved in probes files (sorted by times)
+
+    A file can contain no time if the simulation was stopped before the first
+    flush of the buffer: the previous files are then used. ``default`` is
+    returned if no file contains times.
+
+    """
+    for path in reversed(paths):
+        with open_patient(path, "r") as file:
+            times = file["times"]
+            if times.shape[0] > 0:
+                return times[-1]
+    return default
+
+
+def get_comm_aggregate(aggregate):
+    """Get the communicator of the processes writing in the same files
+
+    Returns None if there is no aggregation.
+
+    """
+    if aggregate is None:
+        return None
+    if aggregate not in ("node", "all"):
+        raise ValueError(
+            f"aggregate should be None, 'node' or 'all' (not {aggregate!r})"
+        )
+    if mpi.nb_proc == 1:
+        return None
+    if aggregate == "all":
+        return mpi.comm
+    return mpi.comm.Split_type(mpi.MPI.COMM_TYPE_SHARED, key=mpi.rank)
+
+
+class ProbesWriter:
+    """Buffer the values of the probes and write them by blocks of times
+
+    The values at ``buffer_size`` times are accumulated in a time-major buffer
+    of shape ``(len(keys), buffer_size, nb_probes_loc)`` and written with only
+    one opening of the file and one resize per dataset. The datasets (of shape
+    ``(nb_probes, nb_times)``) are chunked with ``buffer_size`` times so that
+    each block is written in whole chunks and the time series of one probe
+    (needed for its temporal FFT) are read from few chunks.
+
+    With ``aggregate="node"`` (processes sharing the memory of a node) or
+    ``aggregate="all"`` (all processes), the data of a group of processes are
+    gathered (one ``Gatherv`` per block) on the first process of the group
+    (the leader), which is the only one to write a file. The probes of the
+    file are then the concatenation of the probes of the processes of the
+    group, in the order of their ranks.
+
+    """
+
+    def __init__(self, keys, dtype, nb_probes_loc, buffer_size=0, aggregate=None):
+        self.keys = list(keys)
+        self.dtype = dtype
+        self.nb_probes_loc = nb_probes_loc
+        self.buffer_size = max(1, buffer_size)
+        self.path_file = None
+
+        self.comm = get_comm_aggregate(aggregate)
+        if self.comm is None:
+            self.is_leader = True
+            self.rank_leader = mpi.rank
+            self._nbs_probes = [nb_probes_loc]
+        else:
+            self.is_leader = self.comm.rank == 0
+            self.rank_leader = self.comm.bcast(mpi.rank)
+            self._nbs_probes = self.comm.allgather(nb_probes_loc)
+        # number of probes in the files written by the group
+        self.nb_probes = sum(self._nbs_probes)
+
+        self._buffer = np.empty(
+            (len(self.keys), self.buffer_size, nb_probes_loc), dtype=dtype
+        )
+        self._times = np.empty(self.buffer_size)
+        self._nb_times_buffered = 0
+
+    def bcast(self, obj):
+        """Broadcast an object from the leader to the group"""
+        if self.comm is None:
+            return obj
+        return self.comm.bcast(obj)
+
+    def get_state_files(self, paths):
+        """Get the state of the last file of the group (read by the leader)
+
+        Returns None if there is no file for the group, and otherwise the tuple
+        ``(path_file, index_file, nb_times, time_last, same_layout)``
+        (``time_last`` is None if no file of the group contains times).
+        ``same_layout`` is False if the file was written with another number of
+        processes or by a group with other numbers of probes per process (for
+        example with ``aggregate="node"`` and another distribution of the
+        processes on the nodes), i.e. if the probes are in another order.
+
+        """
+        state = None
+        if self.is_leader:
+            paths = [p for p in paths if p.name.startswith(f"rank{mpi.rank:05}")]
+            if paths:
+                path_file = paths[-1]
+                with open_patient(path_file, "r") as file:
+                    times = file["times"]
+                    same_layout = bool(file.attrs["nb_proc"] == mpi.nb_proc)
+                    try:
+                        nbs_probes = file.attrs["nbs_probes_group"]
+                    except KeyError:
+                        # file written by an older version of fluidsim
+                        pass
+                    else:
+                        same_layout = same_layout and (
+                            nbs_probes.tolist() == self._nbs_probes
+                        )
+                    state = (
+                        path_file,
+                        file.attrs["index_file"],
+                        times.size,
+                        get_time_last_saved(paths),
+                        same_layout,
+                    )
+        return self.bcast(state)
+
+    def gather_probes(self, arr):
+        """Gather a 1d array (one value per local probe) on the leader
+
+        Returns None on the other processes.
+
+        """
+        arr = np.ascontiguousarray(arr)
+        if self.comm is None:
+            return arr
+        return self._gather(arr, self._nbs_probes)
+
+    def _gather(self, arr, counts):
+        if self.is_leader:
+            result = np.empty(sum(counts), dtype=arr.dtype)
+            self.comm.Gatherv(arr, [result, counts])
+            return result
+        self.comm.Gatherv(arr, None)
+        return None
+
+    def create_datasets(self, file):
+        """Create the (empty) datasets of the times and of the probes
+
+        The numbers of probes of the processes of the group are saved in the
+        attribute ``nbs_probes_group`` (compared at restart).
+
+        """
+        file.attrs["nbs_probes_group"] = self._nbs_probes
+        nb_probes_chunk = max(
+            1, min(self.nb_probes, NB_VALUES_CHUNK // self.buffer_size)
+        )
+        file.create_dataset(
+            "times", (0,), maxshape=(None,), chunks=(self.buffer_size,)
+        )
+        for key in self.keys:
+            file.create_dataset(
+                key,
+                (self.nb_probes, 0),
+                maxshape=(self.nb_probes, None),
+                dtype=self.dtype,
+                chunks=(nb_probes_chunk, self.buffer_size),
+            )
+
+    def append(self, time, data):
+        """Buffer the values at one time and flush if the buffer is full"""
+        index = self._nb_times_buffered
+        self._times[index] = time
+        for index_key, key in enumerate(self.keys):
+            self._buffer[index_key, index] = data[key]
+        self._nb_times_buffered += 1
+        if self._nb_times_buffered == self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered values (collective if aggregated)"""
+        nb_times = self._nb_times_buffered
+        if nb_times == 0:
+            return
+        self._nb_times_buffered = 0
+        if self.nb_probes == 0:
+            return
+
+        block = self._buffer[:, :nb_times]
+        if self.comm is not None:
+            counts = [nb_times * len(self.keys) * nb for nb in self._nbs_probes]
+            data = self._gather(np.ascontiguousarray(block), counts)
+            if not self.is_leader:
+                return
+            blocks = np.split(data, np.cumsum(counts)[:-1])
+            block = np.concatenate(
+                [
+                    arr.reshape(len(self.keys), nb_times, nb)
+                    for arr, nb in zip(blocks, self._nbs_probes)
+                ],
+                axis=2,
+            )
+
+        with open_patient(self.path_file, "r+") as file:
+            dset_times = file["times"]
+            nb_saved = dset_times.shape[0]
+            dset_times.resize((nb_saved + nb_times,))
+            dset_times[nb_saved:] = self._times[:nb_times]
+            for index_key, key in enumerate(self.keys):
+                dset = file[key]
+                dset.resize((self.nb_probes, nb_saved + nb_times))
+                dset[:, nb_saved:] = block[index_key].T
+
+
+def consolidate_probes_files(path_dir, names_probes, keys, file_max_size=None):
+    """Merge the probes files of all processes in decomposition independent files
+
+    The probes of all processes are concatenated (as in files written with
+    ``aggregate="all"``) in files named ``rank00000_tmin*.h5``, which can be
+    used for a restart with any number of processes. The probes are identified
+    by their global coordinates (datasets ``names_probes``, one value per
+    probe), so the readers do not depend on the order of the probes.
+
+    The data are read by blocks of times: each old file is opened once per new
+    file containing some of its times. The old files are moved in a
+    subdirectory ``per_rank_nb_proc{nb_proc}``.
+
+    Parameters
+    ----------
+
+    path_dir : str or Path
+
+      Directory containing the files ``rank*.h5``.
+
+    names_probes : sequence of str
+
+      Names of the datasets containing one value per probe.
+
+    keys : sequence of str
+
+      Names of the datasets of the time series (shape ``(nb_probes, nb_times)``).
+
+    file_max_size : float, optional
+
+      Maximum size of one new file, in megabytes. By default, there is one new
+      file for each file of the first process.
+
+    Returns
+    -------
+
+    paths_new : list of Path
+
+    """
+    path_dir = Path(path_dir)
+    paths = sorted(path_dir.glob("rank*.h5"))
+    if not paths:
+        return []
+    ranks = sorted({int(path.name[4:9]) for path in paths})
+
+    # times of all files (each file is opened once) and probes of all ranks
+    infos_files = []
+    probes = {name: [] for name in names_probes}
+    nbs_probes = []
+    for rank in ranks:
+        paths_rank = [p for p in paths if p.name.startswith(f"rank{rank:05}")]
+        for index_path, path in enumerate(paths_rank):
+            with open_patient(path, "r") as file:
+                infos_files.append((rank, path, file["times"][:]))
+                if index_path > 0:
+                    continue
+                for name in names_probes:
+                    probes[name].append(file[name][:])
+                nbs_probes.append(file[keys[0]].shape[0])
+    offsets = dict(zip(ranks, np.cumsum([0] + nbs_probes[:-1])))
+    nb_probes = sum(nbs_probes)
+    probes = {name: np.concatenate(arrays) for name, arrays in probes.items()}
+
+    path_first = infos_files[0][1]
+    with open_patient(path_first, "r") as file:
+        attrs = dict(file.attrs)
+        others = {
+            name: file[name][()]
+            for name in file.keys()
+            if name not in names_probes and name not in keys and name != "times"
+        }
+        dtype = file[keys[0]].dtype
+        dtype_times = file["times"].dtype
+    nb_proc = attrs["nb_proc"]
+    width = len(path_first.name[14:-3])
+
+    if file_max_size is None:
+        max_nb_times_file = None
+    else:
+        size_1_time = (len(keys) * nb_probes * dtype.itemsize + 8) * 1e-6
+        max_nb_times_file = max(1, int(file_max_size / size_1_time))
+
+    # times of the new files
+    blocks_times = []
+    for rank, _, times_file in infos_files:
+        if rank != ranks[0]:
+            break
+        step = max(1, max_nb_times_file or times_file.size)
+        for start in range(0, times_file.size, step):
+            blocks_times.append(times_file[start : start + step])
+
+    path_tmp = path_dir / "tmp_consolidation"
+    path_tmp.mkdir(exist_ok=True)
+    paths_tmp = []
+    for index_file, times_block in enumerate(blocks_times):
+        nb_times = times_block.size
+        data = {key: np.zeros((nb_probes, nb_times), dtype) for key in keys}
+        tmin, tmax = times_block[0], times_block[-1]
+        for rank, path, times_file in infos_files:
+            if (
+                times_file.size == 0
+                or times_file[-1] < tmin
+                or times_file[0] > tmax
+            ):
+                continue
+            its_file = np.nonzero(np.isin(times_file, times_block))[0]
+            if its_file.size == 0:
+                continue
+            its_block = np.searchsorted(times_block, times_file[its_file])
+            slice_file = slice(its_file[0], its_file[-1] + 1)
+            its_file -= its_file[0]
+            start = offsets[rank]
+            stop = start + nbs_probes[ranks.index(rank)]
+            with open_patient(path, "r") as file:
+                for key in keys:
+                    values = file[key][:, slice_file]
+                    data[key][start:stop, its_block] = values[:, its_file]
+
+        path_new = path_tmp / f"rank00000_tmin{tmin:0{width}.3f}.h5"
+        with open_patient(path_new, "w") as file:
+            file.attrs.update(attrs)
+            file.attrs["index_file"] = index_file
+            file.attrs["aggregate"] = "all"
+            for name, value in others.items():
+                file.create_dataset(name, data=value)
+            for name, value in probes.items():
+                file.create_dataset(name, data=value)
+            file.create_dataset(
+                "times", data=times_block.astype(dtype_times), maxshape=(None,)
+            )
+            nb_probes_chunk = max(1, min(nb_probes, NB_VALUES_CHUNK // nb_times))
+            for key, value in data.items():
+                file.create_dataset(
+                    key,
+                    data=value,
+                    maxshape=(nb_probes, None),
+                    chunks=(nb_probes_chunk, nb_times),
+                )
+        paths_tmp.append(path_new)
+
+    # the old files are kept in a subdirectory
+    path_old = path_dir / f"per_rank_nb_proc{nb_proc}"
+    index = 0
+    while path_old.exists():
+        index += 1
+        path_old = path_dir / f"per_rank_nb_proc{nb_proc}_{index}"
+    path_old.mkdir()
+    for path in paths:
+        path.rename(path_old / path.name)
+
+    paths_new = []
+    for path in paths_tmp:
+        paths_new.append(path.rename(path_dir / path.name))
+    path_tmp.rmdir()
+    return paths_new
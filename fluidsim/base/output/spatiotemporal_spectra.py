@@ -23,6 +23,10 @@ Provides:
 from pathlib import Path
 from logging import warn
 from math import pi
+from functools import partial
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 from scipy import signal
@@ -33,6 +37,11 @@ from fluidsim.util import ensure_radians
 from fluiddyn.util import mpi
 from fluidsim.util import open_patient
 from fluidsim.base.output.base import SpecificOutput
+from fluidsim.base.output.probes_writer import (
+    ProbesWriter,
+    consolidate_probes_files,
+    get_time_last_saved,
+)
 
 from transonic import boost, Array, Type
 
@@ -96,6 +105,9 @@ def get_arange_minmax(times: A, tmin: Uf32f64, tmax: Uf32f64):
 
     """
 
+    if len(times) == 0:
+        return np.arange(0)
+
     if tmin <= times[0]:
         start = 0
     else:
@@ -109,6 +121,77 @@ def get_arange_minmax(times: A, tmin: Uf32f64, tmax: Uf32f64):
     return np.arange(start, stop)
 
 
+def _load_data_file(path_file, times, tmin, tmax, keys, nb_dim):
+    """Load the useful data of one file of the spatiotemporal spectra
+
+    Returns None if the file does not contain useful data.
+
+    """
+    with open_patient(path_file, "r") as file:
+        # time indices
+        times_file = file["times"][:]
+        if times_file.size == 0 or times_file[-1] < tmin:
+            return None
+        its_file = get_arange_minmax(times_file, tmin, tmax)
+        tmin_keep = times_file[its_file[0]]
+        tmax_keep = times_file[its_file[-1]]
+        its = get_arange_minmax(times, tmin_keep, tmax_keep)
+
+        # k_adim_loc = global probes indices!
+        iks = tuple(file[f"probes_k{i}adim_loc"][:] for i in range(nb_dim))
+
+        # load data at desired times for all keys_fields
+        slice_times = slice(its_file[0], its_file[-1] + 1)
+        data = {key: file[key + "_Fourier_loc"][:, slice_times] for key in keys}
+
+    return iks, its[0], its[-1] + 1, data
+
+
+def _put_data_in_series(series, iks, it_start, it_stop, data):
+    """Scatter the data of one file in a series (array or hdf5 dataset)"""
+    if isinstance(series, np.ndarray):
+        series[iks + (slice(it_start, it_stop),)] = data
+        return
+
+    # h5py does not support multidimensional fancy indexing: the probes are
+    # sorted and written by runs of contiguous indices along the last spatial
+    # axis (the negative wavenumbers are at the end of the axes, so that the
+    # box containing the probes would be nearly the whole series)
+    iks = tuple(ik % n for ik, n in zip(iks, series.shape))
+    order = np.lexsort(iks[::-1])
+    iks = tuple(ik[order] for ik in iks)
+    data = data[order]
+    starts_runs = np.ones(order.size, dtype=bool)
+    for ik in iks[:-1]:
+        starts_runs[1:] &= ik[1:] == ik[:-1]
+    starts_runs[1:] &= iks[-1][1:] == iks[-1][:-1] + 1
+    starts_runs = np.flatnonzero(~starts_runs[1:]) + 1
+    slice_times = slice(it_start, it_stop)
+    for start, stop in zip(
+        np.concatenate(([0], starts_runs)),
+        np.concatenate((starts_runs, [order.size])),
+    ):
+        index = tuple(int(ik[start]) for ik in iks[:-1])
+        index += (slice(int(iks[-1][start]), int(iks[-1][stop - 1]) + 1),)
+        series[index + (slice_times,)] = data[start:stop]
+
+
+def _map_bounded(executor, func, iterable, max_nb_pending):
+    """Like ``executor.map`` with a bounded number of pending results
+
+    The results are yielded in order and at most ``max_nb_pending`` results
+    (computed or not) are held at the same time.
+
+    """
+    futures = deque()
+    for item in iterable:
+        if len(futures) >= max_nb_pending:
+            yield futures.popleft().result()
+        futures.append(executor.submit(func, item))
+    while futures:
+        yield futures.popleft().result()
+
+
 class SpatioTemporalSpectra3D(SpecificOutput):
     """
     Computes the spatiotemporal spectra.
@@ -126,6 +209,8 @@ class SpatioTemporalSpectra3D(SpecificOutput):
                 "probes_region": None,
                 "file_max_size": 10.0,  # MB
                 "SAVE_AS_COMPLEX64": True,
+                "buffer_size": 0,
+                "aggregate": None,
             },
         )
 
@@ -157,6 +242,22 @@ class SpatioTemporalSpectra3D(SpecificOutput):
 
                 Warning : saving as complex128 reduces digital noise at high frequency, but doubles the size of the output!
 
+            buffer_size: int (default: 0)
+
+                If larger than 0, the probes data at ``buffer_size`` times are
+                buffered in memory and written in one go (see
+                :class:`fluidsim.base.output.probes_writer.ProbesWriter`).
+
+            aggregate: str or None (default: None)
+
+                If "node" (or "all"), the probes data of the processes of a node
+                (or of all processes) are gathered and written in one file by the
+                first process of the group. If None, each process writes its own
+                files. For a restart with another number of processes or another
+                aggregation, the existing files are merged in decomposition
+                independent files (see the method ``consolidate_files``) and the
+                simulation continues with ``aggregate="all"``.
+
             """
         )
 
@@ -210,6 +311,13 @@ class SpatioTemporalSpectra3D(SpecificOutput):
 
         self.file_max_size = params_st_spec.file_max_size
         self.SAVE_AS_COMPLEX64 = params_st_spec.SAVE_AS_COMPLEX64
+        try:
+            buffer_size = params_st_spec.buffer_size
+            self.aggregate = params_st_spec.aggregate
+        except AttributeError:
+            # loading an old simulation?
+            buffer_size = 0
+            self.aggregate = None
 
         # region must be int tuple
         ikxmax = int(ikxmax)
@@ -244,17 +352,32 @@ class SpatioTemporalSpectra3D(SpecificOutput):
         if paths:
             # check values in files
             with open_patient(paths[0], "r") as file:
-                if file.attrs["nb_proc"] != mpi.nb_proc:
-                    raise ValueError(
-                        f"process number ({mpi.nb_proc}) is different from "
-                        f"process number in file ({file.attrs['nb_proc']})"
-                    )
                 if (file.attrs["dims_order"] != self.dims_order).any():
                     raise ValueError("dimensions order is different from files")
                 if (file.attrs["probes_region"] != self.probes_region).any():
                     raise ValueError("probes region is different from files")
+                nb_proc_files = file.attrs["nb_proc"]
+                aggregate_files = file.attrs.get("aggregate", "None")
+            if aggregate_files != "all" and (
+                nb_proc_files != mpi.nb_proc
+                or aggregate_files != str(self.aggregate)
+            ):
+                # files depending on another decomposition
+                if mpi.rank == 0:
+                    self.consolidate_files()
+                if mpi.nb_proc > 1:
+                    mpi.comm.barrier()
+                paths = sort_files_tmin(self.path_dir.glob("rank*.h5"))
+                aggregate_files = "all"
+            if aggregate_files == "all" and self.aggregate != "all":
+                mpi.printby0(
+                    "spatiotemporal_spectra: aggregate set to 'all' as in the files"
+                )
+                self.aggregate = "all"
+
+        INIT_FROM_PARAMS = not paths
+        if paths and self.aggregate is None:
             # init from files
-            INIT_FROM_PARAMS = False
             paths_rank = [
                 p for p in paths if p.name.startswith(f"rank{mpi.rank:05}")
             ]
@@ -273,7 +396,9 @@ class SpatioTemporalSpectra3D(SpecificOutput):
 
                     self.probes_nb_loc = self.probes_ik0_loc.size
                     self.number_times_in_file = file["times"].size
-                    self.t_last_save = file["times"][-1]
+                self.t_last_save = get_time_last_saved(
+                    paths_rank, -self.period_save
+                )
             else:
                 # no probes in proc
                 self.path_file = None
@@ -284,13 +409,10 @@ class SpatioTemporalSpectra3D(SpecificOutput):
                 self.probes_ik1_loc = []
                 self.probes_ik2_loc = []
 
-                with open_patient(paths[-1], "r") as file:
-                    self.t_last_save = file["times"][-1]
+                self.t_last_save = get_time_last_saved(paths, -self.period_save)
 
         else:
-            # no files were found : initialize from params
-            INIT_FROM_PARAMS = True
-
+            # no files were found or aggregated files: initialize from params
             if self.nb_dim == 3:
                 # pair kx,ky,kz with k0,k1,k2
                 iksmax = np.array([ikzmax, ikymax, ikxmax])
@@ -368,16 +490,55 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             self.number_times_in_file = 0
             self.t_last_save = -self.period_save
 
-        # size of a single write: nb_fields * probes_nb_loc + time
+        self._probes_writer = ProbesWriter(
+            [key + "_Fourier_loc" for key in self.keys_fields],
+            self.datatype,
+            self.probes_nb_loc,
+            buffer_size,
+            self.aggregate,
+        )
+
+        if paths and self.aggregate is None:
+            self._probes_writer.path_file = self.path_file
+        elif paths:
+            # the state of the files of the group is read by its leader
+            state_files = self._probes_writer.get_state_files(paths)
+            if state_files is None:
+                # no probes in group or leader of a new group of processes
+                self.path_file = None
+                self.index_file = 0
+                self.number_times_in_file = 0
+                self.t_last_save = get_time_last_saved(paths, -self.period_save)
+                INIT_FROM_PARAMS = True
+            else:
+                (
+                    self.path_file,
+                    self.index_file,
+                    self.number_times_in_file,
+                    self.t_last_save,
+                    same_layout,
+                ) = state_files
+                if self.t_last_save is None:
+                    # file without times (stopped before the first flush)
+                    self.t_last_save = -self.period_save
+                # with another decomposition or another group of processes,
+                # the probes are in another order
+                if not same_layout:
+                    self.index_file += 1
+                    self.number_times_in_file = 0
+                    INIT_FROM_PARAMS = True
+            self._probes_writer.path_file = self.path_file
+
+        # size of a single write: nb_fields * nb_probes + time
         probes_write_size = (
-            len(self.keys_fields) * self.probes_nb_loc + 1
+            len(self.keys_fields) * self._probes_writer.nb_probes + 1
         ) * size_1_number
         self.max_number_times_in_file = int(
             self.file_max_size / probes_write_size
         )
 
-        # initialize files
-        if INIT_FROM_PARAMS and self.probes_nb_loc > 0:
+        # initialize files (new decomposition or no files)
+        if INIT_FROM_PARAMS and self._probes_writer.nb_probes > 0:
             self._init_new_file(tmin_file=self.sim.time_stepping.t)
 
     def _init_files(self, arrays_1st_time=None):
@@ -394,7 +555,20 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             ind_str = f"tmin{tmin_file:0{str_width}.3f}"
         else:
             ind_str = f"file{self.index_file:04}"
+        writer = self._probes_writer
+        names = ["k0adim", "ik0", "k1adim", "ik1"]
+        if self.nb_dim == 3:
+            names.extend(["k2adim", "ik2"])
+        probes_loc = {
+            f"probes_{name}_loc": writer.gather_probes(
+                getattr(self, f"probes_{name}_loc")
+            )
+            for name in names
+        }
+        if not writer.is_leader:
+            return
         self.path_file = self.path_dir / f"rank{mpi.rank:05}_{ind_str}.h5"
+        writer.path_file = self.path_file
         with open_patient(self.path_file, "w") as file:
             file.attrs["nb_proc"] = mpi.nb_proc
             file.attrs["dims_order"] = self.dims_order
@@ -402,34 +576,27 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             file.attrs["probes_region"] = self.probes_region
             file.attrs["period_save"] = self.period_save
             file.attrs["max_number_times_in_file"] = self.max_number_times_in_file
+            file.attrs["aggregate"] = str(self.aggregate)
             create_ds = file.create_dataset
-            create_ds("probes_k0adim_loc", data=self.probes_k0adim_loc)
-            create_ds("probes_ik0_loc", data=self.probes_ik0_loc)
-            create_ds("probes_k1adim_loc", data=self.probes_k1adim_loc)
-            create_ds("probes_ik1_loc", data=self.probes_ik1_loc)
-            if self.nb_dim == 3:
-                create_ds("probes_k2adim_loc", data=self.probes_k2adim_loc)
-                create_ds("probes_ik2_loc", data=self.probes_ik2_loc)
-            for key in self.keys_fields:
-                create_ds(
-                    key + "_Fourier_loc",
-                    (self.probes_nb_loc, 1),
-                    maxshape=(self.probes_nb_loc, None),
-                    dtype=self.datatype,
-                )
-            create_ds("times", (1,), maxshape=(None,))
-
-    def _write_to_file(self, data):
-        """Writes a file with the temporal data"""
-        with open_patient(self.path_file, "a") as file:
-            for k, v in data.items():
-                dset = file[k]
-                if k.startswith("times"):
-                    dset.resize((self.number_times_in_file,))
-                    dset[-1] = v
-                else:
-                    dset.resize((self.probes_nb_loc, self.number_times_in_file))
-                    dset[:, -1] = v
+            for name, arr in probes_loc.items():
+                create_ds(name, data=arr)
+            writer.create_datasets(file)
+
+    def consolidate_files(self):
+        """Merge the files of all processes in decomposition independent files
+
+        See :func:`fluidsim.base.output.probes_writer.consolidate_probes_files`.
+
+        """
+        names = []
+        for index in range(self.nb_dim):
+            names.extend([f"probes_k{index}adim_loc", f"probes_ik{index}_loc"])
+        return consolidate_probes_files(
+            self.path_dir,
+            names,
+            [key + "_Fourier_loc" for key in self.keys_fields],
+            self.params.output.spatiotemporal_spectra.file_max_size,
+        )
 
     def _add_probes_data_to_dict(self, data, key):
         """Probes fields in Fourier space and append data to a dict object"""
@@ -445,21 +612,31 @@ class SpatioTemporalSpectra3D(SpecificOutput):
         ) // self.period_save > self.t_last_save // self.period_save:
             # if max write number is reached, init new file
             if self.number_times_in_file >= self.max_number_times_in_file:
+                self._probes_writer.flush()
                 self.index_file += 1
                 self.number_times_in_file = 0
                 self._init_new_file(tmin_file=self.sim.time_stepping.t)
             # get data from probes
-            data = {"times": self.sim.time_stepping.t}
+            data = {}
             for key in self.keys_fields:
                 self._add_probes_data_to_dict(data, key)
-            # write to file
+            # buffer (and write to file)
             self.number_times_in_file += 1
-            if self.probes_nb_loc > 0:
-                self._write_to_file(data)
+            self._probes_writer.append(tsim, data)
             self.t_last_save = tsim
 
-    def load_time_series(self, keys=None, tmin=0, tmax=None, dtype=None):
-        """load time series from files"""
+    def _flush_hdf5_writers(self):
+        super()._flush_hdf5_writers()
+        if getattr(self, "_probes_writer", None) is not None:
+            self._probes_writer.flush()
+
+    def _close_hdf5_writers(self):
+        super()._close_hdf5_writers()
+        if getattr(self, "_probes_writer", None) is not None:
+            self._probes_writer.flush()
+
+    def _get_info_time_series(self, keys=None, tmin=0, tmax=None, dtype=None):
+        """Get the times, the shape and the files of the time series"""
 
         if mpi.nb_proc > 1:
             raise RuntimeError(
@@ -495,8 +672,7 @@ class SpatioTemporalSpectra3D(SpecificOutput):
         tmins_files = sorted(tmins_files)
 
         if tmax is None:
-            with open_patient(paths_1st_rank[-1], "r") as file:
-                tmax = file["/times"][-1]
+            tmax = get_time_last_saved(paths_1st_rank)
 
         with Progress() as progress:
             npaths = len(paths_1st_rank)
@@ -546,74 +722,19 @@ class SpatioTemporalSpectra3D(SpecificOutput):
                 times.size,
             )
 
-        # load series, rebuild as state_spect arrays + time
-        series = {
-            f"{k}_Fourier": np.empty(shape_series, dtype=dtype) for k in keys
-        }
-        with Progress() as progress:
-            task_ranks = progress.add_task("Rearranging...", total=len(ranks))
-            task_files = progress.add_task("Rank 00000...", total=npaths)
-            # loop on all files, rank by rank
-            for rank in ranks:
-                paths_rank = [
-                    p for p in paths if p.name.startswith(f"rank{rank:05}")
-                ]
-
-                # get list of useful files, from tmin
-                tmins_files = np.array([float(p.name[14:-3]) for p in paths_rank])
-                tmins_files, paths_rank = filter_tmins_paths(
-                    tmin, tmins_files, paths_rank
-                )
-
-                npaths = len(paths_rank)
-                progress.update(
-                    task_files,
-                    description=f"Rank {rank:05}...",
-                    total=npaths,
-                    completed=0,
-                )
-
+        # list of useful files, rank by rank
+        paths_to_load = []
+        for rank in ranks:
+            paths_rank = [p for p in paths if p.name.startswith(f"rank{rank:05}")]
+            tmins_files = np.array([float(p.name[14:-3]) for p in paths_rank])
+            tmins_files, paths_rank = filter_tmins_paths(
+                tmin, tmins_files, paths_rank
+            )
+            for ip, path_file in enumerate(paths_rank):
                 # for a given rank, paths are sorted by time
-                for ip, path_file in enumerate(paths_rank):
-                    # break after the last useful file
-                    if tmins_files[ip] > tmax:
-                        progress.update(task_files, completed=npaths)
-                        break
-
-                    with open_patient(path_file, "r") as file:
-                        # time indices
-                        times_file = file["times"][:]
-                        if times_file[-1] < tmin:
-                            progress.update(task_files, advance=1)
-                            continue
-                        its_file = get_arange_minmax(times_file, tmin, tmax)
-                        tmin_keep = times_file[its_file[0]]
-                        tmax_keep = times_file[its_file[-1]]
-                        its = get_arange_minmax(times, tmin_keep, tmax_keep)
-
-                        # k_adim_loc = global probes indices!
-                        ik0 = file["probes_k0adim_loc"][:]
-                        ik1 = file["probes_k1adim_loc"][:]
-                        if self.nb_dim == 3:
-                            ik2 = file["probes_k2adim_loc"][:]
-
-                        # load data at desired times for all keys_fields
-                        for key in keys:
-                            skey = key + "_Fourier"
-                            data = file[skey + "_loc"][:, its_file]
-
-                            if self.nb_dim == 3:
-                                for i, it in enumerate(its):
-                                    series[skey][ik0, ik1, ik2, it] = data[:, i]
-                            else:
-                                for i, it in enumerate(its):
-                                    series[skey][ik0, ik1, it] = data[:, i]
-
-                    # update rich task
-                    progress.update(task_files, advance=1)
-
-                # update rich task
-                progress.update(task_ranks, advance=1)
+                if tmins_files[ip] > tmax:
+                    break
+                paths_to_load.append(path_file)
 
         # add Ki_adim arrays, times and dims order
         k0_adim = np.r_[0 : ik0max + 1, ik0min:0]
@@ -627,19 +748,185 @@ class SpatioTemporalSpectra3D(SpecificOutput):
         else:
             K0_adim, K1_adim = np.meshgrid(k0_adim, k1_adim, indexing="ij")
 
-        series.update(
-            {
-                "K0_adim": K0_adim,
-                "K1_adim": K1_adim,
-                "times": times,
-                "dims_order": dims_order,
+        others = {"K0_adim": K0_adim, "K1_adim": K1_adim, "times": times}
+        if self.nb_dim == 3:
+            others["K2_adim"] = K2_adim
+
+        return {
+            "keys": keys,
+            "dtype": dtype,
+            "times": times,
+            "tmin": tmin,
+            "tmax": tmax,
+            "dims_order": dims_order,
+            "shape_series": shape_series,
+            "paths": paths_to_load,
+            "others": others,
+        }
+
+    def load_time_series(
+        self,
+        keys=None,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        path_out=None,
+        nb_processes=None,
+    ):
+        """load time series from files
+
+        Parameters
+        ----------
+
+        keys : sequence of str, optional
+
+        tmin : float, optional
+
+        tmax : float, optional
+
+        dtype : dtype, optional
+
+        path_out : str or Path, optional
+
+          If given, the time series are not kept in memory but written in a
+          (chunked) hdf5 file at this path. The returned series are then
+          ``h5py.Dataset`` objects of this file (opened in read mode).
+
+        nb_processes : int, optional
+
+          Number of processes used to read the files (default: no process
+          pool).
+
+        """
+
+        info = self._get_info_time_series(keys, tmin, tmax, dtype)
+        keys = info["keys"]
+        dtype = info["dtype"]
+        times = info["times"]
+        shape_series = info["shape_series"]
+        paths_to_load = info["paths"]
+        others = info["others"]
+        dims_order = info["dims_order"]
+
+        # load series, rebuild as state_spect arrays + time
+        if path_out is None:
+            file_out = None
+            series = {
+                f"{k}_Fourier": np.empty(shape_series, dtype=dtype) for k in keys
             }
+        else:
+            file_out = h5py.File(path_out, "w")
+            series = {
+                f"{k}_Fourier": file_out.create_dataset(
+                    f"{k}_Fourier", shape_series, dtype=dtype, chunks=True
+                )
+                for k in keys
+            }
+
+        load_file = partial(
+            _load_data_file,
+            times=times,
+            tmin=info["tmin"],
+            tmax=info["tmax"],
+            keys=keys,
+            nb_dim=self.nb_dim,
         )
-        if self.nb_dim == 3:
-            series["K2_adim"] = K2_adim
+
+        with ExitStack() as stack:
+            if nb_processes is None or nb_processes <= 1:
+                results = map(load_file, paths_to_load)
+            else:
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=nb_processes)
+                )
+                results = _map_bounded(
+                    executor, load_file, paths_to_load, 2 * nb_processes
+                )
+
+            progress = stack.enter_context(Progress())
+            task_files = progress.add_task(
+                "Rearranging...", total=len(paths_to_load)
+            )
+            for result in results:
+                if result is not None:
+                    iks, it_start, it_stop, data = result
+                    for key in keys:
+                        skey = key + "_Fourier"
+                        _put_data_in_series(
+                            series[skey], iks, it_start, it_stop, data[key]
+                        )
+                progress.update(task_files, advance=1)
+
+        if file_out is not None:
+            for key, value in others.items():
+                file_out.create_dataset(key, data=value)
+            file_out.attrs["dims_order"] = dims_order
+            file_out.close()
+            file_out = h5py.File(path_out, "r")
+            series = {f"{k}_Fourier": file_out[f"{k}_Fourier"] for k in keys}
+
+        series.update(others)
+        series["dims_order"] = dims_order
 
         return series
 
+    def _iter_time_windows(self, info, nperseg, noverlap):
+        """Iterate over (overlapping) time windows of the time series
+
+        ``info`` is the dictionary returned by ``_get_info_time_series``.
+        The same arrays are reused for all windows, so that only one window
+        is held in memory.
+
+        """
+        times = info["times"]
+        tmin = info["tmin"]
+        tmax = info["tmax"]
+        keys = info["keys"]
+
+        # global time indices and probes indices of all useful files
+        files = []
+        for path_file in info["paths"]:
+            with open_patient(path_file, "r") as file:
+                times_file = file["times"][:]
+                if times_file.size == 0 or times_file[-1] < tmin:
+                    continue
+                its_file = get_arange_minmax(times_file, tmin, tmax)
+                its = get_arange_minmax(
+                    times, times_file[its_file[0]], times_file[its_file[-1]]
+                )
+                iks = tuple(
+                    file[f"probes_k{i}adim_loc"][:] for i in range(self.nb_dim)
+                )
+            files.append((path_file, its[0], its[-1] + 1, its_file[0], iks))
+
+        shape_window = tuple(info["shape_series"][:-1]) + (nperseg,)
+        window = {
+            f"{key}_Fourier": np.empty(shape_window, dtype=info["dtype"])
+            for key in keys
+        }
+        for start in range(0, times.size - nperseg + 1, nperseg - noverlap):
+            stop = start + nperseg
+            for path_file, it_start, it_stop, it_file_start, iks in files:
+                it_start_window = max(start, it_start)
+                it_stop_window = min(stop, it_stop)
+                if it_start_window >= it_stop_window:
+                    continue
+                slice_file = slice(
+                    it_file_start + it_start_window - it_start,
+                    it_file_start + it_stop_window - it_start,
+                )
+                with open_patient(path_file, "r") as file:
+                    for key in keys:
+                        skey = key + "_Fourier"
+                        _put_data_in_series(
+                            window[skey],
+                            iks,
+                            it_start_window - start,
+                            it_stop_window - start,
+                            file[skey + "_loc"][:, slice_file],
+                        )
+            yield window
+
     def _compute_spectrum(self, data):
         if not hasattr(self, "f_sample"):
             paths = sorted(self.path_dir.glob("rank*.h5"))
@@ -741,22 +1028,12 @@ class SpatioTemporalSpectraNS:
         )
         return self.path_dir / name
 
-    def save_spectra_kzkhomega(
-        self, tmin=0, tmax=None, dtype=None, save_urud=False
-    ):
-        """
-        save:
-            - the spatiotemporal spectra, with a cylindrical average in k-space
-            - the temporal spectra, with an average on the whole k-space
-        """
-        if tmax is None:
-            tmax = self._get_default_tmax()
+    def _get_arrays_kzkh(self, spectra):
+        """Get the wavenumber arrays used for the kz-kh averages
 
-        # compute spectra
-        print("Computing spectra...")
-        spectra = self.compute_spectra(tmin=tmin, tmax=tmax, dtype=dtype)
+        ``spectra`` has to contain the "K*_adim" arrays and "dims_order".
 
-        # get kz, kh
+        """
         params_oper = self.sim.params.oper
         deltakx = 2 * pi / params_oper.Lx
         order = spectra["dims_order"]
@@ -787,6 +1064,48 @@ class SpatioTemporalSpectraNS:
         nkh_spectra = max(2, int(khmax_spectra / deltakh))
         kh_spectra = deltakh * np.arange(nkh_spectra)
 
+        return KX, KZ, KH, kx_max, kh_spectra, kz_spectra
+
+    def _add_spectra_energies(self, spectra):
+        """Add the kinetic (and potential) energy spectra"""
+        if self.nb_dim == 3:
+            spectra["spectrum_K"] = 0.5 * (
+                spectra["spectrum_vx"]
+                + spectra["spectrum_vy"]
+                + spectra["spectrum_vz"]
+            )
+        else:
+            spectra["spectrum_K"] = 0.5 * (
+                spectra["spectrum_ux"] + spectra["spectrum_uy"]
+            )
+
+        try:
+            N = self.sim.params.N
+        except AttributeError:
+            pass
+        else:
+            spectra["spectrum_A"] = 0.5 / N**2 * spectra["spectrum_b"]
+
+    def save_spectra_kzkhomega(
+        self, tmin=0, tmax=None, dtype=None, save_urud=False
+    ):
+        """
+        save:
+            - the spatiotemporal spectra, with a cylindrical average in k-space
+            - the temporal spectra, with an average on the whole k-space
+        """
+        if tmax is None:
+            tmax = self._get_default_tmax()
+
+        # compute spectra
+        print("Computing spectra...")
+        spectra = self.compute_spectra(tmin=tmin, tmax=tmax, dtype=dtype)
+
+        # get kz, kh
+        KX, KZ, KH, kx_max, kh_spectra, kz_spectra = self._get_arrays_kzkh(
+            spectra
+        )
+
         # get one-sided frequencies
         omegas = spectra["omegas"]
         nomegas = (omegas.size + 1) // 2
@@ -817,36 +1136,8 @@ class SpatioTemporalSpectraNS:
 
         del spectra
 
-        # total kinetic energy
-        if self.nb_dim == 3:
-            spectra_kzkhomega["spectrum_K"] = 0.5 * (
-                spectra_kzkhomega["spectrum_vx"]
-                + spectra_kzkhomega["spectrum_vy"]
-                + spectra_kzkhomega["spectrum_vz"]
-            )
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_vx"]
-                + tspectra["spectrum_vy"]
-                + tspectra["spectrum_vz"]
-            )
-        else:
-            spectra_kzkhomega["spectrum_K"] = 0.5 * (
-                spectra_kzkhomega["spectrum_ux"]
-                + spectra_kzkhomega["spectrum_uy"]
-            )
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_ux"] + tspectra["spectrum_uy"]
-            )
-
-        # potential energy
-        try:
-            N = self.sim.params.N
-            spectra_kzkhomega["spectrum_A"] = (
-                0.5 / N**2 * spectra_kzkhomega["spectrum_b"]
-            )
-            tspectra["spectrum_A"] = 0.5 / N**2 * tspectra["spectrum_b"]
-        except AttributeError:
-            pass
+        self._add_spectra_energies(spectra_kzkhomega)
+        self._add_spectra_energies(tspectra)
 
         # save to files
         path_file = self._get_path_saved_spectra(tmin, tmax, dtype, save_urud)
@@ -901,6 +1192,132 @@ class SpatioTemporalSpectraNS:
 
         return spectra_kzkhomega, tspectra
 
+    def compute_spectra_kzkhomega_welch(
+        self, tmin=0, tmax=None, nperseg=256, noverlap=None, window="hann"
+    ):
+        """Compute the kz-kh-omega and temporal spectra with Welch's method
+
+        The time series are read window by window (with ``noverlap`` time
+        steps in common between consecutive windows, default ``nperseg //
+        2``). The periodogram of each tapered window is directly reduced to
+        the kz-kh-omega cylindrical average and to the temporal spectrum,
+        so that the memory usage is bounded by the size of one window.
+
+        With ``window="boxcar"`` and ``nperseg`` equal to the number of
+        times, the results are equal to those of ``save_spectra_kzkhomega``.
+
+        """
+        info = self._get_info_time_series(tmin=tmin, tmax=tmax)
+        nb_times = info["times"].size
+        nperseg = min(nperseg, nb_times)
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if not 0 <= noverlap < nperseg:
+            raise ValueError("noverlap has to be in [0, nperseg)")
+
+        spectra = dict(info["others"])
+        spectra["dims_order"] = info["dims_order"]
+        KX, KZ, KH, kx_max, kh_spectra, kz_spectra = self._get_arrays_kzkh(
+            spectra
+        )
+        del spectra
+
+        paths = sorted(self.path_dir.glob("rank*.h5"))
+        with h5py.File(paths[0], "r") as file:
+            f_sample = 1.0 / file.attrs["period_save"]
+
+        nomegas = (nperseg + 1) // 2
+        omegas = 2 * pi * np.fft.fftfreq(nperseg, 1 / f_sample)
+        omegas_onesided = abs(omegas[:nomegas])
+
+        spectra_kzkhomega = {}
+        tspectra = {}
+        nb_windows = 0
+        for data_window in self._iter_time_windows(info, nperseg, noverlap):
+            for key, data in data_window.items():
+                key_spectrum = "spectrum_" + key.split("_Fourier")[0]
+                # density scaling / (2 pi): per unit of omega, such that the
+                # sum over the frequencies gives the (tapered) variance
+                _, spectrum = signal.periodogram(
+                    data,
+                    fs=f_sample,
+                    window=window,
+                    scaling="density",
+                    detrend=False,
+                    return_onesided=False,
+                )
+                spectrum /= 2 * pi
+                spectrum_kzkhomega = self.compute_spectrum_kzkhomega(
+                    np.ascontiguousarray(spectrum),
+                    kh_spectra,
+                    kz_spectra,
+                    KX,
+                    KZ,
+                    KH,
+                )
+                tspectrum = self._sum_wavenumber(spectrum, KX, kx_max)
+                tspectrum_onesided = np.zeros(nomegas)
+                tspectrum_onesided[0] = tspectrum[0]
+                tspectrum_onesided[1:] = (
+                    tspectrum[1:nomegas] + tspectrum[-1:-nomegas:-1]
+                )
+                if nb_windows == 0:
+                    spectra_kzkhomega[key_spectrum] = spectrum_kzkhomega
+                    tspectra[key_spectrum] = tspectrum_onesided
+                else:
+                    spectra_kzkhomega[key_spectrum] += spectrum_kzkhomega
+                    tspectra[key_spectrum] += tspectrum_onesided
+            nb_windows += 1
+
+        for spectra in (spectra_kzkhomega, tspectra):
+            for key in spectra:
+                spectra[key] /= nb_windows
+            self._add_spectra_energies(spectra)
+            spectra["omegas"] = omegas_onesided
+
+        spectra_kzkhomega["kz_spectra"] = kz_spectra
+        spectra_kzkhomega["kh_spectra"] = kh_spectra
+
+        return spectra_kzkhomega, tspectra
+
+    def save_spectra_kzkhomega_welch(
+        self, tmin=0, tmax=None, nperseg=256, noverlap=None, window="hann"
+    ):
+        """Compute (Welch's method) and save the kz-kh-omega spectra
+
+        See :func:`compute_spectra_kzkhomega_welch`. The spatiotemporal and
+        temporal spectra are saved in the groups "kzkhomega" and "temporal"
+        of the file ``welch_{tmin}_{tmax}_{nperseg}.h5``.
+
+        """
+        if tmax is None:
+            tmax = self._get_default_tmax()
+
+        spectra_kzkhomega, tspectra = self.compute_spectra_kzkhomega_welch(
+            tmin, tmax, nperseg, noverlap, window
+        )
+
+        path_file = (
+            self.path_dir / f"welch_{float(tmin)}_{float(tmax)}_{nperseg}.h5"
+        )
+        with h5py.File(path_file, "w") as file:
+            file.attrs["tmin"] = tmin
+            file.attrs["tmax"] = tmax
+            file.attrs["nperseg"] = nperseg
+            file.attrs["noverlap"] = (
+                nperseg // 2 if noverlap is None else noverlap
+            )
+            file.attrs["window"] = str(window)
+            for name_group, spectra in (
+                ("kzkhomega", spectra_kzkhomega),
+                ("temporal", tspectra),
+            ):
+                group = file.create_group(name_group)
+                for key, val in spectra.items():
+                    group.create_dataset(key, data=val)
+
+        return spectra_kzkhomega, tspectra
+
     def load_spectra_kzkhomega(
         self, tmin=0, tmax=None, dtype=None, save_urud=False
     ):
@@ -1226,24 +1643,7 @@ class SpatioTemporalSpectraNS:
             )
             tspectra[key] = tspectrum_onesided
 
-        # total kinetic energy
-        if self.nb_dim == 3:
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_vx"]
-                + tspectra["spectrum_vy"]
-                + tspectra["spectrum_vz"]
-            )
-        else:
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_ux"] + tspectra["spectrum_uy"]
-            )
-
-        # potential energy
-        try:
-            N = self.sim.params.N
-            tspectra["spectrum_A"] = 0.5 / N**2 * tspectra["spectrum_b"]
-        except AttributeError:
-            pass
+        self._add_spectra_energies(tspectra)
 
         return tspectra
 
@@ -1499,8 +1899,7 @@ class SpatioTemporalSpectraNS:
         paths_1st_rank = sort_files_tmin(
             p for p in paths if p.name.startswith(f"rank{ranks[0]:05}")
         )
-        with open_patient(paths_1st_rank[-1], "r") as file:
-            return file["/times"][-1]
+        return get_time_last_saved(paths_1st_rank)
 
     def get_spectra(self, tmin=0, tmax=None, dtype=None):
         save_urud = True
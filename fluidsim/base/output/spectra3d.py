@@ -196,6 +196,31 @@ class BaseSpectra(SpectraBase):
         """compute the values at one time."""
         raise NotImplementedError
 
+    def _compute_energies_stack(self, *energies):
+        """Compute a stack of energy densities without temporary arrays.
+
+        Each energy is given as a tuple ``(coef, arrays_fft)`` and is equal to
+        ``coef * sum(abs(arr) ** 2 for arr in arrays_fft)``. The memory is
+        reused between calls.
+
+        """
+        nb_energies = len(energies)
+        # one more array used as a buffer
+        shape = (nb_energies + 1,) + tuple(self.oper.shapeK_loc)
+        stack = getattr(self, "_energies_stack", None)
+        if stack is None or stack.shape != shape:
+            stack = self._energies_stack = np.empty(shape)
+        tmp = stack[nb_energies]
+        for energy, (coef, arrays_fft) in zip(stack, energies):
+            np.abs(arrays_fft[0], out=energy)
+            np.square(energy, out=energy)
+            for arr_fft in arrays_fft[1:]:
+                np.abs(arr_fft, out=tmp)
+                np.square(tmp, out=tmp)
+                energy += tmp
+            energy *= coef
+        return stack[:nb_energies]
+
     def _init_online_plot(self):
         if mpi.rank == 0:
             fig, ax = self.output.figure_axe(numfig=1_000_000)
@@ -17,21 +17,74 @@ Provides:
 
 from pathlib import Path
 from logging import warn
+from functools import partial
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 
 from math import pi
 import numpy as np
 from scipy import signal
 import h5py
-from rich.progress import Progress, track
+from rich.progress import Progress
 
 from fluiddyn.util import mpi
 from fluidsim.base.output.base import SpecificOutput
+from fluidsim.base.output.probes_writer import (
+    ProbesWriter,
+    consolidate_probes_files,
+    get_time_last_saved,
+)
 from fluidsim.base.output.spatiotemporal_spectra import (
     filter_tmins_paths,
     get_arange_minmax,
 )
 
 
+def _save_block_phys_fields(
+    times_block, paths_save, infos_files, keys, coords, info
+):
+    """Save the probes data of a block of times as phys_fields arrays
+
+    The useful files are opened once and their data at the times of the block
+    are read in one slice per key.
+
+    """
+    probes_X, probes_Y, probes_Z = coords
+    shape = (times_block.size,) + probes_X.shape
+    buffers = {key: np.empty(shape, dtype=np.float64) for key in keys}
+
+    tmin, tmax = times_block[0], times_block[-1]
+    for path_file, times_file, (iz, iy, ix) in infos_files:
+        if times_file.size == 0 or times_file[-1] < tmin or times_file[0] > tmax:
+            continue
+        its_file = get_arange_minmax(times_file, tmin, tmax)
+        # times of the block in this file
+        its_file = its_file[np.isin(times_file[its_file], times_block)]
+        if its_file.size == 0:
+            continue
+        its_block = np.searchsorted(times_block, times_file[its_file])
+        slice_file = slice(its_file[0], its_file[-1] + 1)
+        its_file -= its_file[0]
+        with h5py.File(path_file, "r") as file:
+            for key in keys:
+                data = file[f"probes_{key}_loc"][:, slice_file]
+                buffers[key][its_block[:, None], iz, iy, ix] = data[:, its_file].T
+
+    # save fields into new files
+    for index_time, path_file_save in enumerate(paths_save):
+        with h5py.File(path_file_save, "w") as file:
+            create_ds = file.create_dataset
+            # probes coordinates
+            create_ds("x", data=probes_X)
+            create_ds("y", data=probes_Y)
+            create_ds("z", data=probes_Z)
+            # physical fields
+            for key, buffer in buffers.items():
+                create_ds(key, data=buffer[index_time])
+            # sim info
+            info._save_as_hdf5(hdf5_parent=file)
+
+
 class TemporalSpectra3D(SpecificOutput):
     """
     Computes the temporal spectra.
@@ -52,6 +105,8 @@ class TemporalSpectra3D(SpecificOutput):
             "probes_region": None,  # m
             "file_max_size": 10.0,  # MB
             "SAVE_AS_FLOAT32": True,
+            "buffer_size": 0,
+            "aggregate": None,
         }
 
         if cls.nb_dim == 3:
@@ -86,6 +141,22 @@ class TemporalSpectra3D(SpecificOutput):
 
                 Warning : saving as float64 reduces digital noise at high frequencies, but double the size of the output!
 
+            buffer_size: int (default: 0)
+
+                If larger than 0, the probes data at ``buffer_size`` times are
+                buffered in memory and written in one go (see
+                :class:`fluidsim.base.output.probes_writer.ProbesWriter`).
+
+            aggregate: str or None (default: None)
+
+                If "node" (or "all"), the probes data of the processes of a node
+                (or of all processes) are gathered and written in one file by the
+                first process of the group. If None, each process writes its own
+                files. For a restart with another number of processes or another
+                aggregation, the existing files are merged in decomposition
+                independent files (see the method ``consolidate_files``) and the
+                simulation continues with ``aggregate="all"``.
+
             """
         )
 
@@ -144,6 +215,13 @@ class TemporalSpectra3D(SpecificOutput):
 
         self.file_max_size = params_tspec.file_max_size
         self.SAVE_AS_FLOAT32 = params_tspec.SAVE_AS_FLOAT32
+        try:
+            buffer_size = params_tspec.buffer_size
+            self.aggregate = params_tspec.aggregate
+        except AttributeError:
+            # loading an old simulation?
+            buffer_size = 0
+            self.aggregate = None
 
         if self.SAVE_AS_FLOAT32:
             size_1_number = 4e-6
@@ -200,14 +278,32 @@ class TemporalSpectra3D(SpecificOutput):
         if paths:
             # check values in files
             with h5py.File(paths[0], "r") as file:
-                if file.attrs["nb_proc"] != mpi.nb_proc:
-                    raise ValueError("process number is different from files")
                 if not (
                     np.allclose(file["probes_x_seq"][:], self.probes_x_seq)
                     and np.allclose(file["probes_y_seq"][:], self.probes_y_seq)
                     and np.allclose(file["probes_z_seq"][:], self.probes_z_seq)
                 ):
                     raise ValueError("probes position are different from files")
+                nb_proc_files = file.attrs["nb_proc"]
+                aggregate_files = file.attrs.get("aggregate", "None")
+            if aggregate_files != "all" and (
+                nb_proc_files != mpi.nb_proc
+                or aggregate_files != str(self.aggregate)
+            ):
+                # files depending on another decomposition
+                if mpi.rank == 0:
+                    self.consolidate_files()
+                if mpi.nb_proc > 1:
+                    mpi.comm.barrier()
+                paths = sorted(self.path_dir.glob("rank*.h5"))
+                aggregate_files = "all"
+            if aggregate_files == "all" and self.aggregate != "all":
+                mpi.printby0(
+                    "temporal_spectra: aggregate set to 'all' as in the files"
+                )
+                self.aggregate = "all"
+
+        if paths and self.aggregate is None:
             # init from files
             paths = [p for p in paths if p.name.startswith(f"rank{mpi.rank:05}")]
             if paths:
@@ -222,7 +318,7 @@ class TemporalSpectra3D(SpecificOutput):
                     self.probes_iz_loc = file["probes_iz_loc"][:]
                     self.probes_nb_loc = self.probes_x_loc.size
                     self.number_times_in_file = file["times"].size
-                    self.t_last_save = file["times"][-1]
+                self.t_last_save = get_time_last_saved(paths, -self.period_save)
             else:
                 # no probes in proc
                 self.path_file = None
@@ -237,7 +333,7 @@ class TemporalSpectra3D(SpecificOutput):
                 self.probes_iz_loc = []
 
         else:
-            # no files were found : initialize from params
+            # no files were found or aggregated files: initialize from params
             # local probes coordinates
             self.probes_x_loc = self.probes_x_seq[
                 (self.probes_x_seq >= X.min()) & (self.probes_x_seq <= X.max())
@@ -285,21 +381,63 @@ class TemporalSpectra3D(SpecificOutput):
             if self.nb_dim == 3:
                 self.probes_z_loc = self._get_data_probe_from_field(Z)
 
+        self._probes_writer = ProbesWriter(
+            [f"probes_{key}_loc" for key in self.keys_fields],
+            self.datatype,
+            self.probes_nb_loc,
+            buffer_size,
+            self.aggregate,
+        )
+
+        has_to_init_new_file = False
+        if paths and self.aggregate is None:
+            self._probes_writer.path_file = self.path_file
+        elif paths:
+            # the state of the files of the group is read by its leader
+            state_files = self._probes_writer.get_state_files(paths)
+            if state_files is None:
+                # no probes in group or leader of a new group of processes
+                self.path_file = None
+                self.index_file = 0
+                self.number_times_in_file = 0
+                self.t_last_save = get_time_last_saved(paths, -self.period_save)
+                has_to_init_new_file = self._probes_writer.nb_probes > 0
+            else:
+                (
+                    self.path_file,
+                    self.index_file,
+                    self.number_times_in_file,
+                    self.t_last_save,
+                    same_layout,
+                ) = state_files
+                if self.t_last_save is None:
+                    # file without times (stopped before the first flush)
+                    self.t_last_save = -self.period_save
+                # with another decomposition or another group of processes,
+                # the probes are in another order
+                if not same_layout:
+                    self.index_file += 1
+                    self.number_times_in_file = 0
+                    has_to_init_new_file = True
+            self._probes_writer.path_file = self.path_file
+        else:
             # initialize files
             self.index_file = 0
             self.number_times_in_file = 0
             self.t_last_save = -self.period_save
-            if self.probes_nb_loc > 0:
-                self._init_new_file(tmin_file=self.sim.time_stepping.t)
+            has_to_init_new_file = self._probes_writer.nb_probes > 0
 
-        # size of a single write: nb_fields * probes_nb_loc + time
+        # size of a single write: nb_fields * nb_probes + time
         probes_write_size = (
-            len(self.keys_fields) * self.probes_nb_loc + 1
+            len(self.keys_fields) * self._probes_writer.nb_probes + 1
         ) * size_1_number
         self.max_number_times_in_file = int(
             self.file_max_size / probes_write_size
         )
 
+        if has_to_init_new_file:
+            self._init_new_file(tmin_file=self.sim.time_stepping.t)
+
     def _init_files(self, arrays_1st_time=None):
         # we don't want to do anything when this function is called.
         pass
@@ -314,53 +452,56 @@ class TemporalSpectra3D(SpecificOutput):
             ind_str = f"tmin{tmin_file:0{str_width}.3f}"
         else:
             ind_str = f"file{self.index_file:04}"
+        writer = self._probes_writer
+        probes_loc = {
+            name: writer.gather_probes(getattr(self, name))
+            for name in self._get_names_probes_loc()
+        }
+        if not writer.is_leader:
+            return
         self.path_file = self.path_dir / f"rank{mpi.rank:05}_{ind_str}.h5"
+        writer.path_file = self.path_file
         with h5py.File(self.path_file, "w") as file:
             file.attrs["nb_proc"] = mpi.nb_proc
             file.attrs["index_file"] = self.index_file
             file.attrs["period_save"] = self.period_save
+            file.attrs["aggregate"] = str(self.aggregate)
             create_ds = file.create_dataset
             create_ds("probes_x_seq", data=self.probes_x_seq)
             create_ds("probes_y_seq", data=self.probes_y_seq)
             create_ds("probes_z_seq", data=self.probes_z_seq)
 
-            create_ds("probes_x_loc", data=self.probes_x_loc)
-            create_ds("probes_y_loc", data=self.probes_y_loc)
-            create_ds("probes_z_loc", data=self.probes_z_loc)
-
-            create_ds("probes_ix_loc", data=self.probes_ix_loc)
-            create_ds("probes_iy_loc", data=self.probes_iy_loc)
-            create_ds("probes_iz_loc", data=self.probes_iz_loc)
-
-            create_ds("times", (1,), maxshape=(None,))
-
-            for key in self.keys_fields:
-                create_ds(
-                    f"probes_{key}_loc",
-                    (self.probes_nb_loc, 1),
-                    maxshape=(self.probes_nb_loc, None),
-                    dtype=self.datatype,
-                )
+            for name, arr in probes_loc.items():
+                create_ds(name, data=arr)
+            if self.nb_dim == 2:
+                create_ds("probes_z_loc", data=self.probes_z_loc)
 
-    def _write_to_file(self, data):
-        """Writes a file with the temporal data"""
-        with h5py.File(self.path_file, "a") as file:
-            for k, v in data.items():
-                dset = file[k]
-                if k.startswith("times"):
-                    dset.resize((self.number_times_in_file,))
-                    if self.SAVE_AS_FLOAT32:
-                        v = np.array(v, dtype="float32")
-                    dset[-1] = v
-                else:
-                    dset.resize((self.probes_nb_loc, self.number_times_in_file))
-                    if self.SAVE_AS_FLOAT32:
-                        v = v.astype("float32")
-                    dset[:, -1] = v
+            writer.create_datasets(file)
 
     def _get_data_probe_from_field(self, field):
         return field[self.probes_iz_loc, self.probes_iy_loc, self.probes_ix_loc]
 
+    def _get_names_probes_loc(self):
+        """Names of the datasets containing one value per probe"""
+        names = ["x", "y", "z", "ix", "iy", "iz"]
+        if self.nb_dim == 2:
+            # only one z (0) for all probes
+            names.remove("z")
+        return [f"probes_{name}_loc" for name in names]
+
+    def consolidate_files(self):
+        """Merge the files of all processes in decomposition independent files
+
+        See :func:`fluidsim.base.output.probes_writer.consolidate_probes_files`.
+
+        """
+        return consolidate_probes_files(
+            self.path_dir,
+            self._get_names_probes_loc(),
+            [f"probes_{key}_loc" for key in self.keys_fields],
+            self.params.output.temporal_spectra.file_max_size,
+        )
+
     def _add_probes_data_to_dict(self, data_dict, key):
         """Probes fields and append data to a dict object"""
         data_dict[f"probes_{key}_loc"] = self._get_data_probe_from_field(
@@ -369,25 +510,36 @@ class TemporalSpectra3D(SpecificOutput):
 
     def _online_save(self):
         """Prepares data and writes to file"""
-        if self.probes_nb_loc > 0:
-            tsim = self.sim.time_stepping.t
-            if (
-                tsim + 1e-15
-            ) // self.period_save > self.t_last_save // self.period_save:
-                # if max write number is reached, init new file
-                if self.number_times_in_file >= self.max_number_times_in_file:
-                    self.index_file += 1
-                    self.number_times_in_file = 0
-                    self._init_new_file(tmin_file=self.sim.time_stepping.t)
-                # get data from probes
-                data = {"times": self.sim.time_stepping.t}
-                data["times"] = self.sim.time_stepping.t
-                for key in self.keys_fields:
-                    self._add_probes_data_to_dict(data, key)
-                # write to file
-                self.number_times_in_file += 1
-                self._write_to_file(data)
-                self.t_last_save = tsim
+        if self._probes_writer.nb_probes == 0:
+            return
+        tsim = self.sim.time_stepping.t
+        if (
+            tsim + 1e-15
+        ) // self.period_save > self.t_last_save // self.period_save:
+            # if max write number is reached, init new file
+            if self.number_times_in_file >= self.max_number_times_in_file:
+                self._probes_writer.flush()
+                self.index_file += 1
+                self.number_times_in_file = 0
+                self._init_new_file(tmin_file=tsim)
+            # get data from probes
+            data = {}
+            for key in self.keys_fields:
+                self._add_probes_data_to_dict(data, key)
+            # buffer (and write to file)
+            self.number_times_in_file += 1
+            self._probes_writer.append(tsim, data)
+            self.t_last_save = tsim
+
+    def _flush_hdf5_writers(self):
+        super()._flush_hdf5_writers()
+        if getattr(self, "_probes_writer", None) is not None:
+            self._probes_writer.flush()
+
+    def _close_hdf5_writers(self):
+        super()._close_hdf5_writers()
+        if getattr(self, "_probes_writer", None) is not None:
+            self._probes_writer.flush()
 
     def load_time_series(
         self, keys=None, region=None, tmin=0, tmax=None, dtype=None
@@ -501,14 +653,22 @@ class TemporalSpectra3D(SpecificOutput):
                             )
 
                         cond_region = np.where(cond_region)[0]
+                        # same order of the probes for all files (the files
+                        # written after a restart with another decomposition
+                        # contain the probes in another order)
+                        coords = [probes_y, probes_x]
+                        if self.nb_dim == 3:
+                            coords.insert(0, probes_z)
+                        order = np.lexsort(
+                            [coord[cond_region] for coord in coords]
+                        )
 
+                        times_file = file["times"][:]
+                        its_file = get_arange_minmax(times_file, tmin, tmax)
                         for key in keys:
                             skey = f"probes_{key}_loc"
                             tmp = file[skey][cond_region, :]
-
-                            times_file = file["times"][:]
-                            its_file = get_arange_minmax(times_file, tmin, tmax)
-                            data[skey].append(tmp[:, its_file])
+                            data[skey].append(tmp[order][:, its_file])
 
                     # update rich task
                     progress.update(task_files, advance=1)
@@ -696,8 +856,34 @@ class TemporalSpectra3D(SpecificOutput):
 
             ax.legend()
 
-    def save_data_as_phys_fields(self, delta_index_times=1):
-        """load temporal data and save as phys_fields array"""
+    def save_data_as_phys_fields(
+        self, delta_index_times=1, max_mem_buffer=500.0, nb_processes=None
+    ):
+        """load temporal data and save as phys_fields array
+
+        The times are processed by blocks. For each block, the data of the
+        useful files are read (one slice per file and per key) and scattered
+        in a buffer containing the fields at all times of the block, which are
+        then saved in one file per time.
+
+        Parameters
+        ----------
+
+        delta_index_times : int, optional
+
+          Save the fields every ``delta_index_times`` saved times.
+
+        max_mem_buffer : float, optional
+
+          Maximum memory (in Mo) used by the buffer of the fields of one block
+          of times (one buffer per process).
+
+        nb_processes : int, optional
+
+          Number of processes used to handle the blocks of times (default: no
+          process pool).
+
+        """
 
         # path to saving directory
         path_dir_save = self.path_dir / "phys_fields"
@@ -719,10 +905,27 @@ class TemporalSpectra3D(SpecificOutput):
             probes_y_seq = file["probes_y_seq"][:]
             probes_z_seq = file["probes_z_seq"][:]
 
+        # probes positions
+        xmin = probes_x_seq.min()
+        deltax = probes_x_seq[1] - xmin
+        ymin = probes_y_seq.min()
+        deltay = probes_y_seq[1] - ymin
+        zmin = probes_z_seq.min()
+        deltaz = probes_z_seq[1] - zmin
+
+        # times and global probes indices of all files (opened only once)
         times = []
-        for path in paths_1st_rank:
-            with h5py.File(path, "r") as file:
-                times.append(file["times"][:])
+        infos_files = []
+        for path_file in paths:
+            with h5py.File(path_file, "r") as file:
+                times_file = file["times"][:]
+                iz = np.rint((file["probes_z_loc"][:] - zmin) / deltaz)
+                iy = np.rint((file["probes_y_loc"][:] - ymin) / deltay)
+                ix = np.rint((file["probes_x_loc"][:] - xmin) / deltax)
+            if path_file.name.startswith(f"rank{ranks[0]:05}"):
+                times.append(times_file)
+            indices = tuple(i.astype("int") for i in (iz, iy, ix))
+            infos_files.append((path_file, times_file, indices))
         times = np.concatenate(times)[::delta_index_times]
 
         print(f"tmin={times.min():8.6g}, tmax={times.max():8.6g}")
@@ -732,68 +935,48 @@ class TemporalSpectra3D(SpecificOutput):
         # add 2 zeros, coma and 3 decimals : + 6
         width = int(np.log10(times.max())) + 7
 
-        # probes positions
-        xmin = probes_x_seq.min()
-        deltax = probes_x_seq[1] - xmin
-        ymin = probes_y_seq.min()
-        deltay = probes_y_seq[1] - ymin
-        zmin = probes_z_seq.min()
-        deltaz = probes_z_seq[1] - zmin
         probes_Z, probes_Y, probes_X = np.meshgrid(
             probes_z_seq, probes_y_seq, probes_x_seq, indexing="ij"
         )
 
-        # loop on times
-        for time in track(times, description="Rearranging..."):
-            # initialize arrays
-            dict_arrays = {k: np.empty_like(probes_X) for k in self.keys_fields}
+        nb_times_block = int(
+            max_mem_buffer * 1e6 / (len(self.keys_fields) * probes_X.nbytes)
+        )
+        nb_times_block = max(1, nb_times_block)
+        if nb_processes is not None and nb_processes > 1:
+            # at least one block per process
+            nb_times_block = min(nb_times_block, -(-times.size // nb_processes))
+        paths_save = [
+            path_dir_save / f"probes_fields_t{time:0{width}.3f}.h5"
+            for time in times
+        ]
+        starts = range(0, times.size, nb_times_block)
+        blocks_times = [times[i : i + nb_times_block] for i in starts]
+        blocks_paths = [paths_save[i : i + nb_times_block] for i in starts]
+
+        save_block = partial(
+            _save_block_phys_fields,
+            infos_files=infos_files,
+            keys=self.keys_fields,
+            coords=(probes_X, probes_Y, probes_Z),
+            info=self.sim.info,
+        )
 
-            # loop on ranks
-            for rank in ranks:
-                for path_file in paths:
-                    if not path_file.name.startswith(f"rank{rank:05}"):
-                        continue
-                    with h5py.File(path_file, "r") as file:
-                        # check if the file contains the time we're looking for
-                        tmin_file, tmax_file = file["times"][[0, -1]]
-                        if (time < tmin_file) or (time > tmax_file):
-                            continue
-
-                        # time index
-                        it = np.where(file["times"][:] == time)[0]
-
-                        # get global probes indices
-                        coord_loc = file["probes_x_loc"][:]
-                        ix = np.rint((coord_loc - xmin) / deltax).astype("int")
-                        coord_loc = file["probes_y_loc"][:]
-                        iy = np.rint((coord_loc - ymin) / deltay).astype("int")
-                        coord_loc = file["probes_z_loc"][:]
-                        iz = np.rint((coord_loc - zmin) / deltaz).astype("int")
-
-                        # load data at time t for all keys_fields
-                        for key in self.keys_fields:
-                            dict_arrays[key][iz, iy, ix] = file[
-                                f"probes_{key}_loc"
-                            ][:, it].transpose()
-
-                        # stop opening files when we've reached the right one
-                        break
+        with ExitStack() as stack:
+            if nb_processes is None or nb_processes <= 1:
+                results = map(save_block, blocks_times, blocks_paths)
+            else:
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=nb_processes)
+                )
+                results = executor.map(save_block, blocks_times, blocks_paths)
 
-            # save fields into a new file
-            path_file_save = (
-                path_dir_save / f"probes_fields_t{time:0{width}.3f}.h5"
+            progress = stack.enter_context(Progress())
+            task_blocks = progress.add_task(
+                "Rearranging...", total=len(blocks_times)
             )
-            with h5py.File(path_file_save, "w") as file:
-                create_ds = file.create_dataset
-                # probes coordinates
-                create_ds("x", data=probes_X)
-                create_ds("y", data=probes_Y)
-                create_ds("z", data=probes_Z)
-                # physical fields
-                for k, v in dict_arrays.items():
-                    create_ds(k, data=v)
-                # sim info
-                self.sim.info._save_as_hdf5(hdf5_parent=file)
+            for _ in results:
+                progress.update(task_blocks, advance=1)
 
     def _get_path_saved_spectra(self, region, tmin, tmax, dtype):
         base = (
@@ -10,6 +10,7 @@ Provides:
    base
    pseudo_spect
    finite_diff
+   ensemble
    info_base
 
 """
@@ -0,0 +1,499 @@
+"""Ensembles of simulations (:mod:`fluidsim.base.solvers.ensemble`)
+=================================================================
+
+This module provides the function :func:`create_ensemble`, the entry point to
+advance together an ensemble of simulations of the same solver (one set of
+parameters per member)::
+
+    params_members = []
+    for nu_2 in (1e-3, 2e-3):
+        params = Simul.create_default_params()
+        ...
+        params.nu_2 = nu_2
+        params_members.append(params)
+
+    ensemble = create_ensemble(Simul, params_members)
+    ensemble.time_stepping.start()
+
+For the 0D models (:mod:`fluidsim.solvers.models0d`), the ensemble is one
+simulation with the parameter ``params.oper.nb_members`` (see
+:mod:`fluidsim.operators.operators0d`): the variables have one value per
+member and the parameters listed in the class attribute
+``Simul._keys_params_members`` (for example ``sigma``, ``beta`` and ``rho`` for
+the Lorenz model) are sequences of one value per member.
+
+For the sequential pseudo-spectral solvers (for example
+:mod:`fluidsim.solvers.burgers1d` and :mod:`fluidsim.solvers.ns2d`), the
+ensemble is a :class:`SimulEnsemblePseudoSpectral` and its members
+(``ensemble.sims``) are normal simulation objects. They can differ by their
+dissipation coefficients (``nu_2``, ``nu_4``, ...), their forcing parameters
+(for example ``forcing.forcing_rate``), their initial fields and their
+outputs parameters, but they have to use the same solver, operators and time
+stepping parameters. The states of the members are stored in arrays with an
+axis for the members (after the axis of the variables), and the variables of
+the state of each member are views of these arrays. Each member computes its
+forcing and its outputs (in its own directory).
+
+If the solver class defines a method ``tendencies_nonlin_members`` (and its
+state class a method ``statephys_from_statespect_members``), the members are
+advanced with the same operations and the Fourier transforms of all members
+are computed with batched transforms (see
+:func:`fluidsim.operators.base.OperatorBase.fft_as_arg_stack`). Otherwise,
+the tendencies are computed member after member.
+
+.. autofunction:: create_ensemble
+
+.. autoclass:: SimulEnsemblePseudoSpectral
+   :members:
+   :private-members:
+
+.. autoclass:: TimeSteppingEnsemble
+   :members:
+   :private-members:
+
+"""
+
+from copy import deepcopy
+
+import numpy as np
+
+from fluiddyn.util import mpi
+
+from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.base.time_stepping.pseudo_spect import TimeSteppingPseudoSpectral
+
+# parameters that can differ between the members
+_keys_params_members = (
+    "short_name_type_run",
+    "NEW_DIR_RESULTS",
+    "path_run",
+    "nu_2",
+    "nu_4",
+    "nu_8",
+    "nu_m4",
+    "init_fields",
+    "forcing",
+    "output",
+    "preprocess",
+)
+
+
+def create_ensemble(Simul, params_members):
+    """Create an ensemble of simulations advanced together
+
+    Parameters
+    ----------
+
+    Simul : class
+
+      The simulation class of the solver.
+
+    params_members : sequence of parameters
+
+      The parameters of the members. They can only differ by the parameters
+      which can be specific to each member (see the module documentation).
+
+    Returns
+    -------
+
+    For the 0D models (solvers with the class attribute
+    ``_keys_params_members``), a simulation object with
+    ``params.oper.nb_members = len(params_members)``. For the pseudo-spectral
+    solvers, a :class:`SimulEnsemblePseudoSpectral` whose members are
+    initialized with ``Simul(params)``.
+
+    """
+    params_members = list(params_members)
+    if not params_members:
+        raise ValueError("An ensemble needs at least one member")
+    if hasattr(Simul, "_keys_params_members"):
+        return Simul(_merge_params_members(Simul, params_members))
+    return SimulEnsemblePseudoSpectral(
+        [Simul(params) for params in params_members]
+    )
+
+
+def _get_dict_params_common(params, keys_members):
+    dict_params = deepcopy(params._make_dict_tree())
+    for key in keys_members:
+        dict_params.pop(key, None)
+    return dict_params
+
+
+def _merge_params_members(Simul, params_members):
+    """Parameters of a 0D ensemble (one value per member)"""
+    keys_members = Simul._keys_params_members
+    params = deepcopy(params_members[0])
+    dict_params0 = _get_dict_params_common(params, keys_members)
+    for params_member in params_members[1:]:
+        if _get_dict_params_common(params_member, keys_members) != dict_params0:
+            raise ValueError(
+                "The parameters of the members can only differ by "
+                + ", ".join(keys_members)
+            )
+    for key in keys_members:
+        values = [float(params_member[key]) for params_member in params_members]
+        if any(value != values[0] for value in values):
+            params[key] = values
+    params.oper.nb_members = len(params_members)
+    return params
+
+
+def _get_method_members(obj, name):
+    """Get the method ``<name>_members`` of an object (or None)
+
+    The method is returned only if it is defined in the same class as the
+    method ``name``, so that it is not used for a subclass redefining
+    ``name``.
+
+    """
+    name_members = name + "_members"
+    for cls in type(obj).__mro__:
+        if name_members in vars(cls):
+            return getattr(obj, name_members)
+        if name in vars(cls):
+            return None
+    return None
+
+
+def _view_member(arr, index):
+    """View of the variables of one member as a SetOfVariables"""
+    return SetOfVariables(input_array=arr[:, index], keys=arr.keys, info=arr.info)
+
+
+class _OperatorsMembers:
+    """Operators of the members (arrays with an axis for the members)
+
+    The attributes are the ones of the operators of the first member, except
+    :func:`dealiasing`, which works on the arrays of the ensemble.
+
+    """
+
+    def __init__(self, oper):
+        self._oper = oper
+        self._shapeK = tuple(oper.shapeK_loc)
+        if getattr(oper, "_has_to_dealiase", True):
+            self._where_dealiased = np.asarray(oper.where_dealiased, dtype=bool)
+        else:
+            self._where_dealiased = None
+
+    def __getattr__(self, name):
+        return getattr(self._oper, name)
+
+    def dealiasing(self, *args):
+        if self._where_dealiased is None:
+            return
+        for arr in args:
+            arr = np.asarray(arr).reshape((-1,) + self._shapeK)
+            arr[:, self._where_dealiased] = 0.0
+
+
+class _StateMembers:
+    """State of the ensemble (arrays with an axis for the members)"""
+
+    def __init__(self, ensemble):
+        self._sims = sims = ensemble.sims
+        state0 = sims[0].state
+        self.keys_state_phys = state0.keys_state_phys
+        self.keys_computable = state0.keys_computable
+        self.has_vars = state0.has_vars
+
+        nb_members = len(sims)
+        self.state_spect = self._create_array(state0.state_spect, nb_members)
+        self.state_phys = self._create_array(state0.state_phys, nb_members)
+        for index, sim in enumerate(sims):
+            state = sim.state
+            self.state_spect[:, index] = state.state_spect
+            self.state_phys[:, index] = state.state_phys
+            state.state_spect = _view_member(self.state_spect, index)
+            state.state_phys = _view_member(self.state_phys, index)
+            state.invalidate_computed()
+
+        self._statephys_from_statespect_members = _get_method_members(
+            state0, "statephys_from_statespect"
+        )
+
+    @staticmethod
+    def _create_array(arr, nb_members):
+        return SetOfVariables(
+            keys=arr.keys,
+            shape_variable=(nb_members,) + arr.shape[1:],
+            dtype=arr.dtype,
+            info=arr.info,
+        )
+
+    def get_var(self, key):
+        """Get a variable of all members (first axis for the members)"""
+        if key in self.keys_state_phys:
+            return self.state_phys.get_var(key)
+        return np.array([sim.state.get_var(key) for sim in self._sims])
+
+    def statephys_from_statespect(self):
+        """Compute the physical variables of all members."""
+        if self._statephys_from_statespect_members is not None:
+            self._statephys_from_statespect_members(
+                self.state_spect, self.state_phys
+            )
+        else:
+            for sim in self._sims:
+                sim.state.statephys_from_statespect()
+        for sim in self._sims:
+            sim.state.invalidate_computed()
+
+
+class _ForcingMembers:
+    """Forcing of the ensemble (computed by the members)"""
+
+    def __init__(self, ensemble, members_forced):
+        self._ensemble = ensemble
+        self._members_forced = members_forced
+        self._forcing = SetOfVariables(
+            like=ensemble.state.state_spect, info="forcing", value=0.0
+        )
+
+    def compute(self):
+        self._ensemble._sync_members()
+        for sim, forced in zip(self._ensemble.sims, self._members_forced):
+            if forced:
+                sim.forcing.compute()
+
+    def get_forcing(self):
+        forcing = self._forcing
+        for index, (sim, forced) in enumerate(
+            zip(self._ensemble.sims, self._members_forced)
+        ):
+            if forced:
+                forcing[:, index] = sim.forcing.get_forcing()
+        return forcing
+
+
+class _PhysFieldsMembers:
+    def __init__(self, sims):
+        self._sims = sims
+
+    def save(self):
+        for sim in self._sims:
+            if sim.output._has_to_save:
+                sim.output.phys_fields.save()
+
+
+class _OutputMembers:
+    """Output of the ensemble (computed by the members)
+
+    The messages of the time stepping are printed by the first member.
+
+    """
+
+    def __init__(self, ensemble):
+        self._ensemble = ensemble
+        self._sims = sims = ensemble.sims
+        self.print_stdout = sims[0].output.print_stdout
+        self._has_to_save = any(sim.output._has_to_save for sim in sims)
+        self.phys_fields = _PhysFieldsMembers(sims)
+
+    @property
+    def _has_been_initialized_with_state(self):
+        return all(
+            getattr(sim.output, "_has_been_initialized_with_state", False)
+            for sim in self._sims
+        )
+
+    def init_with_initialized_state(self):
+        self._ensemble._sync_members()
+        for sim in self._sims:
+            output = sim.output
+            if not getattr(output, "_has_been_initialized_with_state", False):
+                output.init_with_initialized_state()
+
+    def one_time_step(self):
+        self._ensemble._sync_members()
+        for sim in self._sims:
+            sim.output.one_time_step()
+
+    def flush_files(self):
+        for sim in self._sims:
+            sim.output.flush_files()
+
+
+class TimeSteppingEnsemble(TimeSteppingPseudoSpectral):
+    """Time stepping of an ensemble of pseudo-spectral simulations
+
+    The time step is common to all members (with ``USE_CFL``, it is computed
+    from the maximum velocity of all members). The schemes with phase-shifting
+    are not supported.
+
+    """
+
+    def _init_time_scheme(self):
+        type_time_scheme = self.params.time_stepping.type_time_scheme
+        if "phaseshift" in type_time_scheme:
+            raise ValueError(
+                f'Time scheme "{type_time_scheme}" not supported for ensembles'
+            )
+        super()._init_time_scheme()
+
+    def _str_wavenumber_from_index(self, index):
+        return f", member {index[0]}" + super()._str_wavenumber_from_index(
+            index[1:]
+        )
+
+
+class SimulEnsemblePseudoSpectral:
+    """Ensemble of sequential pseudo-spectral simulations advanced together
+
+    Parameters
+    ----------
+
+    sims : sequence of simulation objects
+
+      The members of the ensemble (initialized simulations of the same solver,
+      with the same operators and time stepping parameters). Their states are
+      copied in the arrays of the ensemble.
+
+    The ensembles are usually created with :func:`create_ensemble`.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+       sims = []
+       for nu_2, forcing_rate in [(1e-3, 1.0), (2e-3, 2.0)]:
+           params = Simul.create_default_params()
+           ...
+           params.nu_2 = nu_2
+           params.forcing.forcing_rate = forcing_rate
+           sims.append(Simul(params))
+
+       ensemble = SimulEnsemblePseudoSpectral(sims)
+       ensemble.time_stepping.start()
+
+    """
+
+    def __init__(self, sims):
+        sims = self.sims = list(sims)
+        if not sims:
+            raise ValueError("An ensemble needs at least one member")
+        if mpi.nb_proc > 1:
+            raise NotImplementedError("Ensembles are only sequential")
+
+        sim0 = sims[0]
+        self.params = sim0.params
+        if len(sim0.oper.shapeK_loc) > 2:
+            raise NotImplementedError("Ensembles of 3D simulations")
+        self._check_members()
+
+        self.oper = _OperatorsMembers(sim0.oper)
+        self.state = _StateMembers(self)
+
+        # the forcing is added to the tendencies by the ensemble
+        members_forced = []
+        for sim in sims:
+            members_forced.append(sim.is_forcing_enabled)
+            sim.is_forcing_enabled = False
+        self.is_forcing_enabled = any(members_forced)
+        if self.is_forcing_enabled:
+            self.forcing = _ForcingMembers(self, members_forced)
+
+        self.output = _OutputMembers(self)
+
+        if hasattr(sim0, "compute_freq_complex"):
+            self.compute_freq_complex = sim0.compute_freq_complex
+        self._tendencies_nonlin_members = _get_method_members(
+            sim0, "tendencies_nonlin"
+        )
+
+        self.time_stepping = TimeSteppingEnsemble(self)
+        self.time_stepping.t = sim0.time_stepping.t
+        self.time_stepping.it = sim0.time_stepping.it
+
+    def _check_members(self):
+        sim0 = self.sims[0]
+        dict_params0 = _get_dict_params_common(sim0.params, _keys_params_members)
+        for sim in self.sims[1:]:
+            if type(sim) is not type(sim0):
+                raise ValueError("The members have to use the same solver")
+            dict_params = _get_dict_params_common(
+                sim.params, _keys_params_members
+            )
+            if dict_params != dict_params0:
+                raise ValueError(
+                    "The parameters of the members can only differ by "
+                    + ", ".join(_keys_params_members)
+                )
+            if sim.time_stepping.t != sim0.time_stepping.t:
+                raise ValueError("The members have to start at the same time")
+
+    def __enter__(self):
+        self._sync_members()
+        for sim in self.sims:
+            sim.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        self._sync_members()
+        for sim in self.sims:
+            sim.__exit__(*args)
+
+    def _sync_members(self):
+        """Set the time of the members (used by their forcing and outputs)"""
+        time_stepping = self.time_stepping
+        for sim in self.sims:
+            sim.time_stepping.t = time_stepping.t
+            sim.time_stepping.it = time_stepping.it
+            sim.time_stepping.deltat = time_stepping.deltat
+
+    def compute_freq_diss(self):
+        """Compute the dissipation frequencies of the members
+
+        Returns arrays with an axis for the members (see
+        :func:`fluidsim.base.solvers.pseudo_spect.SimulBasePseudoSpectral.compute_freq_diss`).
+
+        """
+        shapeK = tuple(self.sims[0].oper.shapeK_loc)
+        freqs_d, freqs_d_hypo = zip(
+            *(sim.compute_freq_diss() for sim in self.sims)
+        )
+        f_d = np.array([np.broadcast_to(f, shapeK) for f in freqs_d])
+        f_d_hypo = np.array([np.broadcast_to(f, shapeK) for f in freqs_d_hypo])
+        return f_d, f_d_hypo
+
+    def tendencies_nonlin(self, state_spect=None, old=None):
+        """Compute the nonlinear tendencies of all members
+
+        The arrays have an axis for the members after the axis of the
+        variables. The forcing of the members is added if it is enabled.
+
+        """
+        if old is None:
+            tendencies = SetOfVariables(
+                like=self.state.state_spect, info="tendencies_nonlin"
+            )
+        else:
+            tendencies = old
+
+        if state_spect is None:
+            state_phys = self.state.state_phys
+            state_spect = self.state.state_spect
+        else:
+            state_phys = None
+
+        if self._tendencies_nonlin_members is not None:
+            self._tendencies_nonlin_members(state_spect, tendencies, state_phys)
+        else:
+            for index, sim in enumerate(self.sims):
+                tendencies_member = _view_member(tendencies, index)
+                if state_phys is None:
+                    state_spect_member = _view_member(state_spect, index)
+                else:
+                    # the member uses its state (views of the arrays)
+                    state_spect_member = None
+                result = sim.tendencies_nonlin(
+                    state_spect_member, old=tendencies_member
+                )
+                if result is not tendencies_member:
+                    tendencies[:, index] = result
+
+        if self.is_forcing_enabled:
+            tendencies += self.forcing.get_forcing()
+        return tendencies
@@ -3,6 +3,9 @@
 
 Provides:
 
+.. autoclass:: CacheComputedVars
+   :members:
+
 .. autoclass:: StateBase
    :members:
    :private-members:
@@ -13,11 +16,135 @@ Provides:
 
 """
 
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+
 import numpy as np
 
 from fluidsim.base.setofvariables import SetOfVariables
 
 
+class CacheComputedVars(MutableMapping):
+    """Cache of the computed variables of a state object
+
+    The values are valid only for the iteration (``sim.time_stepping.it``) and
+    the version of the state (incremented by :func:`invalidate`) at which they
+    have been stored. Outdated values are never returned and are removed from
+    the cache when they are found (an array given by the cache is never
+    modified by the cache).
+
+    The memory used by the cache is bounded by ``max_mem`` (in Mo, per
+    process). When it is exceeded, the least recently used values are
+    removed.
+
+    The numbers of hits and misses (i.e. of computations) for each key are
+    stored in the :class:`collections.Counter` ``nb_hits`` and ``nb_misses``.
+
+    """
+
+    def __init__(self, state, max_mem=None):
+        self._state = state
+        if max_mem is None:
+            self._max_nbytes = None
+        else:
+            self._max_nbytes = int(max_mem * 1e6)
+        self._version = 0
+        # key -> (stamp, array), ordered from the least recently used
+        self._values = OrderedDict()
+        self.nbytes = 0
+        self.nb_hits = Counter()
+        self.nb_misses = Counter()
+        self.nb_evictions = 0
+
+    def _get_stamp(self):
+        try:
+            it = self._state.sim.time_stepping.it
+        except AttributeError:
+            it = None
+        return it, self._version
+
+    def _pop_value(self, key):
+        _, value = self._values.pop(key)
+        self.nbytes -= _get_nbytes(value)
+        return value
+
+    def _is_valid(self, key):
+        try:
+            stamp, _ = self._values[key]
+        except KeyError:
+            return False
+        if stamp == self._get_stamp():
+            return True
+        self._pop_value(key)
+        return False
+
+    def __contains__(self, key):
+        return self._is_valid(key)
+
+    def __getitem__(self, key):
+        if not self._is_valid(key):
+            raise KeyError(key)
+        self._values.move_to_end(key)
+        self.nb_hits[key] += 1
+        return self._values[key][1]
+
+    def __setitem__(self, key, value):
+        stamp = self._get_stamp()
+        if key in self._values:
+            stamp_old, value_old = self._values[key]
+            if stamp_old == stamp and value_old is value:
+                # already stored (for example by the method compute)
+                self._values.move_to_end(key)
+                return
+            self._pop_value(key)
+        self._values[key] = (stamp, value)
+        self.nbytes += _get_nbytes(value)
+        self.nb_misses[key] += 1
+        self._evict()
+
+    def __delitem__(self, key):
+        self._pop_value(key)
+
+    def __iter__(self):
+        return iter(list(self._values))
+
+    def __len__(self):
+        return len(self._values)
+
+    def clear(self):
+        """Remove all values"""
+        self._values.clear()
+        self.nbytes = 0
+
+    def invalidate(self):
+        """Mark all values as outdated (the state has been modified)"""
+        self._version += 1
+
+    def _evict(self):
+        if self._max_nbytes is None:
+            return
+        # the most recently stored value is always kept
+        while self.nbytes > self._max_nbytes and len(self._values) > 1:
+            key = next(iter(self._values))
+            self._pop_value(key)
+            self.nb_evictions += 1
+
+    def get_stats(self):
+        """Return a dictionary with the numbers of hits and misses per key"""
+        keys = sorted(set(self.nb_hits) | set(self.nb_misses))
+        return {
+            key: {"hits": self.nb_hits[key], "misses": self.nb_misses[key]}
+            for key in keys
+        }
+
+
+def _get_nbytes(value):
+    try:
+        return value.nbytes
+    except AttributeError:
+        return 0
+
+
 class StateBase:
     """Contains the state variables and handles the access to fields.
 
@@ -44,6 +171,21 @@ class StateBase:
             }
         )
 
+    @staticmethod
+    def _complete_params_with_default(params):
+        """This static method is used to complete the *params* container."""
+        params._set_child("state", attribs={"max_mem_computed": 1000.0})
+        params.state._set_doc(
+            """
+max_mem_computed: float or None (default 1000.)
+
+    Maximum memory (in Mo, per process) used to store the computed variables
+    (see :class:`fluidsim.base.state.CacheComputedVars`). If None, the memory
+    is not bounded.
+
+"""
+        )
+
     def __init__(self, sim, oper=None):
         self.sim = sim
         self.params = sim.params
@@ -66,7 +208,13 @@ class StateBase:
             dtype=np.float64,
             info="state_phys",
         )
-        self.vars_computed = {}
+        try:
+            max_mem_computed = self.params.state.max_mem_computed
+        except AttributeError:
+            # loading an old simulation?
+            max_mem_computed = None
+
+        self.vars_computed = CacheComputedVars(self, max_mem_computed)
         self.it_computed = {}
 
         self.is_initialized = False
@@ -79,6 +227,14 @@ class StateBase:
         """Clear the stored computed variables."""
         self.vars_computed.clear()
 
+    def invalidate_computed(self):
+        """Mark the computed variables as outdated.
+
+        Has to be called when the state is modified in place (except during
+        the time stepping, for which the iteration number is used).
+        """
+        self.vars_computed.invalidate()
+
     def has_vars(self, *keys):
         """Checks if all of the keys are present in the union of
         ``keys_state_phys`` and ``keys_computable``.
@@ -160,6 +316,7 @@ class StateBase:
             self.state_phys.set_var(key, value)
         else:
             raise ValueError('key "' + key + '" is not known')
+        self.invalidate_computed()
 
     def can_this_key_be_obtained(self, key):
         """To check whether a variable can be obtained.
@@ -204,6 +361,7 @@ class StateBase:
                 )
 
             self.state_phys.set_var(key, value)
+        self.invalidate_computed()
 
 
 class StatePseudoSpectral(StateBase):
@@ -314,22 +472,40 @@ class StatePseudoSpectral(StateBase):
             self.state_phys.set_var(key, value)
         else:
             raise ValueError('key "' + key + '" is not known')
+        self.invalidate_computed()
 
     def statespect_from_statephys(self):
         """Compute the spectral variables from the physical variables.
 
         When you implement a new solver, check that this method does the job!
         """
-        for ik in range(self.state_spect.nvar):
-            self.oper.fft_as_arg(self.state_phys[ik], self.state_spect[ik])
+        nvar = self.state_spect.nvar
+        self.oper.fft_as_arg_stack(self.state_phys[:nvar], self.state_spect)
+        self.invalidate_computed()
 
     def statephys_from_statespect(self):
         """Compute the physical variables from the spectral variables.
 
         When you implement a new solver, check that this method does the job!
         """
-        for ik in range(self.state_spect.nvar):
-            self.oper.ifft_as_arg(self.state_spect[ik], self.state_phys[ik])
+        nvar = self.state_spect.nvar
+        self.oper.ifft_as_arg_stack(self.state_spect, self.state_phys[:nvar])
+        self.invalidate_computed()
+
+    def statephys_from_statespect_members(self, state_spect, state_phys):
+        """Compute the physical variables of the members of an ensemble
+
+        Version of :func:`statephys_from_statespect` for the arrays of
+        :class:`fluidsim.base.solvers.ensemble.SimulEnsemblePseudoSpectral`
+        (with an axis for the members after the axis of the variables).
+
+        """
+        shapeK = state_spect.shape[2:]
+        shapeX = state_phys.shape[2:]
+        self.oper.ifft_as_arg_stack(
+            state_spect.reshape((-1,) + shapeK),
+            state_phys[: state_spect.nvar].reshape((-1,) + shapeX),
+        )
 
     def return_statephys_from_statespect(self, state_spect=None):
         """Return the physical variables computed from the spectral variables."""
@@ -381,6 +557,7 @@ class StatePseudoSpectral(StateBase):
                     f"({self.keys_state_spect = })"
                 )
             self.state_spect.set_var(key, value)
+        self.invalidate_computed()
 
     def check_energy_equal_phys_spect(self):
         energy_spect = self.sim.output.compute_energy()
@@ -1,8 +1,13 @@
 import unittest
+from copy import deepcopy
 from glob import glob
+from pathlib import Path
+from unittest.mock import patch
 import os
+import signal
 
 import numpy as np
+import h5py
 
 import fluiddyn as fld
 import fluiddyn.util.mpi as mpi
@@ -19,6 +24,7 @@ from fluidsim import (
 from fluidsim.util import times_start_last_from_path
 
 from fluidsim.base.params import load_info_solver
+from fluidsim.base.init_fields import InitFieldsFromFile, _get_slices_loc
 
 from fluidsim.util.testing import TestSimul, classproperty, skip_if_no_fluidfft
 
@@ -95,5 +101,127 @@ class TestBaseSolverPS(TestSimul):
             assert np.mean(var**2) == np.mean(var_big**2)
 
 
+class _ConfigH5pyWithoutMPI:
+    """Configuration of h5py as if h5py was built without MPI support"""
+
+    mpi = False
+
+    def __getattr__(self, name):
+        return getattr(_config_h5py, name)
+
+
+_config_h5py = h5py.h5.get_config()
+
+
+@skip_if_no_fluidfft
+class TestInitFieldsFromFile(TestSimul):
+    """Restart from a file (run also with ``mpirun -np 2``)
+
+    With MPI, the fields are read collectively with the mpio driver if h5py
+    supports MPI and otherwise by the process 0 (which sends the hyperslabs
+    of the other processes). The second branch is also tested with h5py built
+    with MPI.
+
+    """
+
+    @classproperty
+    def Simul(cls):
+        from fluidsim.base.solvers.pseudo_spect import SimulBasePseudoSpectral
+
+        return SimulBasePseudoSpectral
+
+    @classmethod
+    def init_params(cls):
+        params = cls.params = cls.Simul.create_default_params()
+        params.short_name_type_run = "test_init_from_file"
+        params.oper.nx = 16
+        params.oper.ny = 12
+
+    def test_iter_fields_loc(self):
+        sim = self.sim
+        oper = sim.oper
+        state = sim.state
+        keys = state.keys_state_phys
+        for key in keys:
+            state.state_phys.set_var(key, oper.create_arrayX_random())
+        state.statespect_from_statephys()
+        state.statephys_from_statespect()
+        fields_loc = {key: state.get_var(key).copy() for key in keys}
+        sim.output.phys_fields.save()
+
+        path_file = None
+        if mpi.rank == 0:
+            path_file = sorted(Path(sim.output.path_run).glob("state_phys_t*"))[
+                -1
+            ]
+        if mpi.nb_proc > 1:
+            path_file = mpi.comm.bcast(path_file)
+
+        # sequential read of the whole fields by all processes
+        slices_loc = _get_slices_loc(oper.seq_indices_first_X, oper.shapeX_loc)
+        with h5py.File(path_file, "r") as file:
+            fields_seq_loc = {
+                key: file["/state_phys"][key][...][slices_loc] for key in keys
+            }
+        for key in keys:
+            assert np.allclose(fields_seq_loc[key], fields_loc[key]), key
+
+        params = deepcopy(sim.params)
+        params.init_fields.type = "from_file"
+        params.init_fields.from_file.path = str(path_file)
+        params.output.HAS_TO_SAVE = False
+
+        # mpio collective read (if h5py supports MPI) and Send/Recv fallback
+        configs = [_config_h5py]
+        if _config_h5py.mpi:
+            configs.append(_ConfigH5pyWithoutMPI())
+        for config in configs:
+            with patch.object(h5py.h5, "get_config", return_value=config):
+                init_fields = InitFieldsFromFile(sim)
+                fields = dict(init_fields._iter_fields_loc(path_file, keys))
+                sim_restart = self.Simul(params)
+            assert sim_restart.time_stepping.t == sim.time_stepping.t
+            for key in keys:
+                assert np.array_equal(fields[key], fields_seq_loc[key]), key
+                field = sim_restart.state.get_var(key)
+                assert np.allclose(field, fields_loc[key]), key
+
+
+@skip_if_no_fluidfft
+class TestStopSignal(TestSimul):
+    @classproperty
+    def Simul(cls):
+        from fluidsim.base.solvers.pseudo_spect import SimulBasePseudoSpectral
+
+        return SimulBasePseudoSpectral
+
+    @classmethod
+    def init_params(cls):
+        params = cls.params = cls.Simul.create_default_params()
+        params.short_name_type_run = "test_stop_signal"
+        params.oper.nx = params.oper.ny = 8
+        params.time_stepping.USE_T_END = False
+        params.time_stepping.it_end = 20
+        params.time_stepping.nb_steps_check_stop = 4
+        params.output.HAS_TO_SAVE = False
+
+    def test_stop_signal(self):
+        time_stepping = self.sim.time_stepping
+        time_stepping.main_loop()
+        assert time_stepping.it == 20
+
+        time_stepping._stop_signal_received = signal.SIGUSR2
+        time_stepping.params.time_stepping.it_end = 40
+        time_stepping.main_loop()
+        time_stepping.finalize_main_loop()
+        assert time_stepping._has_to_stop
+        if mpi.nb_proc == 1:
+            assert time_stepping.it == 21
+        else:
+            # the check (non-blocking reduction) is posted every 4 time steps
+            # and completed at the next time step
+            assert time_stepping.it == 22
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -19,6 +19,8 @@ from math import pi
 from datetime import datetime, timedelta
 from time import time
 
+import numpy as np
+
 from fluiddyn.util import mpi
 
 
@@ -42,6 +44,9 @@ class TimeSteppingBase0:
             "deltat_max": 0.2,
             "cfl_coef": None,
             "max_elapsed": None,
+            "nb_steps_check_stop": 1,
+            "period_clock_check_stop": None,
+            "nb_steps_check_finite": 20,
         }
         params._set_child("time_stepping", attribs=attribs)
 
@@ -69,7 +74,12 @@ USE_CFL: bool (default False)
 
 type_time_scheme: str (default "RK4")
 
-    Type of time scheme. Can be in ("RK2", "RK4").
+    Type of time scheme. Can be in ("RK2", "RK4"). The pseudo-spectral solvers
+    support other schemes (see :mod:`fluidsim.base.time_stepping.pseudo_spect`),
+    in particular "RK2_forcing_once" and "RK4_forcing_once", for which the
+    forcing is not added to the tendencies at each stage but once per time
+    step with the weights of the scheme (cheaper, but the coupling between
+    forcing and nonlinear terms is then only first order).
 
 deltat0: float (default 0.2)
 
@@ -90,6 +100,29 @@ max_elapsed: number or str (default None)
     than `max_elapsed`. Can be a number (in seconds) or a string (formated as
     "%H:%M:%S").
 
+nb_steps_check_stop: int (default 1)
+
+    Number of time steps between two checks of the stop conditions (stop
+    signal received and maximum elapsed time reached). With MPI, one check
+    costs one non-blocking collective communication, posted during one time
+    step and completed at the beginning of the next one.
+
+period_clock_check_stop: float (default None)
+
+    If not None, the number of time steps between two checks of the stop
+    conditions is adapted so that the checks are done approximately every
+    ``period_clock_check_stop`` seconds (clock time). Overrides
+    ``nb_steps_check_stop``.
+
+nb_steps_check_finite: int (default 20)
+
+    Number of time steps between two checks that the state does not contain
+    non-finite values (nan or inf). All variables are checked in one pass over
+    the state array. Non-finite values do not disappear once they appear, so
+    checking only every few time steps delays the error by at most
+    ``nb_steps_check_finite`` steps. If 1, check at every time step. If 0, no
+    check.
+
 """
         )
 
@@ -105,7 +138,7 @@ max_elapsed: number or str (default None)
 
         def handler_signals(signal_number, stack):
             print(f"signal {signal_number} received (rank {mpi.rank}).")
-            self._stop_signal_received = True
+            self._stop_signal_received = signal_number
 
         try:
             # warning: SIGUSR2 (12) not propagated by MPICH
@@ -141,6 +174,34 @@ max_elapsed: number or str (default None)
         else:
             self.max_elapsed = None
 
+        self._init_check_stop()
+
+        try:
+            self._nb_steps_check_finite = (
+                self.params.time_stepping.nb_steps_check_finite
+            )
+        except AttributeError:
+            # loading an old simulation?
+            self._nb_steps_check_finite = 20
+
+    def _init_check_stop(self):
+        params_ts = self.params.time_stepping
+        try:
+            self._nb_steps_check_stop = max(1, int(params_ts.nb_steps_check_stop))
+            self._period_clock_check_stop = params_ts.period_clock_check_stop
+        except AttributeError:
+            # loading an old simulation?
+            self._nb_steps_check_stop = 1
+            self._period_clock_check_stop = None
+
+        self._it_next_check_stop = self.it
+        self._it_last_check_stop = None
+        self._clock_last_check_stop = None
+        self._request_check_stop = None
+        # signal number, max elapsed reached, clock time per time step
+        self._local_check_stop = np.zeros(3)
+        self._global_check_stop = np.zeros(3)
+
     def start(self):
         """Loop to run the function :func:`one_time_step`.
 
@@ -177,6 +238,9 @@ max_elapsed: number or str (default None)
         - set the end time
         - finalize the outputs (in particular close the files)
         """
+        if self._request_check_stop is not None:
+            self._request_check_stop.Wait()
+            self._request_check_stop = None
         self.sim.__exit__()
 
     def main_loop(self, print_begin=False, save_init_field=False):
@@ -211,37 +275,147 @@ max_elapsed: number or str (default None)
             self.compute_time_increment_CLF()
         if self.sim.is_forcing_enabled:
             self.sim.forcing.compute()
-        if self.max_elapsed is not None:
-            if mpi.rank == 0:
-                now = time()
-            else:
-                now = None
-            if mpi.nb_proc > 1:
-                now = mpi.comm.bcast(now, root=0)
-            if now > self._time_should_stop:
-                self.sim.output.print_stdout(
-                    "Maximum elapsed time reached. Should stop soon."
+        self._check_stop()
+
+        self.sim.output.one_time_step()
+        self.one_time_step_computation()
+        self.t += self.deltat
+        self.it += 1
+
+    def _is_max_elapsed_reached(self):
+        return self.max_elapsed is not None and time() > self._time_should_stop
+
+    def _check_stop(self):
+        """Check the stop conditions (stop signal and max_elapsed)
+
+        With MPI, the local conditions are reduced with a non-blocking
+        collective (``Iallreduce``) posted at one time step and completed at
+        the next one, so that all processes stop at the same ``it``.
+
+        """
+        if mpi.nb_proc == 1:
+            self._handle_stop_conditions(
+                self._stop_signal_received, self._is_max_elapsed_reached()
+            )
+            return
+
+        if self._request_check_stop is not None:
+            self._request_check_stop.Wait()
+            self._request_check_stop = None
+            signal_number, max_elapsed_reached, clock_per_step = (
+                self._global_check_stop
+            )
+            self._handle_stop_conditions(
+                int(signal_number), bool(max_elapsed_reached)
+            )
+            if self._period_clock_check_stop is not None and clock_per_step > 0:
+                # same value for all processes (result of the reduction)
+                self._nb_steps_check_stop = max(
+                    1, int(self._period_clock_check_stop / clock_per_step)
                 )
-                self._has_to_stop = True
 
-        if mpi.nb_proc > 1:
-            # 1 bcast per timestep, but at least it's robust
-            stop_signal_received = mpi.comm.bcast(
-                self._stop_signal_received, root=0
+        if self._has_to_stop or self.it < self._it_next_check_stop:
+            return
+
+        now = time()
+        if (
+            self._it_last_check_stop is None
+            or self.it == self._it_last_check_stop
+        ):
+            clock_per_step = 0.0
+        else:
+            clock_per_step = (now - self._clock_last_check_stop) / (
+                self.it - self._it_last_check_stop
             )
+        self._it_last_check_stop = self.it
+        self._clock_last_check_stop = now
+        self._it_next_check_stop = self.it + self._nb_steps_check_stop
+
+        self._local_check_stop[:] = (
+            int(self._stop_signal_received),
+            self.max_elapsed is not None and now > self._time_should_stop,
+            clock_per_step,
+        )
+        self._request_check_stop = mpi.comm.Iallreduce(
+            self._local_check_stop, self._global_check_stop, op=mpi.MPI.MAX
+        )
+
+    def _check_finite(self, state, is_spectral=True):
+        """Raise a ValueError if the state contains nan or inf
+
+        The check is done every ``params.time_stepping.nb_steps_check_finite``
+        time steps, with only one pass over the array for all variables.
+
+        """
+        nb_steps = self._nb_steps_check_finite
+        if not nb_steps or self.it % nb_steps:
+            return
+        arr = np.asarray(state)
+        sums = arr.reshape(arr.shape[0], -1).sum(axis=1)
+        if np.isfinite(sums).all():
+            return
+
+        for index_key, key in enumerate(state.keys):
+            if np.isfinite(sums[index_key]):
+                continue
+            var = arr[index_key]
+            indices = np.argwhere(~np.isfinite(var))
+            if len(indices) > 0:
+                index = tuple(int(i) for i in indices[0])
+                what = "nan or inf"
+            else:
+                # the sum overflowed
+                index = np.unravel_index(np.argmax(abs(var)), var.shape)
+                index = tuple(int(i) for i in index)
+                what = "overflow"
+            location = f"index {index}"
+            if mpi.nb_proc > 1:
+                location += f" (rank {mpi.rank})"
+            if is_spectral:
+                location += self._str_wavenumber_from_index(index)
+            raise ValueError(
+                f"{what} in {key} at it = {self.it}, t = {self.t:.4f} "
+                f"({location}, value {var[index]})"
+            )
+
+    def _str_wavenumber_from_index(self, index):
+        oper = self.sim.oper
+        if hasattr(oper, "Kz"):
+            names = ("Kx", "Ky", "Kz")
         else:
-            stop_signal_received = self._stop_signal_received
-        if stop_signal_received:
-            stop_signal_received = signal.Signals(stop_signal_received).name
+            names = ("KX", "KY")
+        shape = oper.shapeK_loc
+        values = []
+        for name in names:
+            try:
+                arr = getattr(oper, name)
+            except AttributeError:
+                continue
+            values.append(
+                f"{name[1].lower()}={np.broadcast_to(arr, shape)[index]:.4g}"
+            )
+        if not values:
+            return ""
+        return ", k" + ", k".join(values)
+
+    def _handle_stop_conditions(self, signal_number, max_elapsed_reached):
+        if max_elapsed_reached and not self._has_to_stop:
             self.sim.output.print_stdout(
-                f"Stop signal ({stop_signal_received}) received so _has_to_stop set to True"
+                "Maximum elapsed time reached. Should stop soon."
             )
             self._has_to_stop = True
 
-        self.sim.output.one_time_step()
-        self.one_time_step_computation()
-        self.t += self.deltat
-        self.it += 1
+        if signal_number and not self._has_to_stop:
+            try:
+                name_signal = signal.Signals(signal_number).name
+            except ValueError:
+                name_signal = str(signal_number)
+            self.sim.output.print_stdout(
+                f"Stop signal ({name_signal}) received so _has_to_stop set to True"
+            )
+            self._has_to_stop = True
+            # the process could be killed soon after the signal
+            self.sim.output.flush_files()
 
 
 class TimeSteppingBase(TimeSteppingBase0):
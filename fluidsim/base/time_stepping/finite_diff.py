@@ -9,11 +9,10 @@ Provides:
 
 """
 
-from copy import deepcopy
+from collections import OrderedDict
 
-import numpy as np
 import scipy.sparse as sparse
-from scipy.sparse.linalg import spsolve
+from scipy.sparse.linalg import spsolve, splu
 
 from fluidsim.base.setofvariables import SetOfVariables
 
@@ -21,7 +20,16 @@ from .base import TimeSteppingBase
 
 
 class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
-    """Time stepping class for finite-difference solvers."""
+    """Time stepping class for finite-difference solvers.
+
+    The LU factorizations of the implicit operator :math:`1 - dt/2 L` are
+    computed once per time step ``dt`` and kept in a small cache (the time
+    step only changes from time to time with the CFL condition).
+
+    """
+
+    # maximum number of LU factorizations kept in memory
+    _max_size_cache_lu = 4
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -36,12 +44,13 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         self._init_time_scheme()
 
         self.L = sim.linear_operator()
+        self._identity = sparse.identity(self.L.shape[0], format="csc")
+        self._cache_lu = OrderedDict()
 
     def one_time_step_computation(self):
         """One time step"""
         self._time_step_RK()
-        if np.isnan(np.min(self.sim.state.state_phys)):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_finite(self.sim.state.state_phys, is_spectral=False)
 
     def _time_step_RK2(self):
         r"""Advance in time the variables with the Runge-Kutta 2 method.
@@ -95,7 +104,6 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         """
         dt = self.deltat
         sim = self.sim
-        identity = sparse.identity(sim.state.state_phys.size)
 
         # it seems that there is a bug with the proper RK2 method
         # (it "goes too fast")
@@ -117,12 +125,26 @@ class TimeSteppingFiniteDiffCrankNicolson(TimeSteppingBase):
         #     self.invert_to_get_solution(A_A2dt, rhs_A2dt))
 
         # it seems to work with the basic Newton time stepping:
+        state_phys = sim.state.state_phys
         tendenciesNL_0 = sim.tendencies_nonlin()
-        rhs_A1dt = self.right_hand_side(sim.state.state_phys, tendenciesNL_0, dt)
-        A_A1dt = identity - dt / 2 * self.L
-        sim.state.state_phys = deepcopy(
-            self.invert_to_get_solution(A_A1dt, rhs_A1dt)
-        )
+        rhs_A1dt = self.right_hand_side(state_phys, tendenciesNL_0, dt)
+        # A_A1dt = identity - dt/2*self.L (factorized once per dt)
+        lu_A1dt = self._get_lu(dt)
+        state_phys[:] = lu_A1dt.solve(rhs_A1dt).reshape(state_phys.shape)
+        sim.state.invalidate_computed()
+
+    def _get_lu(self, dt):
+        """Get the LU factorization of :math:`1 - dt/2 L` (cached)"""
+        try:
+            lu = self._cache_lu[dt]
+        except KeyError:
+            A = (self._identity - dt / 2 * self.L).tocsc()
+            lu = self._cache_lu[dt] = splu(A)
+            if len(self._cache_lu) > self._max_size_cache_lu:
+                self._cache_lu.popitem(last=False)
+        else:
+            self._cache_lu.move_to_end(dt)
+        return lu
 
     def right_hand_side(self, S, N, dt):
         return S.ravel() + dt / 2 * self.L.dot(S.flat) + dt * N.ravel()
@@ -68,6 +68,13 @@ def step_like_RK2(
     state_spect[:] = state_spect * diss + dt * diss2 * tendencies
 
 
+@boost
+def add_forcing_once(
+    state_spect: A, dt: float, coef_forcing: ArrayDiss, forcing: A
+):
+    state_spect[:] += dt * coef_forcing * forcing
+
+
 @boost
 def mean_with_phaseshift(
     tendencies_0: A, tendencies_1_shift: A, phaseshift: Am1, output: A
@@ -191,6 +198,17 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
     def _init_time_scheme(self):
         type_time_scheme = self.params.time_stepping.type_time_scheme
 
+        self._forcing_once = type_time_scheme.endswith("_forcing_once")
+        if self._forcing_once:
+            type_time_scheme = type_time_scheme[: -len("_forcing_once")]
+            if type_time_scheme not in ("RK2", "RK4"):
+                raise ValueError(
+                    f'Problem name time_scheme ("{type_time_scheme}'
+                    '_forcing_once"). The suffix "_forcing_once" can only be '
+                    'used with "RK2" and "RK4".'
+                )
+            self._dt_coef_forcing = None
+
         if type_time_scheme.startswith("RK"):
             self._state_spect_tmp = np.empty_like(self.sim.state.state_spect)
 
@@ -221,6 +239,10 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         else:
             raise ValueError(f'Problem name time_scheme ("{type_time_scheme}")')
 
+        if self._forcing_once:
+            self._time_step_RK_without_forcing = time_step_RK
+            time_step_RK = self._time_step_forcing_once
+
         self._time_step_RK = time_step_RK
 
     def _compute_freq_complex(self):
@@ -238,9 +260,79 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         self._time_step_RK()
         self.sim.oper.dealiasing(self.sim.state.state_spect)
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(self.sim.state.state_spect[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_finite(self.sim.state.state_spect)
+
+    def _get_coef_forcing_once(self):
+        r"""Weight of the forcing (constant during a time step)
+
+        For a constant forcing :math:`F`, the contributions of the 4 stages
+        of the RK4 scheme sum to :math:`\dt F (e^{\sigma \dt} + 4 e^{\sigma
+        \dt / 2} + 1) / 6` and the contribution of the stage of the RK2
+        scheme is :math:`\dt F e^{\sigma \dt / 2}`.
+
+        """
+        dt = self.deltat
+        if dt == self._dt_coef_forcing:
+            return self._coef_forcing
+        diss, diss2 = self.exact_linear_coefs.get_updated_coefs()
+        if self._time_step_RK_without_forcing == self._time_step_RK4:
+            self._coef_forcing = (diss + 4 * diss2 + 1) / 6
+        else:
+            self._coef_forcing = diss2.copy()
+        self._dt_coef_forcing = dt
+        return self._coef_forcing
+
+    def _time_step_forcing_once(self):
+        """Time step with the forcing added once per time step
+
+        The forcing is computed once per time step (see
+        :func:`fluidsim.base.time_stepping.base.TimeSteppingBase0.one_time_step`)
+        so that its contribution can be integrated separately with the
+        weights of the time scheme: the forcing is not added to the
+        tendencies at each stage. Since the forcing is not projected and
+        dealiased with the tendencies, it is projected and dealiased once.
+
+        The result is exact for the linear terms but the intermediate stages
+        do not see the forcing, so that the coupling between the forcing and
+        the nonlinear terms is treated as a first order splitting. The
+        difference with the standard schemes is small when the forcing
+        varies slowly compared to the time step.
+
+        The solvers have to test ``sim.is_forcing_enabled`` (and not
+        ``params.forcing.enable``) in their ``tendencies_nonlin``. The
+        projection and the dealiasing of the nonlinear tendencies at each
+        stage are unchanged: only the additions of the forcing are saved.
+
+        """
+        sim = self.sim
+        if not sim.is_forcing_enabled:
+            self._time_step_RK_without_forcing()
+            return
+
+        # the forcing is not added in sim.tendencies_nonlin
+        sim.is_forcing_enabled = False
+        try:
+            self._time_step_RK_without_forcing()
+        finally:
+            sim.is_forcing_enabled = True
+
+        try:
+            forcing = self._forcing_once_tmp
+        except AttributeError:
+            forcing = self._forcing_once_tmp = np.empty_like(
+                sim.state.state_spect
+            )
+        forcing[:] = sim.forcing.get_forcing()
+        if hasattr(sim, "project_state_spect"):
+            sim.project_state_spect(forcing)
+        sim.oper.dealiasing(forcing)
+
+        add_forcing_once(
+            sim.state.state_spect,
+            self.deltat,
+            self._get_coef_forcing_once(),
+            forcing,
+        )
 
     def _time_step_Euler(self):
         r"""Forward Euler method.
@@ -75,8 +75,7 @@ class TimeSteppingSimple(TimeSteppingBase):
         # execution time seems to be attributed to the function
         # one_time_step_computation by cProfile
         self._time_step_RK()
-        if np.isnan(np.sum(self.sim.state.state_phys[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_finite(self.sim.state.state_phys, is_spectral=False)
 
     def _time_step_RK2(self):
         r"""Advance in time with the Runge-Kutta 2 method.
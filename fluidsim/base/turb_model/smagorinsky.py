@@ -12,7 +12,10 @@ Provides:
 from math import sqrt
 
 from fluidsim.base.turb_model.base import SpecificTurbModelSpectral
-from fluidsim.base.turb_model.stress_tensor import StressTensorComputer3D
+from fluidsim.base.turb_model.stress_tensor import (
+    StressTensorComputer3D,
+    div_fft_from_tensorfft,
+)
 
 
 class SmagorinskyModel(SpecificTurbModelSpectral):
@@ -54,57 +57,29 @@ class SmagorinskyModel(SpecificTurbModelSpectral):
         self.C_nu_T = C * delta**2 * sqrt(2)
 
     def get_forcing(self, **kwargs):
-        ux_fft = kwargs["vx_fft"]
-        uy_fft = kwargs["vy_fft"]
-        uz_fft = kwargs["vz_fft"]
-
-        Sxx, Syy, Szz, Syx, Szx, Szy = self.stress_tensor.compute_stress_tensor(
-            ux_fft, uy_fft, uz_fft
-        )
-        norm = self.stress_tensor.compute_norm(Sxx, Syy, Szz, Syx, Szx, Szy)
-
-        nu_T_2 = 2 * self.C_nu_T * norm
-
-        nuT_2_Sxx = nu_T_2 * Sxx
-        nuT_2_Syy = nu_T_2 * Syy
-        nuT_2_Szz = nu_T_2 * Szz
-
-        nuT_2_Syx = nu_T_2 * Syx
-        nuT_2_Szx = nu_T_2 * Szx
-        nuT_2_Szy = nu_T_2 * Szy
-
         oper = self.sim.oper
-        fft = oper.fft
+        stress_tensor = self.stress_tensor
 
-        nuT_2_Sxx_fft = fft(nuT_2_Sxx)
-        nuT_2_Syy_fft = fft(nuT_2_Syy)
-        nuT_2_Szz_fft = fft(nuT_2_Szz)
-
-        nuT_2_Syx_fft = fft(nuT_2_Syx)
-        nuT_2_Szx_fft = fft(nuT_2_Szx)
-        nuT_2_Szy_fft = fft(nuT_2_Szy)
-
-        # using symmetry of Sij
-        nuT_2_Sxy_fft = nuT_2_Syx_fft
-        nuT_2_Sxz_fft = nuT_2_Szx_fft
-        nuT_2_Syz_fft = nuT_2_Szy_fft
-
-        Kx = oper.Kx
-        Ky = oper.Ky
-        Kz = oper.Kz
-
-        fx_fft = 2j * (
-            Kx * nuT_2_Sxx_fft + Ky * nuT_2_Sxy_fft + Kz * nuT_2_Sxz_fft
-        )
-        fy_fft = 2j * (
-            Kx * nuT_2_Syx_fft + Ky * nuT_2_Syy_fft + Kz * nuT_2_Syz_fft
+        strain_fft, strain = stress_tensor.compute_stress_tensor_stack(
+            kwargs["vx_fft"], kwargs["vy_fft"], kwargs["vz_fft"]
         )
-        fz_fft = 2j * (
-            Kx * nuT_2_Szx_fft + Ky * nuT_2_Szy_fft + Kz * nuT_2_Szz_fft
+        nu_T_2 = stress_tensor.compute_norm_stack(strain)
+        nu_T_2 *= 2 * self.C_nu_T
+        # strain becomes 2 nu_T S_ij (in place)
+        strain *= nu_T_2
+
+        # the 6 independent components (symmetry of Sij) with one call
+        oper.fft_as_arg_stack(strain, strain_fft)
+
+        div_fft_from_tensorfft(
+            oper.Kx,
+            oper.Ky,
+            oper.Kz,
+            strain_fft,
+            2j,
+            self.forcing_fft.get_var("vx_fft"),
+            self.forcing_fft.get_var("vy_fft"),
+            self.forcing_fft.get_var("vz_fft"),
         )
 
-        self.forcing_fft.set_var("vx_fft", fx_fft)
-        self.forcing_fft.set_var("vy_fft", fy_fft)
-        self.forcing_fft.set_var("vz_fft", fz_fft)
-
         return self.forcing_fft
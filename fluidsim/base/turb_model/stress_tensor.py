@@ -13,10 +13,117 @@ Provides:
 
 import numpy as np
 
+from transonic import boost
+
+Af3 = "float64[:,:,:]"
+Ac3 = "complex128[:,:,:]"
+Af4 = "float64[:,:,:,:]"
+Ac4 = "complex128[:,:,:,:]"
+
+
+@boost
+def strain_fft_from_vecfft(
+    Kx: Af3, Ky: Af3, Kz: Af3, ux_fft: Ac3, uy_fft: Ac3, uz_fft: Ac3, out: Ac4
+):
+    """Compute the 6 independent components of the strain rate tensor
+
+    The components (xx, yy, zz, yx, zx, zy) are computed in spectral space (6
+    instead of 9 derivatives to transform).
+
+    """
+    out[0] = 1j * Kx * ux_fft
+    out[1] = 1j * Ky * uy_fft
+    out[2] = 1j * Kz * uz_fft
+    out[3] = 0.5j * (Ky * ux_fft + Kx * uy_fft)
+    out[4] = 0.5j * (Kz * ux_fft + Kx * uz_fft)
+    out[5] = 0.5j * (Kz * uy_fft + Ky * uz_fft)
+
+
+@boost
+def compute_norm_strain(strain: Af4, out: Af3):
+    """Compute the norm of the strain rate tensor from its 6 components"""
+    out[:] = np.sqrt(
+        strain[0] ** 2
+        + strain[1] ** 2
+        + strain[2] ** 2
+        + 2 * (strain[3] ** 2 + strain[4] ** 2 + strain[5] ** 2)
+    )
+
+
+@boost
+def div_fft_from_tensorfft(
+    Kx: Af3,
+    Ky: Af3,
+    Kz: Af3,
+    tensor_fft: Ac4,
+    coef: "float or complex",
+    fx_fft: Ac3,
+    fy_fft: Ac3,
+    fz_fft: Ac3,
+):
+    """Compute ``coef * K_j tensor_ij`` for a symmetric tensor
+
+    ``tensor_fft`` contains the 6 components (xx, yy, zz, yx, zx, zy).
+
+    """
+    fx_fft[:] = coef * (
+        Kx * tensor_fft[0] + Ky * tensor_fft[3] + Kz * tensor_fft[4]
+    )
+    fy_fft[:] = coef * (
+        Kx * tensor_fft[3] + Ky * tensor_fft[1] + Kz * tensor_fft[5]
+    )
+    fz_fft[:] = coef * (
+        Kx * tensor_fft[4] + Ky * tensor_fft[5] + Kz * tensor_fft[2]
+    )
+
 
 class StressTensorComputer3D:
+    """Compute the strain rate tensor
+
+    The methods ending with ``_stack`` work with stacks of the 6 independent
+    components (xx, yy, zz, yx, zx, zy) and write in preallocated arrays.
+
+    """
+
     def __init__(self, oper):
         self.oper = oper
+        self._strain_fft = None
+        self._strain = None
+        self._norm = None
+
+    def _init_workspace(self):
+        oper = self.oper
+        self._strain_fft = np.empty(
+            (6,) + tuple(oper.shapeK_loc), dtype=np.complex128
+        )
+        self._strain = np.empty((6,) + tuple(oper.shapeX_loc))
+        self._norm = np.empty(oper.shapeX_loc)
+
+    def compute_stress_tensor_stack(self, ux_fft, uy_fft, uz_fft):
+        """Return the stacks of the strain rate tensor (spectral and physical)
+
+        The returned arrays are reused at each call.
+
+        """
+        if self._strain is None:
+            self._init_workspace()
+        oper = self.oper
+        strain_fft_from_vecfft(
+            oper.Kx, oper.Ky, oper.Kz, ux_fft, uy_fft, uz_fft, self._strain_fft
+        )
+        oper.ifft_as_arg_stack(self._strain_fft, self._strain, destroy=True)
+        return self._strain_fft, self._strain
+
+    def compute_norm_stack(self, strain):
+        """Return the norm of a stack of strain rate tensors
+
+        The returned array is reused at each call.
+
+        """
+        if self._norm is None:
+            self._init_workspace()
+        compute_norm_strain(strain, self._norm)
+        return self._norm
 
     def grad_from_arr_fft(self, arr_fft):
         dx_arr_fft, dy_arr_fft, dz_arr_fft = self.oper.grad_fft_from_arr_fft(
@@ -1,3 +1,5 @@
+import numpy as np
+
 from fluiddyn.util import mpi
 
 from fluidsim.util.testing import classproperty
@@ -44,3 +46,40 @@ class TestSmagorinsky(TestSimulBase):
             return
 
         sim.output.horiz_means.plot()
+
+        data = sim.output.horiz_means.compute()
+        get_var = sim.state.state_phys.get_var
+        vx, vy, vz = (get_var(key) for key in ("vx", "vy", "vz"))
+        vxp = vx - vx.mean(axis=(1, 2))[:, np.newaxis, np.newaxis]
+        vzp = vz - vz.mean(axis=(1, 2))[:, np.newaxis, np.newaxis]
+        for key, profile in (
+            ("vy", vy.mean(axis=(1, 2))),
+            ("vxp_vxp", (vxp**2).mean(axis=(1, 2))),
+            ("vzp_vxp", (vzp * vxp).mean(axis=(1, 2))),
+        ):
+            assert np.allclose(data[key], profile, rtol=1e-10, atol=0)
+
+    def test_get_forcing(self):
+        sim = self.sim
+        oper = sim.oper
+        velocities_fft = {
+            key: 1e-2 * oper.create_arrayK_random()
+            for key in ("vx_fft", "vy_fft", "vz_fft")
+        }
+        for value in velocities_fft.values():
+            oper.dealiasing(value)
+        forcing_fft = sim.turb_model.get_forcing(**velocities_fft)
+
+        # simple implementation (with many temporary arrays)
+        stress_tensor = sim.turb_model._model.stress_tensor
+        strain = stress_tensor.compute_stress_tensor(*velocities_fft.values())
+        nu_T_2 = 2 * sim.turb_model._model.C_nu_T
+        nu_T_2 *= stress_tensor.compute_norm(*strain)
+        Sxx, Syy, Szz, Syx, Szx, Szy = (oper.fft(nu_T_2 * S) for S in strain)
+        for key, (S_x, S_y, S_z) in (
+            ("vx_fft", (Sxx, Syx, Szx)),
+            ("vy_fft", (Syx, Syy, Szy)),
+            ("vz_fft", (Szx, Szy, Szz)),
+        ):
+            expected = 2j * (oper.Kx * S_x + oper.Ky * S_y + oper.Kz * S_z)
+            assert np.allclose(forcing_fft.get_var(key), expected)
@@ -3,6 +3,13 @@
 
 Numerical method agnostic base operator classes
 
+The methods ``fft_as_arg_stack`` and ``ifft_as_arg_stack`` of
+:class:`OperatorBase` transform stacks of fields. Only the sequential fft
+classes based on pyfftw aggregate the transforms (one execution of a batched
+FFTW plan for all fields). With MPI, there is no aggregation: the fields are
+transformed one by one, with one global transposition per field, i.e. the
+same communications as with a loop over ``fft_as_arg``.
+
 Provides:
 
 .. autoclass:: OperatorBase1D
@@ -14,6 +21,7 @@ Provides:
 import numpy as np
 
 from fluiddyn.util import mpi
+from fluiddyn.calcul.easypyfft import BasePyFFT, nthreads
 
 
 class OperatorBase:
@@ -71,6 +79,156 @@ class OperatorBase:
                     'truncation_shape must be "cubic", "spherical" or "no_multiple_aliases"'
                 )
 
+    def _get_dimX_K(self):
+        try:
+            return tuple(self.oper_fft.get_dimX_K())
+        except AttributeError:
+            # 2d operators
+            return (1, 0) if self.is_transposed else (0, 1)
+
+    def _is_distributed_K(self):
+        return mpi.nb_proc > 1 and not self.is_sequential
+
+    def _get_maps_coarse(self, shapeK_coarse):
+        """Index maps between a coarse sequential array and the local array
+
+        Both arrays are in Fourier space and the coarse array is in the
+        sequential order (``(ky, kx)`` or ``(kz, ky, kx)``). The maps are
+        computed once for each coarse shape (collectively with MPI). The modes
+        of the coarse array owned by each process are stored process after
+        process in ``flat_coarse_all`` (only in process 0).
+
+        """
+        shapeK_coarse = tuple(int(n) for n in shapeK_coarse)
+        try:
+            cache = self._cache_maps_coarse
+        except AttributeError:
+            cache = self._cache_maps_coarse = {}
+        try:
+            return cache[shapeK_coarse]
+        except KeyError:
+            pass
+
+        ndim = len(shapeK_coarse)
+        strides = [int(np.prod(shapeK_coarse[dim + 1 :])) for dim in range(ndim)]
+
+        iks_loc = []
+        iks_coarse = []
+        for dimK, dimX in enumerate(self._get_dimX_K()):
+            nkc = shapeK_coarse[dimX]
+            nk = self.shapeK_seq[dimK]
+            ikcs = np.arange(min(nkc, nk))
+            if dimX == ndim - 1:
+                # kx (dimension of the real-to-complex transform)
+                iks = ikcs
+            else:
+                iks = np.where(ikcs <= nkc / 2, ikcs, ikcs - nkc + nk)
+            start = self.seq_indices_first_K[dimK]
+            cond = (iks >= start) & (iks < start + self.shapeK_loc[dimK])
+            iks_loc.append(iks[cond] - start)
+            iks_coarse.append(strides[dimX] * ikcs[cond])
+
+        maps = {
+            "indices_loc": tuple(
+                indices.ravel()
+                for indices in np.meshgrid(*iks_loc, indexing="ij")
+            ),
+            "flat_coarse": sum(np.meshgrid(*iks_coarse, indexing="ij"))
+            .ravel()
+            .astype(np.int64),
+        }
+
+        if self._is_distributed_K():
+            flat_coarse = maps["flat_coarse"]
+            counts = np.array(mpi.comm.allgather(flat_coarse.size))
+            displs = np.concatenate(([0], np.cumsum(counts[:-1])))
+            if mpi.rank == 0:
+                flat_coarse_all = np.empty(counts.sum(), dtype=np.int64)
+                recvbuf = [flat_coarse_all, counts, displs, mpi.MPI.INT64_T]
+            else:
+                flat_coarse_all = recvbuf = None
+            mpi.comm.Gatherv(flat_coarse, recvbuf, root=0)
+            maps.update(
+                counts=counts, displs=displs, flat_coarse_all=flat_coarse_all
+            )
+
+        cache[shapeK_coarse] = maps
+        return maps
+
+    def _put_coarse_array(self, arr_coarse, arr, shapeK_coarse):
+        """Put a coarse sequential array (in process 0) in a local array
+
+        ``arr`` can contain many variables (first dimension), which are
+        distributed with only one ``Scatterv``.
+
+        """
+        maps = self._get_maps_coarse(shapeK_coarse)
+        indices = (slice(None),) + maps["indices_loc"]
+        arrs = arr if arr.ndim == len(shapeK_coarse) + 1 else arr[np.newaxis]
+        nb_vars = arrs.shape[0]
+
+        if not self._is_distributed_K():
+            arr_coarse = arr_coarse.reshape(nb_vars, -1)
+            arrs[indices] = arr_coarse[:, maps["flat_coarse"]]
+            return
+
+        values_loc = np.empty(
+            (maps["flat_coarse"].size, nb_vars), dtype=np.complex128
+        )
+        if mpi.rank == 0:
+            values = arr_coarse.reshape(nb_vars, -1).T[maps["flat_coarse_all"]]
+            sendbuf = [
+                np.ascontiguousarray(values, dtype=np.complex128),
+                nb_vars * maps["counts"],
+                nb_vars * maps["displs"],
+                mpi.MPI.DOUBLE_COMPLEX,
+            ]
+        else:
+            sendbuf = None
+        mpi.comm.Scatterv(sendbuf, values_loc, root=0)
+        arrs[indices] = values_loc.T
+
+    def _coarse_seq_from_fft(self, f_fft, shapeK_coarse):
+        """Gather the coarse modes of a local array in process 0
+
+        ``f_fft`` can contain many variables (first dimension), which are
+        gathered with only one ``Gatherv``. Return None in processes other
+        than 0.
+
+        """
+        shapeK_coarse = tuple(shapeK_coarse)
+        maps = self._get_maps_coarse(shapeK_coarse)
+        indices = (slice(None),) + maps["indices_loc"]
+        is_multi = f_fft.ndim == len(shapeK_coarse) + 1
+        f_ffts = f_fft if is_multi else f_fft[np.newaxis]
+        nb_vars = f_ffts.shape[0]
+        values = np.ascontiguousarray(f_ffts[indices].T, dtype=np.complex128)
+
+        if not self._is_distributed_K():
+            flat_coarse = maps["flat_coarse"]
+        else:
+            if mpi.rank == 0:
+                flat_coarse = maps["flat_coarse_all"]
+                values_all = np.empty((flat_coarse.size, nb_vars), np.complex128)
+                recvbuf = [
+                    values_all,
+                    nb_vars * maps["counts"],
+                    nb_vars * maps["displs"],
+                    mpi.MPI.DOUBLE_COMPLEX,
+                ]
+            else:
+                recvbuf = None
+            mpi.comm.Gatherv(values, recvbuf, root=0)
+            if mpi.rank > 0:
+                return None
+            values = values_all
+
+        fc_fft = np.zeros((nb_vars, int(np.prod(shapeK_coarse))), np.complex128)
+        fc_fft[:, flat_coarse] = values.T
+        if is_multi:
+            return fc_fft.reshape((nb_vars,) + shapeK_coarse)
+        return fc_fft.reshape(shapeK_coarse)
+
     def mean_space(self, arr):
         if mpi.nb_proc == 1 or self.is_sequential:
             return np.mean(arr)
@@ -80,6 +238,131 @@ class OperatorBase:
         nb_points_global = mpi.comm.allreduce(nb_points_local, op=mpi.MPI.SUM)
         return sum_global / nb_points_global
 
+    def _get_plans_stack(self, nb_fields):
+        """Batched FFTW plans for stacks of ``nb_fields`` fields (or None)
+
+        Only the sequential classes based on pyfftw support batched transforms
+        (one execution of FFTW for all fields). For the other fft classes (in
+        particular the MPI ones), None is returned and the fields are
+        transformed one by one.
+
+        """
+        try:
+            cache = self._cache_plans_stack
+        except AttributeError:
+            cache = self._cache_plans_stack = {}
+        try:
+            return cache[nb_fields]
+        except KeyError:
+            pass
+
+        oper_fft = getattr(self, "oper_fft", None)
+        if nb_fields < 2 or not isinstance(oper_fft, BasePyFFT):
+            cache[nb_fields] = None
+            return None
+
+        import pyfftw
+
+        arrayX = pyfftw.empty_aligned((nb_fields,) + tuple(oper_fft.shapeX))
+        arrayK = pyfftw.empty_aligned(
+            (nb_fields,) + tuple(oper_fft.shapeK), dtype=np.complex128
+        )
+        axes = tuple(range(1, arrayX.ndim))
+        kwargs = dict(axes=axes, threads=nthreads)
+        plans = cache[nb_fields] = {
+            "fft": pyfftw.FFTW(
+                arrayX, arrayK, direction="FFTW_FORWARD", **kwargs
+            ),
+            "ifft": pyfftw.FFTW(
+                arrayK, arrayX, direction="FFTW_BACKWARD", **kwargs
+            ),
+            "arrayX": arrayX,
+            "arrayK": arrayK,
+            "inv_coef_norm": oper_fft.inv_coef_norm,
+        }
+        return plans
+
+    def fft_as_arg_stack(self, fields, fields_fft):
+        """Forward fft of a stack of fields
+
+        ``fields`` and ``fields_fft`` are arrays with the fields along their
+        first dimension (for example slices of a :class:`SetOfVariables`) or
+        sequences of arrays. With the sequential fft classes based on pyfftw,
+        all the fields are transformed with one call to the fft library.
+
+        With the other fft classes, in particular the MPI ones, the fields
+        are transformed one by one. Under MPI, this function therefore does
+        not aggregate the communications (one global transposition per
+        field).
+
+        """
+        plans = self._get_plans_stack(len(fields))
+        if plans is None:
+            for field, field_fft in zip(fields, fields_fft):
+                self.fft_as_arg(field, field_fft)
+            return
+
+        if not isinstance(fields, np.ndarray):
+            arrayX = plans["arrayX"]
+            for field, field_buffer in zip(fields, arrayX):
+                field_buffer[...] = field
+            fields = arrayX
+
+        arrayK = plans["arrayK"]
+        if isinstance(fields_fft, np.ndarray):
+            try:
+                plans["fft"](input_array=fields, output_array=fields_fft)
+            except ValueError:
+                # output array not aligned
+                plans["fft"](input_array=fields, output_array=arrayK)
+                fields_fft[...] = arrayK
+            fields_fft *= plans["inv_coef_norm"]
+        else:
+            plans["fft"](input_array=fields, output_array=arrayK)
+            for field_fft, field_buffer in zip(fields_fft, arrayK):
+                np.multiply(field_buffer, plans["inv_coef_norm"], out=field_fft)
+
+    def ifft_as_arg_stack(self, fields_fft, fields, destroy=False):
+        """Inverse fft of a stack of fields (see :func:`fft_as_arg_stack`)
+
+        If ``destroy`` is True, ``fields_fft`` can be modified. As for
+        :func:`fft_as_arg_stack`, there is no aggregation under MPI.
+
+        """
+        plans = self._get_plans_stack(len(fields))
+        if plans is None:
+            ifft_as_arg = self.ifft_as_arg
+            if destroy:
+                ifft_as_arg = getattr(self, "ifft_as_arg_destroy", ifft_as_arg)
+            for field_fft, field in zip(fields_fft, fields):
+                ifft_as_arg(field_fft, field)
+            return
+
+        if not destroy or not isinstance(fields_fft, np.ndarray):
+            # needed because the input of c2r transforms is destroyed
+            arrayK = plans["arrayK"]
+            for field_fft, field_buffer in zip(fields_fft, arrayK):
+                field_buffer[...] = field_fft
+            fields_fft = arrayK
+
+        arrayX = plans["arrayX"]
+        if isinstance(fields, np.ndarray):
+            try:
+                plans["ifft"](
+                    input_array=fields_fft,
+                    output_array=fields,
+                    normalise_idft=False,
+                )
+                return
+            except ValueError:
+                # output array not aligned
+                pass
+        plans["ifft"](
+            input_array=fields_fft, output_array=arrayX, normalise_idft=False
+        )
+        for field, field_buffer in zip(fields, arrayX):
+            field[...] = field_buffer
+
 
 class OperatorsBase1D(OperatorBase):
     @staticmethod
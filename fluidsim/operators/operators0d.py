@@ -9,6 +9,8 @@ Provides
 
 """
 
+import numpy as np
+
 from fluiddyn.util import mpi
 
 
@@ -18,7 +20,21 @@ class Operators0D:
     @staticmethod
     def _complete_params_with_default(params):
         """This static method is used to complete the *params* container."""
-        params._set_child("oper")
+        params._set_child("oper", attribs={"nb_members": 1})
+        params.oper._set_doc(
+            """
+nb_members: int (default 1)
+
+    Number of members of an ensemble of simulations computed together. For
+    ``nb_members > 1``, the variables are arrays of shape ``(nb_members,)``
+    (one value per member), so that all members are advanced in time with the
+    same vectorized operations. The parameters of the solvers given as
+    sequences of ``nb_members`` values are used member by member. The
+    ensembles of all solvers (0D and pseudo-spectral) can be created with
+    :func:`fluidsim.base.solvers.ensemble.create_ensemble`.
+
+"""
+        )
 
     def __init__(self, params=None, SEQUENTIAL=None):
         if mpi.nb_proc > 1:
@@ -26,18 +42,53 @@ class Operators0D:
 
         self.params = params
         self.axes = tuple()
-        self.shapeX_seq = self.shapeX_loc = []
+        try:
+            self.nb_members = params.oper.nb_members
+        except AttributeError:
+            # loading an old simulation?
+            self.nb_members = 1
+        if self.nb_members > 1:
+            self.shapeX_seq = self.shapeX_loc = [self.nb_members]
+        else:
+            self.shapeX_seq = self.shapeX_loc = []
 
     def produce_str_describing_oper(self):
         """Produce a string describing the operator."""
-
+        if self.nb_members > 1:
+            return f"{self.nb_members}members"
         return ""
 
     def produce_long_str_describing_oper(self):
         """Produce a string describing the operator."""
-
+        if self.nb_members > 1:
+            return f"0d simulation (ensemble of {self.nb_members} members)\n"
         return "0d simulation\n"
 
+    def get_values_members(self, value, name="value"):
+        """Get a parameter as a float or as an array of one value per member
+
+        Parameters
+        ----------
+
+        value : float or sequence of floats
+
+          Value common to all members or sequence of ``nb_members`` values.
+
+        name : str
+
+          Name of the parameter (used for the error message).
+
+        """
+        value = np.asarray(value, dtype=float)
+        if value.size == 1:
+            return float(value.reshape(()))
+        if value.shape != (self.nb_members,):
+            raise ValueError(
+                f"{name} should be a number or a sequence of "
+                f"nb_members = {self.nb_members} values (shape {value.shape})"
+            )
+        return value
+
     def gather_Xspace(self, a):
         """Gather an array (mpi), in this case, just return the array."""
         return a
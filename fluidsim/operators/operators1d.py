@@ -32,7 +32,7 @@ class OperatorsPseudoSpectral1D(OperatorsBase1D):
 
         assert params.oper.type_fft == "sequential"
         nx = params.oper.nx
-        opfft = FFTW1DReal2Complex(nx)
+        opfft = self.oper_fft = FFTW1DReal2Complex(nx)
         self.fft = opfft.fft
         self.ifft = opfft.ifft
         self.fft_as_arg = opfft.fft_as_arg
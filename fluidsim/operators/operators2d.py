@@ -262,61 +262,8 @@ class OperatorsPseudoSpectral2D(_Operators, OperatorBase):
         return self.fft(self.ifft(f_fft))
 
     def coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
-        """Return a coarse field in K space."""
-        nkyc = shapeK_loc_coarse[0]
-        nkxc = shapeK_loc_coarse[1]
-
-        if nb_proc == 1:
-            nky = self.shapeK_seq[0]
-            fc_fft = np.empty([nkyc, nkxc], np.complex128)
-            for ikyc in range(nkyc):
-                if ikyc <= nkyc / 2:
-                    iky = ikyc
-                else:
-                    kynodim = ikyc - nkyc
-                    iky = kynodim + nky
-                for ikxc in range(nkxc):
-                    fc_fft[ikyc, ikxc] = f_fft[iky, ikxc]
-
-            return fc_fft
-
-        if not self.is_transposed:
-            raise NotImplementedError()
-
-        fc_trans = np.empty([nkxc, nkyc], np.complex128)
-        nky = self.shapeK_seq[1]
-        f1d_temp = np.empty([nkyc], np.complex128)
-
-        for ikxc in range(nkxc):
-            kx = self.deltakx * ikxc
-            rank_ikx, ikxloc, ikyloc = self.where_is_wavenumber(kx, 0.0)
-            if rank == rank_ikx:
-                # create f1d_temp
-                for ikyc in range(nkyc):
-                    if ikyc <= nkyc / 2:
-                        iky = ikyc
-                    else:
-                        kynodim = ikyc - nkyc
-                        iky = kynodim + nky
-                    f1d_temp[ikyc] = f_fft[ikxloc, iky]
-
-            if rank_ikx != 0:
-                # message f1d_temp
-                if rank == 0:
-                    # print('f1d_temp', f1d_temp, f1d_temp.dtype)
-                    comm.Recv(
-                        [f1d_temp, MPI.DOUBLE_COMPLEX],
-                        source=rank_ikx,
-                        tag=ikxc,
-                    )
-                elif rank == rank_ikx:
-                    comm.Send([f1d_temp, MPI.DOUBLE_COMPLEX], dest=0, tag=ikxc)
-            if rank == 0:
-                # copy into fc_trans
-                fc_trans[ikxc] = f1d_temp.copy()
-        fc_fft = fc_trans.transpose()
-
-        return fc_fft
+        """Return a coarse field in K space (None in processes other than 0)."""
+        return self._coarse_seq_from_fft(f_fft, shapeK_loc_coarse)
 
     # def fft_loc_from_coarse_seq(self, fc_fft, shapeK_loc_coarse):
     #     """Return a large field in K space."""
@@ -527,81 +474,22 @@ class OperatorsPseudoSpectral2D(_Operators, OperatorBase):
     ):
         """Put the values contained in a coarse array in an array.
 
-        Both arrays are in Fourier space.
+        Both arrays are in Fourier space. The arrays can contain many
+        variables (3d arrays), which are then distributed in one MPI call.
 
         """
-        if arr.ndim == 3:
-            if mpi.rank == 0:
-                if arr_coarse.ndim != 3:
-                    raise ValueError
-
-            for ikey in range(arr.shape[0]):
-                if mpi.rank == 0:
-                    arr2d_coarse = arr_coarse[ikey]
-                else:
-                    arr2d_coarse = None
-                self.put_coarse_array_in_array_fft(
-                    arr2d_coarse, arr[ikey], oper_coarse, shapeK_loc_coarse
-                )
-            return
-
-        nKyc, nKxc = shapeK_loc_coarse
-
-        if mpi.nb_proc > 1 and not self.is_sequential:
-            if not self.is_transposed:
-                raise NotImplementedError()
-
-            nKy = self.shapeK_seq[1]
-
-            if mpi.rank == 0:
-                fck_fft = arr_coarse.transpose()
-
-            for ikxc in range(nKxc):
-                kx = self.deltakx * ikxc
-                rank_ikx, ikxloc, ikyloc = self.where_is_wavenumber(kx, 0.0)
-
-                if mpi.rank == 0:
-                    fc1D = fck_fft[ikxc]
-
-                if rank_ikx != 0:
-                    # message fc1D
-                    if mpi.rank == rank_ikx:
-                        fc1D = np.empty([nKyc], dtype=np.complex128)
-                    if mpi.rank == 0 or mpi.rank == rank_ikx:
-                        fc1D = np.ascontiguousarray(fc1D)
-                    if mpi.rank == 0:
-                        mpi.comm.Send(
-                            [fc1D, mpi.MPI.COMPLEX], dest=rank_ikx, tag=ikxc
-                        )
-                    elif mpi.rank == rank_ikx:
-                        mpi.comm.Recv([fc1D, mpi.MPI.COMPLEX], source=0, tag=ikxc)
-                if mpi.rank == rank_ikx:
-                    # copy
-                    for ikyc in range(nKyc):
-                        if ikyc <= nKyc / 2.0:
-                            iky = ikyc
-                        else:
-                            kynodim = ikyc - nKyc
-                            iky = kynodim + nKy
-                        arr[ikxloc, iky] = fc1D[ikyc]
-        else:
-            nKy = self.shapeK_seq[0]
+        if arr.ndim == 3 and mpi.rank == 0 and arr_coarse.ndim != 3:
+            raise ValueError
 
-            if not np.allclose(0.0, max(abs(arr_coarse[nKyc // 2, :]))):
+        if not self._is_distributed_K():
+            nKyc, nKxc = shapeK_loc_coarse
+            if not np.allclose(0.0, abs(arr_coarse[..., nKyc // 2, :]).max()):
                 raise ValueError("any(arr_coarse[nKyc//2] != 0)")
 
-            if not np.allclose(0.0, max(abs(arr_coarse[:, nKxc - 1]))):
+            if not np.allclose(0.0, abs(arr_coarse[..., nKxc - 1]).max()):
                 raise ValueError("any(arr_coarse[:, nKxc-1] != 0)")
 
-            for ikyc in range(nKyc):
-                if ikyc <= nKyc / 2.0:
-                    iky = ikyc
-                else:
-                    kynodim = ikyc - nKyc
-                    iky = kynodim + nKy
-
-                for ikxc in range(nKxc):
-                    arr[iky, ikxc] = arr_coarse[ikyc, ikxc]
+        self._put_coarse_array(arr_coarse, arr, shapeK_loc_coarse)
 
     def get_grid1d_seq(self, axis="x"):
         if axis not in ("x", "y"):
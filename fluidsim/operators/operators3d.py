@@ -100,10 +100,138 @@ def compute_energy_from_3fields(vx: Ac, vy: Ac, vz: Ac):
     return 0.5 * (np.abs(vx) ** 2 + np.abs(vy) ** 2 + np.abs(vz) ** 2)
 
 
+A4f = Array[np.float64, "4d"]
+A1f = Array[np.float64, "1d"]
+A1i = Array[np.int32, "1d"]
+Ai = Array[np.int32, "3d"]
+
+
+@boost
+def loop_spectra_stack(
+    energies: A4f,
+    coefs0: A1f,
+    coefs1: A1f,
+    coefs2: A1f,
+    ibins0: A1i,
+    ibins1: A1i,
+    ibins2: A1i,
+    nk0: int,
+    nk1: int,
+    nk2: int,
+    ik3d: Ai,
+    share3d: Af,
+    nk3d: int,
+    ikzkh: Ai,
+    sharekzkh: Af,
+    nkzkh: int,
+):
+    """Bin a stack of energy densities in one traversal.
+
+    The 1d spectra along the 3 dimensions of the spectral arrays, the 3d
+    spectrum and (if ``nkzkh > 0``) the kz-kh spectrum of each energy are
+    stored in one line of the returned 2d array. The 3d and kz-kh blocks
+    have one additional (padding) element.
+
+    """
+    nvar, n0, n1, n2 = energies.shape
+    start3d = nk0 + nk1 + nk2
+    startkzkh = start3d + nk3d + 1
+    if nkzkh > 0:
+        size = startkzkh + nkzkh + 1
+    else:
+        size = startkzkh
+    result = np.zeros((nvar, size))
+    for i0 in range(n0):
+        coef0 = coefs0[i0]
+        ib0 = ibins0[i0]
+        for i1 in range(n1):
+            coef01 = coef0 * coefs1[i1]
+            ib1 = nk0 + ibins1[i1]
+            for i2 in range(n2):
+                coef = coef01 * coefs2[i2]
+                ib2 = nk0 + nk1 + ibins2[i2]
+                i3d = start3d + ik3d[i0, i1, i2]
+                s3d = share3d[i0, i1, i2]
+                for iv in range(nvar):
+                    value = coef * energies[iv, i0, i1, i2]
+                    result[iv, ib0] += value
+                    result[iv, ib1] += value
+                    result[iv, ib2] += value
+                    result[iv, i3d] += (1 - s3d) * value
+                    result[iv, i3d + 1] += s3d * value
+                if nkzkh > 0:
+                    ikk = startkzkh + ikzkh[i0, i1, i2]
+                    skk = sharekzkh[i0, i1, i2]
+                    for iv in range(nvar):
+                        value = coef * energies[iv, i0, i1, i2]
+                        result[iv, ikk] += (1 - skk) * value
+                        result[iv, ikk + 1] += skk * value
+    return result
+
+
+def loop_spectra_stack_numpy(
+    energies: A4f,
+    coefs0: A1f,
+    coefs1: A1f,
+    coefs2: A1f,
+    ibins0: A1i,
+    ibins1: A1i,
+    ibins2: A1i,
+    nk0: int,
+    nk1: int,
+    nk2: int,
+    ik3d: Ai,
+    share3d: Af,
+    nk3d: int,
+    ikzkh: Ai,
+    sharekzkh: Af,
+    nkzkh: int,
+):
+    """Equivalent of :func:`loop_spectra_stack` based on np.bincount"""
+    nvar = energies.shape[0]
+    coefs = coefs0[:, None, None] * coefs1[None, :, None] * coefs2[None, None, :]
+    start3d = nk0 + nk1 + nk2
+    startkzkh = start3d + nk3d + 1
+    if nkzkh > 0:
+        size = startkzkh + nkzkh + 1
+    else:
+        size = startkzkh
+    result = np.zeros((nvar, size))
+    ik3d = ik3d.ravel()
+    share3d = share3d.ravel()
+    ikzkh = ikzkh.ravel()
+    sharekzkh = sharekzkh.ravel()
+    for iv in range(nvar):
+        values = coefs * energies[iv]
+        result[iv, :nk0] = np.bincount(
+            ibins0, weights=values.sum(axis=(1, 2)), minlength=nk0
+        )
+        result[iv, nk0 : nk0 + nk1] = np.bincount(
+            ibins1, weights=values.sum(axis=(0, 2)), minlength=nk1
+        )
+        result[iv, nk0 + nk1 : start3d] = np.bincount(
+            ibins2, weights=values.sum(axis=(0, 1)), minlength=nk2
+        )
+        values = values.ravel()
+        tmp = share3d * values
+        spectrum = np.bincount(ik3d, weights=values - tmp, minlength=nk3d + 1)
+        spectrum[1:] += np.bincount(ik3d, weights=tmp, minlength=nk3d)
+        result[iv, start3d:startkzkh] = spectrum
+        if nkzkh > 0:
+            tmp = sharekzkh * values
+            spectrum = np.bincount(
+                ikzkh, weights=values - tmp, minlength=nkzkh + 1
+            )
+            spectrum[1:] += np.bincount(ikzkh, weights=tmp, minlength=nkzkh)
+            result[iv, startkzkh:] = spectrum
+    return result
+
+
 if not ts.is_transpiling and not ts.is_compiled and not _is_testing:
     # for example if Pythran is not available
     dealiasing_variable = dealiasing_variable_numpy
     dealiasing_setofvar = dealiasing_setofvar_numpy
+    loop_spectra_stack = loop_spectra_stack_numpy
 elif ts.is_transpiling:
     _Operators = object
 
@@ -346,310 +474,17 @@ Lx, Ly and Lz: float
     ):
         """Put the values contained in a coarse array in an array.
 
-        Both arrays are in Fourier space.
+        Both arrays are in Fourier space. The arrays can contain many
+        variables (4d arrays), which are then distributed in one MPI call.
 
         """
-        if arr.ndim == 4:
-            if rank == 0:
-                if arr_coarse.ndim != 4:
-                    raise ValueError
-
-            for ikey in range(arr.shape[0]):
-                if rank == 0:
-                    arr3d_coarse = arr_coarse[ikey]
-                else:
-                    arr3d_coarse = None
-                self.put_coarse_array_in_array_fft(
-                    arr3d_coarse, arr[ikey], oper_coarse, shapeK_coarse
-                )
-            return
-
-        nkzc, nkyc, nkxc = nk0c, nk1c, nk2c = shapeK_coarse
-        nk0, nk1, nk2 = self.shapeK_seq
-
-        if nb_proc == 1:
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        arr[ikz, iky, ikxc] = arr_coarse[ikzc, ikyc, ikxc]
-            return
-
-        for position_x_K in range(3):
-            if self.dimX_K[position_x_K] == 2:
-                break
-
-        if self.dimX_K == (1, 0, 2):
-            if rank == 0:
-                fck_fft = np.zeros((nkyc, nkzc, nkxc), dtype=np.complex128)
-                for i0 in range(nkzc):
-                    for i1 in range(nkyc):
-                        fck_fft[i1, i0, :] = arr_coarse[i0, i1, :]
-            nk0c, nk1c, nk2c = nkyc, nkzc, nkxc
-            assert position_x_K == 2
-        elif self.dimX_K == (2, 1, 0):
-            if rank == 0:
-                fck_fft = np.zeros((nkxc, nkyc, nkzc), dtype=np.complex128)
-                for i0 in range(nkzc):
-                    for i1 in range(nkyc):
-                        for i2 in range(nkxc):
-                            fck_fft[i2, i1, i0] = arr_coarse[i0, i1, i2]
-            nk0c, nk1c, nk2c = nkxc, nkyc, nkzc
-            assert position_x_K == 0
-        elif self.dimX_K == (0, 1, 2):
-            if rank == 0:
-                fck_fft = arr_coarse
-            nk0c, nk1c, nk2c = nkzc, nkyc, nkxc
-            assert position_x_K == 2
-        elif self.dimX_K == (1, 2, 0):
-            if rank == 0:
-                fck_fft = np.zeros((nkyc, nkxc, nkzc), dtype=np.complex128)
-                for iz in range(nkzc):
-                    for iy in range(nkyc):
-                        for ix in range(nkxc):
-                            fck_fft[iy, ix, iz] = arr_coarse[iz, iy, ix]
-            nk0c, nk1c, nk2c = nkyc, nkxc, nkzc
-            assert position_x_K == 1
-        else:
-            raise NotImplementedError
-
-        # if rank == 0:
-        #     print(f"{fck_fft = }")
-
-        if self.shapeK_loc[1:2] == self.shapeK_seq[1:2]:
-            ik1c = 0
-            ik2c = 0
-            for ik0c in range(min(nk0c, nk0)):
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0, is_x=(position_x_K == 0))
-
-                rank_ik, ik0loc, ik1loc, ik2loc = self.where_is_wavenumber(
-                    ik0, ik1c, ik2c
-                )
-                # print(f"{ik0 = } => {(rank_ik, ik0loc) = }")
-                if rank == 0:
-                    fc2d = fck_fft[ik0c, :, :]
-                if rank_ik != 0:
-                    # message fc2d
-                    if rank == rank_ik:
-                        fc2d = np.empty([nk1c, nk2c], dtype=np.complex128)
-                    if rank == 0 or rank == rank_ik:
-                        fc2d = np.ascontiguousarray(fc2d)
-                    if rank == 0:
-                        mpi.comm.Send(
-                            [fc2d, mpi.MPI.COMPLEX], dest=rank_ik, tag=ik0c
-                        )
-                    elif rank == rank_ik:
-                        mpi.comm.Recv([fc2d, mpi.MPI.COMPLEX], source=0, tag=ik0c)
-                if rank == rank_ik:
-                    # copy
-                    if self.dimX_K == (1, 0, 2):
-                        for ik1c in range(nk1c):
-                            ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                            arr[ik0loc, ik1, 0:nk2c] = fc2d[ik1c, :]
-                    elif self.dimX_K == (2, 1, 0):
-                        for ik1c in range(nk1c):
-                            ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                            for ik2c in range(nk2c):
-                                ik2 = _ik_from_ikc(ik2c, nk2c, nk2)
-                                # print(f"{ik0loc, ik1, ik2 = }; {ik1c, ik2c = }")
-                                arr[ik0loc, ik1, ik2] = fc2d[ik1c, ik2c]
-                    else:
-                        raise NotImplementedError
-
-        elif self.shapeK_loc[2] == self.shapeK_seq[2]:
-            ik2c = 0
-            for ik0c in range(min(nk0c, nk0)):
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0, is_x=(position_x_K == 0))
-                for ik1c in range(min(nk1c, nk1)):
-                    ik1 = _ik_from_ikc(ik1c, nk1c, nk1, is_x=(position_x_K == 1))
-                    rank_ik, ik0loc, ik1loc, ik2loc = self.where_is_wavenumber(
-                        ik0, ik1, ik2c
-                    )
-                    # print(f"{(ik0, ik1, ik2c) = } => {(rank_ik, ik0loc, ik1loc, ik2loc) = }")
-                    if rank == 0:
-                        fc1d = fck_fft[ik0c, ik1c, :]
-
-                    if rank_ik != 0:
-                        # message fc1d
-                        if rank == rank_ik:
-                            fc1d = np.empty(nk2c, dtype=np.complex128)
-                        if rank == 0:
-                            fc1d = np.ascontiguousarray(fc1d)
-                            mpi.comm.Send(
-                                [fc1d, mpi.MPI.COMPLEX], dest=rank_ik, tag=ik0c
-                            )
-                        elif rank == rank_ik:
-                            mpi.comm.Recv(
-                                [fc1d, mpi.MPI.COMPLEX], source=0, tag=ik0c
-                            )
-                    if rank == rank_ik:
-                        if position_x_K == 2:
-                            arr[ik0loc, ik1loc, :nk2c] = fc1d
-                        else:
-                            tmp = nk2c // 2 + 1
-                            arr[ik0loc, ik1loc, :tmp] = fc1d[:tmp]
-                            tmp = -nk2c // 2 + 1
-                            arr[ik0loc, ik1loc, tmp:] = fc1d[tmp:]
-
-        else:
-            for ik0c in range(min(nk0c, nk0)):
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0, is_x=(position_x_K == 0))
-                for ik1c in range(min(nk1c, nk1)):
-                    ik1 = _ik_from_ikc(ik1c, nk1c, nk1, is_x=(position_x_K == 1))
-                    for ik2c in range(min(nk2c, nk2)):
-                        ik2 = _ik_from_ikc(
-                            ik2c, nk2c, nk2, is_x=(position_x_K == 2)
-                        )
-                        (
-                            rank_ik,
-                            ik0loc,
-                            ik1loc,
-                            ik2loc,
-                        ) = self.where_is_wavenumber(ik0, ik1, ik2)
-                        # print(f"{(ik0, ik1, ik2) = } => {(rank_ik, ik0loc, ik1loc, ik2loc) = }")
-                        if rank == 0:
-                            fc0D = fck_fft[ik0c, ik1c, ik2c]
-                        if rank_ik != 0:
-                            # message fc0D
-                            if rank == 0:
-                                comm.send(fc0D, dest=rank_ik, tag=ik0c)
-                            elif rank == rank_ik:
-                                fc0D = comm.recv(source=0, tag=ik0c)
-                        if rank == rank_ik:
-                            # copy
-                            if self.dimX_K == (0, 1, 2):
-                                arr[ik0loc, ik1loc, ik2loc] = fc0D
-                            else:
-                                raise NotImplementedError
+        if arr.ndim == 4 and rank == 0 and arr_coarse.ndim != 4:
+            raise ValueError
+        self._put_coarse_array(arr_coarse, arr, shapeK_coarse)
 
     def coarse_seq_from_fft_loc(self, f_fft, shapeK_coarse):
-        """Return a coarse field in K space."""
-        nkzc, nkyc, nkxc = shapeK_coarse
-
-        if nb_proc == 1:
-            fc_fft = np.empty(shapeK_coarse, np.complex128)
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        fc_fft[ikzc, ikyc, ikxc] = f_fft[ikz, iky, ikxc]
-            return fc_fft
-
-        for position_x_K in range(3):
-            if self.dimX_K[position_x_K] == 2:
-                break
-
-        nkzc, nkyc, nkxc = shapeK_coarse
-        if self.dimX_K == (1, 0, 2):
-            nk0c, nk1c, nk2c = nkyc, nkzc, nkxc
-        elif self.dimX_K == (2, 1, 0):
-            nk0c, nk1c, nk2c = nkxc, nkyc, nkzc
-        elif self.dimX_K == (0, 1, 2):
-            nk0c, nk1c, nk2c = nkzc, nkyc, nkxc
-        elif self.dimX_K == (1, 2, 0):
-            nk0c, nk1c, nk2c = nkyc, nkxc, nkzc
-        else:
-            raise NotImplementedError
-
-        fc_fft_tmp = np.zeros([nk0c, nk1c, nk2c], np.complex128)
-        nk0, nk1, nk2 = self.shapeK_seq
-        if self.shapeK_seq[1:2] == self.shapeK_loc[1:2]:
-            f1d_temp = np.empty([nk1c, nk2c], np.complex128)
-
-            for ik0c in range(min(nk0c, nk0)):
-                ik1c = 0
-                ik2c = 0
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0, is_x=(position_x_K == 0))
-                rank_ik, ik0loc, ik1loc, ik1loc = self.where_is_wavenumber(
-                    ik0, ik1c, ik2c
-                )
-                if rank == rank_ik:
-                    # create f1d_temp
-                    if self.dimX_K == (1, 0, 2):
-                        for ik1c in range(nk1c):
-                            ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                            f1d_temp[ik1c, :] = f_fft[ik0loc, ik1, 0:nk2c]
-                    else:
-                        for ik1c in range(nk1c):
-                            ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                            for ik2c in range(nk2c):
-                                ik2 = _ik_from_ikc(ik2c, nk2c, nk2)
-                                f1d_temp[ik1c, ik2c] = f_fft[ik0loc, ik1, ik2]
-
-                if rank_ik != 0:
-                    # message f1d_temp
-                    if rank == 0:
-                        comm.Recv(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX],
-                            source=rank_ik,
-                            tag=ik0c,
-                        )
-                    elif rank == rank_ik:
-                        comm.Send(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX], dest=0, tag=ik0c
-                        )
-                if rank == 0:
-                    # copy into fc_fft
-                    fc_fft_tmp[ik0c] = f1d_temp.copy()
-        else:
-            for ik0c in range(min(nk0c, nk0)):
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0, is_x=(position_x_K == 0))
-                for ik1c in range(min(nk1c, nk1)):
-                    ik1 = _ik_from_ikc(ik1c, nk1c, nk1, is_x=(position_x_K == 1))
-                    for ik2c in range(min(nk2c, nk2)):
-                        ik2 = _ik_from_ikc(
-                            ik2c, nk2c, nk2, is_x=(position_x_K == 2)
-                        )
-                        # print(f"{(ik0c, ik1c, ik2c) = }")
-                        (
-                            rank_ik,
-                            ik0loc,
-                            ik1loc,
-                            ik2loc,
-                        ) = self.where_is_wavenumber(ik0, ik1, ik2)
-                        # print(f"{(ik0, ik1, ik2) = } => {(rank_ik, ik0loc, ik1loc, ik2loc) = }")
-
-                        if rank == rank_ik:
-                            f0d_temp = f_fft[ik0loc, ik1loc, ik2loc]
-                            # print(f"{(rank_ik, ik0loc, ik1loc, ik2loc) = }, {f0d_temp = }")
-
-                        if rank_ik != 0:
-                            # message f0d_temp
-                            if rank == rank_ik:
-                                comm.send(f0d_temp, dest=0, tag=ik2c)
-                            elif rank == 0:
-                                f0d_temp = comm.recv(source=rank_ik, tag=ik2c)
-
-                        if rank == 0:
-                            fc_fft_tmp[ik0c, ik1c, ik2c] = f0d_temp
-
-        if rank == 0:
-            # print(f"{fc_fft_tmp = }")
-
-            fc_fft = np.zeros(shapeK_coarse, dtype=np.complex128)
-            if self.dimX_K == (1, 0, 2):
-                for i0 in range(nkzc):
-                    for i1 in range(nkyc):
-                        fc_fft[i0, i1, :] = fc_fft_tmp[i1, i0, :]
-            elif self.dimX_K == (2, 1, 0):
-                for i0 in range(nkzc):
-                    for i1 in range(nkyc):
-                        for i2 in range(nkxc):
-                            fc_fft[i0, i1, i2] = fc_fft_tmp[i2, i1, i0]
-            elif self.dimX_K == (0, 1, 2):
-                fc_fft = fc_fft_tmp
-            elif self.dimX_K == (1, 2, 0):
-                for iz in range(nkzc):
-                    for iy in range(nkyc):
-                        for ix in range(nkxc):
-                            fc_fft[iz, iy, ix] = fc_fft_tmp[iy, ix, iz]
-            else:
-                raise NotImplementedError
-            return fc_fft
+        """Return a coarse field in K space (None in processes other than 0)."""
+        return self._coarse_seq_from_fft(f_fft, shapeK_coarse)
 
     def where_is_wavenumber(self, ik0, ik1, ik2):
         """Give local indices and rank from the sequential indices"""
@@ -1037,6 +872,206 @@ Lx, Ly and Lz: float
 
         return dx_arr_fft, dy_arr_fft, dz_arr_fft
 
+    def _get_coefs_first_fft(self):
+        """Multiplicity of the local modes along the dimension of the first fft
+
+        The modes not in the (hermitian symmetric) half space count twice.
+
+        """
+        dimK = self.dimK_first_fft
+        nx_seq = self.shapeX_seq[self.dim_first_fft]
+        iks_seq = self.seq_indices_first_K[dimK] + np.arange(
+            self.shapeK_loc[dimK]
+        )
+        coefs = np.full(iks_seq.size, 2.0)
+        coefs[iks_seq == 0] = 1.0
+        if nx_seq % 2 == 0:
+            coefs[iks_seq == nx_seq // 2] = 1.0
+        return coefs
+
+    def get_weights_sum_wavenumbers(self, factor=None):
+        """Weights of the local modes for :func:`sum_wavenumbers_stack`
+
+        The weights without factor are computed once. With a factor (for
+        example a dissipation frequency), a new array is returned, which should
+        be kept by the caller if it is used many times.
+
+        """
+        try:
+            weights = self._weights_sum_wavenumbers
+        except AttributeError:
+            shape = [1, 1, 1]
+            shape[self.dimK_first_fft] = -1
+            coefs = self._get_coefs_first_fft().reshape(shape)
+            weights = self._weights_sum_wavenumbers = np.ascontiguousarray(
+                np.broadcast_to(coefs, self.shapeK_loc)
+            )
+        if factor is None:
+            return weights
+        return weights * factor
+
+    def sum_wavenumbers_stack(self, arrays_fft, weights=None):
+        """Compute the sums over all wavenumbers of a sequence of real arrays
+
+        The local sums are reduced with only one MPI communication. If given,
+        ``weights`` is a sequence (of the same length as ``arrays_fft``) of
+        arrays obtained with :func:`get_weights_sum_wavenumbers` (or
+        ``None``). The result for an array ``arr_fft`` with a weight obtained
+        with ``factor`` is equal to ``sum_wavenumbers(factor * arr_fft)``.
+
+        """
+        if weights is None:
+            weights = [None] * len(arrays_fft)
+        weights_default = self.get_weights_sum_wavenumbers()
+        sums = np.empty(len(arrays_fft))
+        for index, (arr_fft, weight) in enumerate(zip(arrays_fft, weights)):
+            if weight is None:
+                weight = weights_default
+            sums[index] = np.vdot(weight, arr_fft)
+        if self._is_mpi_lib:
+            mpi.comm.Allreduce(mpi.MPI.IN_PLACE, sums, op=mpi.MPI.SUM)
+        return sums
+
+    def _get_bins_spectra_stack(self, with_kzkh):
+        """Compute (once) the bins used in :func:`compute_spectra_stack`"""
+        try:
+            bins = self._bins_spectra_stack
+        except AttributeError:
+            bins = self._bins_spectra_stack = {}
+
+        if "1d" not in bins:
+            dimX_K = self.oper_fft.get_dimX_K()
+            coefs = []
+            ibins = []
+            nks = []
+            for dimK, nk_loc in enumerate(self.shapeK_loc):
+                ni = self.shapeX_seq[dimX_K[dimK]]
+                nk_spectra = ni // 2 + 1
+                iks_seq = self.seq_indices_first_K[dimK] + np.arange(nk_loc)
+                if dimK == self.dimK_first_fft:
+                    coefs_dim = self._get_coefs_first_fft()
+                    ibins_dim = iks_seq
+                else:
+                    coefs_dim = np.ones(nk_loc)
+                    ibins_dim = np.where(
+                        iks_seq < nk_spectra, iks_seq, ni - iks_seq
+                    )
+                coefs.append(coefs_dim)
+                ibins.append(ibins_dim.astype(np.int32))
+                nks.append(nk_spectra)
+            bins["1d"] = coefs, ibins, nks
+
+            ks = self.k_spectra3d
+            nk = len(ks)
+            ik3d = (np.sqrt(self.K2) / self.deltak_spectra3d).astype(np.int32)
+            outside = ik3d >= nk - 1
+            ik3d[outside] = nk - 1
+            share3d = (np.sqrt(self.K2) - ks[ik3d]) / self.deltak_spectra3d
+            share3d[outside] = 0.0
+            bins["3d"] = ik3d, share3d, nk
+
+        if with_kzkh and "kzkh" not in bins:
+            khs = self.kh_spectra
+            nkh = len(khs)
+            nkz = self.nkz_spectra
+            KH = np.sqrt(self.Kx**2 + self.Ky**2)
+            ikh = (KH / self.deltakh).astype(np.int32)
+            outside = ikh >= nkh - 1
+            ikh[outside] = nkh - 1
+            sharekzkh = (KH - khs[ikh]) / self.deltakh
+            sharekzkh[outside] = 0.0
+            ikz = np.round(abs(self.Kz) / self.deltakz).astype(np.int32)
+            ikz[ikz >= nkz - 1] = nkz - 1
+            ikzkh = np.ascontiguousarray(ikz * nkh + ikh, dtype=np.int32)
+            bins["kzkh"] = ikzkh, sharekzkh, (nkz, nkh)
+
+        return bins
+
+    def compute_spectra_stack(self, energies_fft, with_kzkh=False):
+        """Compute the 1d, 3d and kz-kh spectra of a stack of energies.
+
+        The spectra of all the energies are computed in one pass over the
+        spectral arrays and, with MPI, with one reduction. The results are
+        equal to the results of :func:`compute_1dspectra`,
+        :func:`compute_3dspectrum` and :func:`compute_spectrum_kzkh`.
+
+        Parameters
+        ----------
+
+        energies_fft : 4d array
+            Stack of energy densities (shape ``(nb_energies,) + shapeK_loc``).
+
+        with_kzkh : bool
+            Whether the kz-kh spectra have to be computed.
+
+        Returns
+        -------
+
+        spectra_kx, spectra_ky, spectra_kz : 2d arrays
+
+        spectra3d : 2d array
+
+        spectra_kzkh : 3d array or None
+
+        """
+        energies_fft = np.ascontiguousarray(energies_fft, dtype=np.float64)
+        if energies_fft.ndim == 3:
+            energies_fft = energies_fft[np.newaxis]
+
+        bins = self._get_bins_spectra_stack(with_kzkh)
+        coefs, ibins, nks = bins["1d"]
+        ik3d, share3d, nk3d = bins["3d"]
+        if with_kzkh:
+            ikzkh, sharekzkh, (nkz, nkh) = bins["kzkh"]
+            nkzkh = nkz * nkh
+        else:
+            ikzkh = np.zeros((1, 1, 1), dtype=np.int32)
+            sharekzkh = np.zeros((1, 1, 1))
+            nkzkh = 0
+
+        result = loop_spectra_stack(
+            energies_fft,
+            *coefs,
+            *ibins,
+            *nks,
+            ik3d,
+            share3d,
+            nk3d,
+            ikzkh,
+            sharekzkh,
+            nkzkh,
+        )
+        if self._is_mpi_lib:
+            result_loc = result
+            result = np.empty_like(result_loc)
+            mpi.comm.Allreduce(result_loc, result, op=mpi.MPI.SUM)
+
+        spectra1d_dimK = []
+        start = 0
+        for nk in nks:
+            spectra1d_dimK.append(result[:, start : start + nk])
+            start += nk
+
+        dimX_K = self.oper_fft.get_dimX_K()
+        spectra_kz, spectra_ky, spectra_kx = (
+            spectra1d_dimK[dimX_K.index(dimX)] for dimX in range(3)
+        )
+        spectra3d = result[:, start : start + nk3d]
+        start += nk3d + 1
+        if with_kzkh:
+            spectra_kzkh = result[:, start : start + nkzkh].reshape(-1, nkz, nkh)
+            spectra_kzkh = spectra_kzkh / (self.deltakz * self.deltakh)
+        else:
+            spectra_kzkh = None
+
+        return (
+            spectra_kx / self.deltakx,
+            spectra_ky / self.deltaky,
+            spectra_kz / self.deltakz,
+            spectra3d / self.deltak_spectra3d,
+            spectra_kzkh,
+        )
+
     def get_grid1d_seq(self, axis="x"):
         if axis not in ("x", "y", "z"):
             raise ValueError
@@ -223,6 +223,36 @@ def test_divh_rotz(oper):
     assert divh[0, oper.ny // 2, oper.nx // 2] < 0.0
 
 
+@xfail_if_fluidfft_class_not_importable
+@skip_if_no_fluidfft
+def test_put_coarse_array_many_vars(oper):
+    params_coarse = deepcopy(oper.params)
+    params_coarse.oper.type_fft = "sequential"
+    params_coarse.oper.nx = oper.params.oper.nx // 4
+    params_coarse.oper.ny = oper.params.oper.ny // 8
+    params_coarse.oper.nz = oper.params.oper.nz // 2
+    oper_coarse = oper.__class__(params=params_coarse)
+    shapeK_coarse = oper_coarse.shapeK
+
+    rng = np.random.default_rng(0)
+    arr_coarse = rng.random((2,) + shapeK_coarse) + 1j
+
+    arr = np.zeros((2,) + oper.shapeK_loc, dtype=np.complex128)
+    oper.put_coarse_array_in_array_fft(
+        arr_coarse, arr, oper_coarse, shapeK_coarse
+    )
+    for ivar in range(2):
+        arr1 = oper.create_arrayK(value=0)
+        oper.put_coarse_array_in_array_fft(
+            arr_coarse[ivar], arr1, oper_coarse, shapeK_coarse
+        )
+        assert np.array_equal(arr[ivar], arr1)
+
+    arr_coarse_back = oper.coarse_seq_from_fft_loc(arr, shapeK_coarse)
+    if mpi.rank == 0:
+        assert np.array_equal(arr_coarse_back, arr_coarse)
+
+
 @xfail_if_fluidfft_class_not_importable
 @skip_if_no_fluidfft
 def test_where_is_wavenumber(oper):
@@ -313,3 +343,71 @@ class TestCoarse(_TestCoarse):
 
 
 del _TestCoarse
+
+
+@xfail_if_fluidfft_class_not_importable
+@skip_if_no_fluidfft
+def test_compute_spectra_stack(oper):
+    from fluidsim.operators.operators3d import (
+        loop_spectra_stack,
+        loop_spectra_stack_numpy,
+    )
+
+    energies_fft = np.abs(oper.create_arrayK_random()) ** 2
+    energies_fft = np.array([energies_fft, 2 * energies_fft])
+
+    spectra_kx, spectra_ky, spectra_kz, spectra3d, spectra_kzkh = (
+        oper.compute_spectra_stack(energies_fft, with_kzkh=True)
+    )
+    for index, energy_fft in enumerate(energies_fft):
+        spectrum_kx, spectrum_ky, spectrum_kz = oper.compute_1dspectra(energy_fft)
+        assert np.allclose(spectra_kx[index], spectrum_kx)
+        assert np.allclose(spectra_ky[index], spectrum_ky)
+        assert np.allclose(spectra_kz[index], spectrum_kz)
+        assert np.allclose(spectra3d[index], oper.compute_3dspectrum(energy_fft))
+        assert np.allclose(
+            spectra_kzkh[index], oper.compute_spectrum_kzkh(energy_fft)
+        )
+
+    *_, spectra_kzkh = oper.compute_spectra_stack(energies_fft)
+    assert spectra_kzkh is None
+
+    bins = oper._get_bins_spectra_stack(with_kzkh=True)
+    coefs, ibins, nks = bins["1d"]
+    args = (
+        energies_fft,
+        *coefs,
+        *ibins,
+        *nks,
+        *bins["3d"],
+        *bins["kzkh"][:2],
+        np.prod(bins["kzkh"][2]),
+    )
+    assert np.allclose(loop_spectra_stack(*args), loop_spectra_stack_numpy(*args))
+
+
+@xfail_if_fluidfft_class_not_importable
+@skip_if_no_fluidfft
+def test_fft_as_arg_stack(oper):
+    fields = np.array([oper.create_arrayX_random() for _ in range(3)])
+    fields_fft = np.empty((3,) + tuple(oper.shapeK_loc), dtype=np.complex128)
+
+    oper.fft_as_arg_stack(fields, fields_fft)
+    for field, field_fft in zip(fields, fields_fft):
+        assert np.allclose(field_fft, oper.fft(field))
+
+    # sequences of arrays (with a misaligned output array)
+    buffer = np.empty(fields_fft.size + 1, dtype=np.complex128)
+    fields_fft_misaligned = buffer[1:].reshape(fields_fft.shape)
+    oper.fft_as_arg_stack(tuple(fields), tuple(fields_fft_misaligned))
+    assert np.allclose(fields_fft_misaligned, fields_fft)
+
+    fields_fft_copy = fields_fft.copy()
+    fields_back = np.empty_like(fields)
+    oper.ifft_as_arg_stack(fields_fft, fields_back)
+    assert np.array_equal(fields_fft, fields_fft_copy)
+    assert np.allclose(fields_back, fields)
+
+    fields_back = tuple(np.empty_like(field) for field in fields)
+    oper.ifft_as_arg_stack(fields_fft, fields_back, destroy=True)
+    assert np.allclose(fields_back, fields)
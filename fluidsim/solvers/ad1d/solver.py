@@ -71,7 +71,7 @@ class Simul(SimulBase):
         else:
             tendencies = old
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies += self.forcing.tendencies
 
         return tendencies
@@ -1,6 +1,8 @@
 import unittest
 import warnings
 
+import numpy as np
+
 try:
     import scipy.sparse
 
@@ -106,6 +108,35 @@ class TestInitAD1D(TestSimul):
     def test_init(self):
         """Only test the initialization"""
 
+    @unittest.skipIf(
+        mpi.nb_proc > 1, "MPI not implemented, for eg. sim.oper.gather_Xspace"
+    )
+    def test_time_step_lu(self):
+        from scipy.sparse.linalg import spsolve
+
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        state_phys = sim.state.state_phys
+        dt = time_stepping.deltat
+
+        rhs = time_stepping.right_hand_side(
+            state_phys, sim.tendencies_nonlin(), dt
+        )
+        A = sim.oper.identity() - dt / 2 * time_stepping.L
+        expected = spsolve(A.tocsc(), rhs).reshape(state_phys.shape)
+
+        time_stepping.one_time_step_computation()
+        assert sim.state.state_phys is state_phys
+        assert np.allclose(state_phys, expected)
+
+        # the factorizations are cached for the last time steps
+        lu = time_stepping._get_lu(dt)
+        assert time_stepping._get_lu(dt) is lu
+        for index in range(time_stepping._max_size_cache_lu):
+            time_stepping._get_lu(dt * (2 + index))
+        assert dt not in time_stepping._cache_lu
+        assert len(time_stepping._cache_lu) == time_stepping._max_size_cache_lu
+
 
 if __name__ == "__main__":
     unittest.main()
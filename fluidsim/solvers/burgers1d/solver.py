@@ -10,6 +10,8 @@ Provides:
 
 """
 
+import numpy as np
+
 from fluidsim.base.setofvariables import SetOfVariables
 from fluidsim.base.solvers.pseudo_spect import (
     SimulBasePseudoSpectral,
@@ -93,9 +95,46 @@ class Simul(SimulBasePseudoSpectral):
         f_fft[self.oper.nkx - 1] = 0.0
         return tendencies_fft
 
+    def tendencies_nonlin_members(
+        self, state_spect, tendencies_fft, state_phys=None
+    ):
+        """Compute the nonlinear tendencies of the members of an ensemble
+
+        Version of :func:`tendencies_nonlin` for the arrays of
+        :class:`fluidsim.base.solvers.ensemble.SimulEnsemblePseudoSpectral`
+        (with an axis for the members after the axis of the variables). The
+        transforms of all members are computed with batched transforms.
+
+        """
+        oper = self.oper
+        u_fft = state_spect.get_var("u_fft")
+
+        nb_fields = 1 if state_phys is not None else 2
+        fields_fft = np.empty((nb_fields,) + u_fft.shape, np.complex128)
+        np.multiply(1j * oper.kx, u_fft, out=fields_fft[0])
+        if state_phys is None:
+            fields_fft[1] = u_fft
+        fields = np.empty((nb_fields, u_fft.shape[0], oper.nx))
+        oper.ifft_as_arg_stack(
+            fields_fft.reshape(-1, oper.nkx),
+            fields.reshape(-1, oper.nx),
+            destroy=True,
+        )
+        pxu = fields[0]
+        if state_phys is None:
+            signal = fields[1]
+        else:
+            signal = state_phys.get_var("u")
+
+        f_fft = tendencies_fft.get_var("u_fft")
+        oper.fft_as_arg_stack(-signal * pxu, f_fft)
+        f_fft[:, oper.where_dealiased] = 0.0
+        # Set "oddball mode" to zero
+        f_fft[:, oper.nkx - 1] = 0.0
+        return tendencies_fft
+
 
 if __name__ == "__main__":
-    import numpy as np
     import matplotlib.pyplot as plt
 
     params = Simul.create_default_params()
@@ -1,6 +1,12 @@
 import unittest
+import shutil
+from pathlib import Path
+from copy import deepcopy
+
+import numpy as np
 
 from fluidsim.solvers.burgers1d.solver import Simul
+from fluidsim.base.solvers.ensemble import create_ensemble
 
 from fluiddyn.util import mpi
 
@@ -41,3 +47,32 @@ class TestSolverSquare1D(TestSimul):
     def test_simul(self):
         sim = self.sim
         sim.time_stepping.start()
+
+    @unittest.skipIf(mpi.nb_proc > 1, "Ensembles are only sequential")
+    def test_ensemble(self):
+        params_members = []
+        sims_ref = []
+        for nu_2 in (0.01, 0.02, 0.04):
+            params = deepcopy(self.params)
+            params.nu_2 = nu_2
+            params.time_stepping.type_time_scheme = "RK4"
+            params_members.append(params)
+            sim_ref = Simul(deepcopy(params))
+            self.addCleanup(shutil.rmtree, sim_ref.output.path_run, True)
+            sims_ref.append(sim_ref)
+
+        ensemble = create_ensemble(Simul, params_members)
+        sims = ensemble.sims
+        for sim in sims:
+            self.addCleanup(shutil.rmtree, sim.output.path_run, True)
+        ensemble.time_stepping.start()
+        for sim, sim_ref in zip(sims, sims_ref):
+            sim_ref.time_stepping.start()
+            assert sim.time_stepping.t == sim_ref.time_stepping.t
+            assert np.allclose(sim.state.state_phys, sim_ref.state.state_phys)
+            # outputs of the members
+            path_run = Path(sim.output.path_run)
+            assert len(list(path_run.glob("state_phys_t*"))) == 2
+            assert (path_run / "stdout.txt").exists()
+        # different viscosities
+        assert not np.allclose(sims[0].state.state_phys, sims[2].state.state_phys)
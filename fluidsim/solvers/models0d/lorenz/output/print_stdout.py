@@ -36,13 +36,15 @@ class PrintStdOutLorenz(PrintStdOutBase):
         to_print = super()._make_str_info()
 
         if mpi.rank == 0:
-            to_print += (
-                (" " * 14) + "X = {:9.3e} ; Y = {:+9.3e} ; Z = {:+9.3e}\n" + "\n"
-            ).format(
-                float(self.sim.state.state_phys.get_var("X")),
-                float(self.sim.state.state_phys.get_var("Y")),
-                float(self.sim.state.state_phys.get_var("Z")),
-            )
+            # one line per member of the ensemble
+            state_phys = self.sim.state.state_phys
+            for X, Y, Z in zip(
+                *(np.atleast_1d(state_phys.get_var(key)) for key in "XYZ")
+            ):
+                to_print += (
+                    " " * 14 + f"X = {X:9.3e} ; Y = {Y:+9.3e} ; Z = {Z:+9.3e}\n"
+                )
+            to_print += "\n"
 
             duration_left = self._evaluate_duration_left()
             if duration_left is not None:
@@ -67,13 +69,15 @@ class PrintStdOutLorenz(PrintStdOutBase):
         if nt > 1:
             nt -= 1
 
+        nb_members = self.sim.oper.nb_members
+
         it = np.zeros(nt, dtype=int)
         t = np.zeros(nt)
         deltat = np.zeros(nt)
 
-        X = np.zeros(nt)
-        Y = np.zeros(nt)
-        Z = np.zeros(nt)
+        X = np.zeros((nt, nb_members))
+        Y = np.zeros((nt, nb_members))
+        Z = np.zeros((nt, nb_members))
 
         for il in range(nt):
             line = lines_t[il]
@@ -82,11 +86,15 @@ class PrintStdOutLorenz(PrintStdOutBase):
             t[il] = float(words[6])
             deltat[il] = float(words[10])
 
-            line = lines_X[il]
-            words = line.split()
-            X[il] = float(words[2])
-            Y[il] = float(words[6])
-            Z[il] = float(words[10])
+            for im in range(nb_members):
+                line = lines_X[il * nb_members + im]
+                words = line.split()
+                X[il, im] = float(words[2])
+                Y[il, im] = float(words[6])
+                Z[il, im] = float(words[10])
+
+        if nb_members == 1:
+            X, Y, Z = X[:, 0], Y[:, 0], Z[:, 0]
 
         dict_results["it"] = it
         dict_results["t"] = t
@@ -165,9 +173,9 @@ class PrintStdOutLorenz(PrintStdOutBase):
 
         ax.plot(X, Z, "b")
 
-        ax.plot(self.sim.Xs0, self.sim.Zs0, "bx")
+        ax.plot(*np.broadcast_arrays(self.sim.Xs0, self.sim.Zs0), "bx")
 
-        ax.plot(self.sim.Xs1, self.sim.Zs1, "bx")
+        ax.plot(*np.broadcast_arrays(self.sim.Xs1, self.sim.Zs1), "bx")
 
     def plot_XYZ(self):
         dict_results = self.load()
@@ -184,7 +192,19 @@ class PrintStdOutLorenz(PrintStdOutBase):
         ax.set_ylabel("$Y$")
         ax.set_zlabel("$Z$")
 
-        ax.plot(X, Y, Z, "b")
-
-        ax.plot([self.sim.Xs0], [self.sim.Ys0], self.sim.Zs0, "bx")
-        ax.plot([self.sim.Xs1], [self.sim.Ys1], self.sim.Zs1, "bx")
+        for X_member, Y_member, Z_member in zip(
+            X.reshape(X.shape[0], -1).T,
+            Y.reshape(Y.shape[0], -1).T,
+            Z.reshape(Z.shape[0], -1).T,
+        ):
+            ax.plot(X_member, Y_member, Z_member, "b")
+
+        sim = self.sim
+        for Xs, Ys, Zs in (
+            (sim.Xs0, sim.Ys0, sim.Zs0),
+            (sim.Xs1, sim.Ys1, sim.Zs1),
+        ):
+            Xs, Ys, Zs = np.broadcast_arrays(
+                *(np.atleast_1d(value) for value in (Xs, Ys, Zs))
+            )
+            ax.plot(Xs, Ys, Zs, "bx")
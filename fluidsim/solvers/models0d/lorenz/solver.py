@@ -17,7 +17,7 @@ This module provides classes to solve the Lorenz model.
 
 """
 
-from math import sqrt
+import numpy as np
 
 from fluidsim.base.setofvariables import SetOfVariables
 
@@ -61,9 +61,18 @@ class InfoSolverLorenz(InfoSolverBase):
 
 
 class Simul(SimulBase):
-    """Solve the Lorenz equations."""
+    """Solve the Lorenz equations.
+
+    With ``params.oper.nb_members > 1``, an ensemble of simulations is solved
+    (see :func:`fluidsim.base.solvers.ensemble.create_ensemble`). The
+    parameters ``sigma``, ``beta`` and ``rho`` can then be sequences of one
+    value per member.
+
+    """
 
     InfoSolver = InfoSolverLorenz
+    # parameters which can be specific to each member of an ensemble
+    _keys_params_members = ("sigma", "beta", "rho")
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -75,8 +84,12 @@ class Simul(SimulBase):
     def __init__(self, *args, **kargs):
         super().__init__(*args, **kargs)
         p = self.params
-        Zs = self.Zs0 = self.Zs1 = p.rho - 1
-        self.Xs0 = self.Ys0 = sqrt(p.beta * Zs)
+        get_values_members = self.oper.get_values_members
+        self.sigma = get_values_members(p.sigma, "sigma")
+        self.beta = get_values_members(p.beta, "beta")
+        self.rho = get_values_members(p.rho, "rho")
+        Zs = self.Zs0 = self.Zs1 = self.rho - 1
+        self.Xs0 = self.Ys0 = np.sqrt(self.beta * Zs)
         self.Xs1 = self.Ys1 = -self.Xs0
 
     def tendencies_nonlin(self, state=None, old=None):
@@ -112,8 +125,6 @@ class Simul(SimulBase):
            \dot Z = X Y - \beta Z.
 
         """
-        p = self.params
-
         if state is None:
             state = self.state.state_phys
 
@@ -125,11 +136,11 @@ class Simul(SimulBase):
             tendencies = SetOfVariables(like=self.state.state_phys)
         else:
             tendencies = old
-        tendencies.set_var("X", p.sigma * (Y - X))
-        tendencies.set_var("Y", p.rho * X - Y - X * Z)
-        tendencies.set_var("Z", X * Y - p.beta * Z)
+        tendencies.set_var("X", self.sigma * (Y - X))
+        tendencies.set_var("Y", self.rho * X - Y - X * Z)
+        tendencies.set_var("Z", X * Y - self.beta * Z)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             # TODO: Not implemented, but would be nice to study small perturbations
             # cf: Vallis 2nd edition 11.4
             tendencies += self.forcing.get_forcing()
@@ -16,7 +16,7 @@ and the main output class for this solver:
 
 """
 
-from math import log
+import numpy as np
 
 from fluidsim.base.output import OutputBase
 
@@ -44,9 +44,12 @@ class Output(OutputBase):
         params.output.phys_fields.field_to_plot = "X"
 
     def compute_potential(self):
-        """Compute energy(k)"""
-
-        p = self.sim.params
-        X = self.sim.state.state_phys.get_var("X")
-        Y = self.sim.state.state_phys.get_var("Y")
-        return p.C * log(X) - p.D * X + p.A * log(Y) - p.B * Y
+        """Compute the potential (one value per member for an ensemble)"""
+        sim = self.sim
+        # not sim.A, ... since this method is called during sim.__init__
+        A, B, C, D = (
+            sim.oper.get_values_members(sim.params[name], name) for name in "ABCD"
+        )
+        X = sim.state.state_phys.get_var("X")
+        Y = sim.state.state_phys.get_var("Y")
+        return C * np.log(X) - D * X + A * np.log(Y) - B * Y
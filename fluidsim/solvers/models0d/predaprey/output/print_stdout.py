@@ -38,18 +38,21 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
 
         potential = self.output.compute_potential()
         if mpi.rank == 0:
-            to_print += (
-                (" " * 14)
-                + "X = {:9.3e} ; Y = {:+9.3e}\n"
-                + (" " * 14)
-                + "potential = {:9.3e} ; Delta pot = {:+9.3e}"
-                "\n"
-            ).format(
-                float(self.sim.state.state_phys.get_var("X")),
-                float(self.sim.state.state_phys.get_var("Y")),
-                potential,
-                potential - self.potential_tmp,
-            )
+            # two lines per member of the ensemble
+            state_phys = self.sim.state.state_phys
+            for X, Y, pot, delta_pot in zip(
+                np.atleast_1d(state_phys.get_var("X")),
+                np.atleast_1d(state_phys.get_var("Y")),
+                np.atleast_1d(potential),
+                np.atleast_1d(potential - self.potential_tmp),
+            ):
+                to_print += (
+                    (" " * 14)
+                    + "X = {:9.3e} ; Y = {:+9.3e}\n"
+                    + (" " * 14)
+                    + "potential = {:9.3e} ; Delta pot = {:+9.3e}"
+                    "\n"
+                ).format(X, Y, pot, delta_pot)
 
             duration_left = self._evaluate_duration_left()
             if duration_left is not None:
@@ -78,15 +81,17 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
         if nt > 1:
             nt -= 1
 
+        nb_members = self.sim.oper.nb_members
+
         it = np.zeros(nt, dtype=int)
         t = np.zeros(nt)
         deltat = np.zeros(nt)
 
-        P = np.zeros(nt)
-        deltaP = np.zeros(nt)
+        P = np.zeros((nt, nb_members))
+        deltaP = np.zeros((nt, nb_members))
 
-        X = np.zeros(nt)
-        Y = np.zeros(nt)
+        X = np.zeros((nt, nb_members))
+        Y = np.zeros((nt, nb_members))
 
         for il in range(nt):
             line = lines_t[il]
@@ -95,15 +100,19 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
             t[il] = float(words[6])
             deltat[il] = float(words[10])
 
-            line = lines_P[il]
-            words = line.split()
-            P[il] = float(words[2])
-            deltaP[il] = float(words[7])
+            for im in range(nb_members):
+                line = lines_P[il * nb_members + im]
+                words = line.split()
+                P[il, im] = float(words[2])
+                deltaP[il, im] = float(words[7])
 
-            line = lines_X[il]
-            words = line.split()
-            X[il] = float(words[2])
-            Y[il] = float(words[6])
+                line = lines_X[il * nb_members + im]
+                words = line.split()
+                X[il, im] = float(words[2])
+                Y[il, im] = float(words[6])
+
+        if nb_members == 1:
+            P, deltaP, X, Y = P[:, 0], deltaP[:, 0], X[:, 0], Y[:, 0]
 
         dict_results["it"] = it
         dict_results["t"] = t
@@ -176,7 +185,7 @@ class PrintStdOutPredaPrey(PrintStdOutBase):
 
         ax.plot(X, Y, "b")
 
-        ax.plot(self.sim.Xs, self.sim.Ys, "bx")
+        ax.plot(*np.broadcast_arrays(self.sim.Xs, self.sim.Ys), "bx")
 
         ax.set_xlim([0, ax.get_xlim()[1]])
         ax.set_ylim([0, ax.get_ylim()[1]])
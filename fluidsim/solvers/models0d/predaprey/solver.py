@@ -58,9 +58,18 @@ class InfoSolverPredaPrey(InfoSolverBase):
 
 
 class Simul(SimulBase):
-    """Solve the Lotka-Volterra equations."""
+    """Solve the Lotka-Volterra equations.
+
+    With ``params.oper.nb_members > 1``, an ensemble of simulations is solved
+    (see :func:`fluidsim.base.solvers.ensemble.create_ensemble`). The
+    parameters ``A``, ``B``, ``C`` and ``D`` can then be sequences of one
+    value per member.
+
+    """
 
     InfoSolver = InfoSolverPredaPrey
+    # parameters which can be specific to each member of an ensemble
+    _keys_params_members = ("A", "B", "C", "D")
 
     @staticmethod
     def _complete_params_with_default(params):
@@ -72,8 +81,12 @@ class Simul(SimulBase):
     def __init__(self, *args, **kargs):
         super().__init__(*args, **kargs)
         p = self.params
-        self.Xs = p.C / p.D
-        self.Ys = p.A / p.B
+        get_values_members = self.oper.get_values_members
+        self.A, self.B, self.C, self.D = (
+            get_values_members(p[name], name) for name in "ABCD"
+        )
+        self.Xs = self.C / self.D
+        self.Ys = self.A / self.B
 
     def tendencies_nonlin(self, state=None, old=None):
         r"""Compute the nonlinear tendencies.
@@ -108,8 +121,6 @@ class Simul(SimulBase):
 
 
         """
-        p = self.params
-
         if state is None:
             state = self.state.state_phys
 
@@ -120,10 +131,10 @@ class Simul(SimulBase):
             tendencies = SetOfVariables(like=self.state.state_phys)
         else:
             tendencies = old
-        tendencies.set_var("X", p.A * X - p.B * X * Y)
-        tendencies.set_var("Y", -p.C * Y + p.D * X * Y)
+        tendencies.set_var("X", self.A * X - self.B * X * Y)
+        tendencies.set_var("Y", -self.C * Y + self.D * X * Y)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies += self.forcing.get_forcing()
 
         return tendencies
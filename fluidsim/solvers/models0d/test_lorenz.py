@@ -1,10 +1,15 @@
+import shutil
 import unittest
 
+import numpy as np
+
 import fluiddyn.util.mpi as mpi
 
 from .lorenz.solver import Simul
 
-from fluidsim.util.testing import TestSimul
+from fluidsim.base.solvers.ensemble import create_ensemble
+
+from fluidsim.util.testing import TestSimul, stdout_redirected
 
 
 @unittest.skipIf(mpi.nb_proc > 1, "plot function works sequentially only")
@@ -38,6 +43,67 @@ class TestLorenz(TestSimul):
         sim.output.print_stdout.plot_XY()
         sim.output.print_stdout.plot_XY_vs_time()
 
+    def test_ensemble(self):
+        """An ensemble gives the same results as the individual simulations"""
+        sigmas = [8.0, 10.0, 12.0]
+        params = Simul.create_default_params()
+        params.short_name_type_run = "test_ensemble"
+        params.output.sub_directory = "unittests"
+        params.time_stepping.deltat0 = 0.02
+        params.time_stepping.t_end = 0.2
+        params.output.periods_print.print_stdout = 0.01
+        params.oper.nb_members = len(sigmas)
+        params.sigma = sigmas
+
+        X0 = np.array([1.0, 2.0, 3.0])
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim = Simul(params)
+            sim.state.state_phys.set_var("X", sim.Xs0 + X0)
+            sim.state.state_phys.set_var("Y", sim.Ys0 * np.ones(3))
+            sim.state.state_phys.set_var("Z", sim.Zs0 * np.ones(3))
+            sim.time_stepping.start()
+
+            params.oper.nb_members = 1
+            params.output.HAS_TO_SAVE = False
+            for index, sigma in enumerate(sigmas):
+                params.sigma = sigma
+                sim_member = Simul(params)
+                sim_member.state.state_phys.set_var("X", sim.Xs0 + X0[index])
+                sim_member.state.state_phys.set_var("Y", sim.Ys0)
+                sim_member.state.state_phys.set_var("Z", sim.Zs0)
+                sim_member.time_stepping.start()
+                assert sim_member.time_stepping.it == sim.time_stepping.it
+                assert np.allclose(
+                    sim_member.state.state_phys, sim.state.state_phys[:, index]
+                )
+
+        results = sim.output.print_stdout.load()
+        assert results["X"].shape == (results["t"].size, len(sigmas))
+        sim.output.print_stdout.plot_XYZ()
+        shutil.rmtree(sim.output.path_run, ignore_errors=True)
+
+        with self.assertRaises(ValueError):
+            params.oper.nb_members = 2
+            params.sigma = sigmas
+            Simul(params)
+
+        # same ensemble created from the parameters of the members
+        params_members = []
+        for sigma in sigmas:
+            params = Simul.create_default_params()
+            params.output.HAS_TO_SAVE = False
+            params.sigma = sigma
+            params_members.append(params)
+        with stdout_redirected(self.has_to_redirect_stdout):
+            sim = create_ensemble(Simul, params_members)
+        assert sim.params.oper.nb_members == len(sigmas)
+        assert np.array_equal(sim.sigma, sigmas)
+        assert sim.rho == params.rho
+
+        params_members[0].time_stepping.deltat0 /= 2
+        with self.assertRaises(ValueError):
+            create_ensemble(Simul, params_members)
+
 
 if __name__ == "__main__":
     unittest.main()
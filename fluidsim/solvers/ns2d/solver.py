@@ -188,11 +188,58 @@ class Simul(SimulBasePseudoSpectral):
         #       ).format(self.oper.sum_wavenumbers(T_rot),
         #                self.oper.sum_wavenumbers(abs(T_rot))))
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
 
+    def tendencies_nonlin_members(
+        self, state_spect, tendencies_fft, state_phys=None
+    ):
+        """Compute the nonlinear tendencies of the members of an ensemble
+
+        Version of :func:`tendencies_nonlin` for the arrays of
+        :class:`fluidsim.base.solvers.ensemble.SimulEnsemblePseudoSpectral`
+        (with an axis for the members after the axis of the variables). The
+        inverse and the forward transforms of all members are computed with
+        batched transforms. The forcing is added by the ensemble.
+
+        """
+        oper = self.oper
+        rot_fft = state_spect.get_var("rot_fft")
+        shapeK = rot_fft.shape[1:]
+        shapeX = tuple(oper.shapeX_loc)
+
+        nb_fields = 2 if state_phys is not None else 4
+        fields_fft = np.empty((nb_fields,) + rot_fft.shape, np.complex128)
+        np.multiply(1j * oper.KX, rot_fft, out=fields_fft[0])
+        np.multiply(1j * oper.KY, rot_fft, out=fields_fft[1])
+        if state_phys is None:
+            np.multiply(1j * oper.KY_over_K2, rot_fft, out=fields_fft[2])
+            np.multiply(-1j * oper.KX_over_K2, rot_fft, out=fields_fft[3])
+
+        fields = np.empty((nb_fields, rot_fft.shape[0]) + shapeX)
+        oper.ifft_as_arg_stack(
+            fields_fft.reshape((-1,) + shapeK),
+            fields.reshape((-1,) + shapeX),
+            destroy=True,
+        )
+        px_rot, py_rot = fields[:2]
+        if state_phys is None:
+            ux, uy = fields[2:]
+        else:
+            ux = state_phys.get_var("ux")
+            uy = state_phys.get_var("uy")
+
+        if self.params.beta != 0:
+            py_rot += self.params.beta
+        Frot = -ux * px_rot - uy * py_rot
+
+        Frot_fft = tendencies_fft.get_var("rot_fft")
+        oper.fft_as_arg_stack(Frot, Frot_fft)
+        oper.dealiasing(*Frot_fft)
+        return tendencies_fft
+
 
 if "sphinx" in sys.modules:
     params = Simul.create_default_params()
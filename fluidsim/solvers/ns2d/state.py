@@ -105,6 +105,31 @@ class StateNS2D(StatePseudoSpectral):
         self.oper.ifft_as_arg(ux_fft, ux)
         self.oper.ifft_as_arg(uy_fft, uy)
 
+    def statephys_from_statespect_members(self, state_spect, state_phys):
+        """Compute `state_phys` from `statespect` for the members of an ensemble
+
+        The fields of all members are computed with one batched inverse
+        transform (see
+        :func:`fluidsim.base.state.StatePseudoSpectral.statephys_from_statespect_members`).
+
+        """
+        oper = self.oper
+        rot_fft = state_spect.get_var("rot_fft")
+        fields_fft = np.empty((state_phys.nvar,) + rot_fft.shape, np.complex128)
+        keys = state_phys.keys
+        fields_fft[keys.index("rot")] = rot_fft
+        np.multiply(
+            1j * oper.KY_over_K2, rot_fft, out=fields_fft[keys.index("ux")]
+        )
+        np.multiply(
+            -1j * oper.KX_over_K2, rot_fft, out=fields_fft[keys.index("uy")]
+        )
+        oper.ifft_as_arg_stack(
+            fields_fft.reshape((-1,) + rot_fft.shape[1:]),
+            state_phys.reshape((-1,) + state_phys.shape[2:]),
+            destroy=True,
+        )
+
     def statespect_from_statephys(self):
         """Compute `state_spect` from `state_phys`."""
 
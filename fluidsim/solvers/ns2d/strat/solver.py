@@ -172,7 +172,7 @@ class Simul(SimulNS2D):
         #     self.oper.sum_wavenumbers(T_b),
         #     self.oper.sum_wavenumbers(abs(T_b))))
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         # CHECK ENERGY CONSERVATION
@@ -1,9 +1,14 @@
 import unittest
+from copy import deepcopy
 from dataclasses import dataclass
+import shutil
 import tempfile
 from pathlib import Path
 
+import pytest
+
 import numpy as np
+import h5py
 import matplotlib.pyplot as plt
 
 import fluidsim as fls
@@ -95,6 +100,38 @@ class TestForcing(TestSimulBase):
         self.sim.time_stepping.start()
         self.sim.state.check_energy_equal_phys_spect()
 
+    def test_forcing_once(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        params_ts = sim.params.time_stepping
+        type_time_scheme = params_ts.type_time_scheme
+        state_spect = sim.state.state_spect
+        state_spect_init = state_spect.copy()
+        sim.forcing.compute()
+        forcing = sim.forcing.get_forcing().copy()
+
+        results = {}
+        for type_scheme in ("RK2", "RK4"):
+            for suffix in ("", "_forcing_once"):
+                params_ts.type_time_scheme = type_scheme + suffix
+                time_stepping._init_time_scheme()
+                state_spect[:] = state_spect_init
+                time_stepping.one_time_step_computation()
+                results[type_scheme + suffix] = state_spect.copy()
+
+        params_ts.type_time_scheme = type_time_scheme
+        time_stepping._init_time_scheme()
+        state_spect[:] = state_spect_init
+        sim.state.statephys_from_statespect()
+
+        # the forcing has to be added once (and not twice) per time step
+        contribution_forcing = time_stepping.deltat * abs(forcing).max()
+        assert contribution_forcing > 0
+        for type_scheme in ("RK2", "RK4"):
+            result = results[type_scheme]
+            diff = abs(results[type_scheme + "_forcing_once"] - result).max()
+            assert diff < 0.1 * contribution_forcing
+
 
 class TestForcingConstantRateEnergy(TestSimulBase):
     @classmethod
@@ -118,6 +155,37 @@ class TestForcingConstantRateEnergy(TestSimulBase):
             )
 
 
+class TestForcingDistributed(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.forcing.enable = True
+        params.forcing.type = "tcrandom"
+        params.forcing.random.distributed = True
+        params.forcing.forcing_rate = 2.0
+
+    def test_distributed(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        sim.state.check_energy_equal_phys_spect()
+
+        forcing_maker = sim.forcing.forcing_maker
+        forcing_maker.compute()
+        f_fft = forcing_maker.forcing_fft.get_var("rot_fft")
+        rot_fft = sim.state.state_spect.get_var("rot_fft")
+        deltat = sim.time_stepping.deltat
+        oper = sim.oper
+        injection_rate = oper.sum_wavenumbers(
+            (rot_fft.conj() * f_fft).real + deltat / 2 * abs(f_fft) ** 2
+        )
+        assert np.allclose(injection_rate, sim.params.forcing.forcing_rate)
+        assert np.allclose(oper.project_fft_on_realX(f_fft), f_fft)
+
+        # the forcing only depends on the seed and on the time
+        forcing0 = forcing_maker._compute_forcing_raw_loc(forcing_maker._seed0)
+        assert np.array_equal(forcing0, forcing_maker.forcing0)
+
+
 class TestForcingOutput(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -182,6 +250,7 @@ class TestForcingOutput(TestSimulBase):
         # Verify that the enstrophy growth rate due to nonlinear tendencies
         # (advection term) must be zero.
         self.sim.params.forcing.enable = False
+        self.sim.is_forcing_enabled = False
         tendencies_fft = self.sim.tendencies_nonlin()
         state_spect = self.sim.state.state_spect
         oper = self.sim.oper
@@ -192,6 +261,7 @@ class TestForcingOutput(TestSimulBase):
         sum_T = oper.sum_wavenumbers(T_rot)
         self.assertAlmostEqual(sum_T, 0, places=14)
         self.sim.params.forcing.enable = True
+        self.sim.is_forcing_enabled = True
 
         if mpi.nb_proc > 1:
             return
@@ -322,6 +392,136 @@ class TestForcingOutput(TestSimulBase):
         plt.close("all")
 
 
+class TestBufferedHDF5(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.output.buffer_size_hdf5 = 4
+        params.output.periods_save.spectra = 0.05
+        params.output.periods_save.spect_energy_budg = 0.05
+
+    def test_buffered(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        if mpi.rank > 0:
+            return
+
+        spectra = sim.output.spectra
+        assert not spectra._hdf5_writers
+        nb_times = spectra.nb_saved_times
+        assert nb_times > spectra._buffer_size_hdf5
+        with h5py.File(spectra.path_file1D, "r") as file:
+            times = file["times"][...]
+            spectra_E = file["spectrum1Dkx_E"][...]
+            assert file["times"].chunks == (4,)
+        assert times.shape == (nb_times,)
+        assert spectra_E.shape[0] == nb_times
+        assert np.all(np.diff(times) > 0)
+        assert spectra_E[-1].sum() > 0
+
+
+class TestBackgroundSave(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.output.periods_save.phys_fields = 0.1
+        params.output.phys_fields.save_in_background = True
+        params.output.phys_fields.nb_buffers_background = 1
+
+    def test_background_save(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        saver = sim.output.phys_fields._background_saver
+        assert saver._thread is None
+        # the buffers are freed by close
+        assert saver._nb_allocated == 0
+        assert saver._free_buffers.empty()
+
+        # an error in the writer thread is raised by all processes
+        if mpi.rank == 0:
+            saver._error = OSError("disk full")
+        with pytest.raises((OSError, RuntimeError), match="disk full"):
+            saver.close()
+        assert saver._error is None
+
+        if mpi.rank > 0:
+            return
+
+        paths = sorted(Path(sim.output.path_run).glob("state_phys*"))
+        assert len(paths) >= 6
+
+        sim2 = fls.load_state_phys_file(sim.output.path_run, hide_stdout=True)
+        assert sim2.time_stepping.it == sim.time_stepping.it
+        assert np.allclose(sim2.state.get_var("rot"), sim.state.get_var("rot"))
+
+
+class TestEnsemble(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.time_stepping.t_end = 0.2
+        params.forcing.enable = True
+        params.forcing.type = "proportional"
+        params.output.periods_save.spatial_means = 0.05
+
+    def _create_members(self, states_init=None):
+        sims = []
+        for index, (nu_8, forcing_rate) in enumerate(((2e-5, 1.0), (4e-5, 2.0))):
+            params = deepcopy(self.params)
+            params.nu_8 = nu_8
+            params.forcing.forcing_rate = forcing_rate
+            sim = self.Simul(params)
+            self.addCleanup(shutil.rmtree, sim.output.path_run, True)
+            if states_init is not None:
+                sim.state.state_spect[:] = states_init[index]
+                sim.state.statephys_from_statespect()
+            sims.append(sim)
+        return sims
+
+    def test_ensemble(self):
+        from fluidsim.base.solvers.ensemble import SimulEnsemblePseudoSpectral
+
+        sims_ref = self._create_members()
+        states_init = [sim.state.state_spect.copy() for sim in sims_ref]
+        for sim in sims_ref:
+            sim.time_stepping.start()
+
+        for batched in (True, False):
+            sims = self._create_members(states_init)
+            ensemble = SimulEnsemblePseudoSpectral(sims)
+            if not batched:
+                # tendencies and physical variables computed member by member
+                ensemble._tendencies_nonlin_members = None
+                ensemble.state._statephys_from_statespect_members = None
+            ensemble.time_stepping.start()
+
+            for sim, sim_ref in zip(sims, sims_ref):
+                assert sim.time_stepping.it == sim_ref.time_stepping.it
+                assert np.allclose(sim.state.state_phys, sim_ref.state.state_phys)
+                means = sim.output.spatial_means.load()
+                means_ref = sim_ref.output.spatial_means.load()
+                for key in ("t", "E", "PK_tot"):
+                    assert np.allclose(means[key], means_ref[key]), key
+            # per-member forcing rate
+            assert not np.allclose(
+                sims[0].output.spatial_means.load()["PK_tot"],
+                sims[1].output.spatial_means.load()["PK_tot"],
+            )
+
+        sims = self._create_members()
+        sims[1].params.beta = 1.0
+        with self.assertRaises(ValueError):
+            SimulEnsemblePseudoSpectral(sims)
+
+
 class TestSolverNS2DInitJet(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -18,8 +18,7 @@ class TimeStepping(TimeSteppingPseudoSpectral):
         uy_fft = state_spect.get_var("uy_fft")
         self.sim.oper.projection_perp(ux_fft, uy_fft)
         self.sim.state.statephys_from_statespect()
-        if np.isnan(np.sum(state_spect[0])):
-            raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
+        self._check_finite(state_spect)
 
 
 class State(StateBase):
@@ -133,7 +132,7 @@ class Simul(SimulBase):
         tendencies_fft.set_var("ux_fft", Fx_fft)
         tendencies_fft.set_var("uy_fft", Fy_fft)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
@@ -9,95 +9,207 @@
 
 import os
 
+import h5py
 import numpy as np
 import matplotlib.pyplot as plt
 
 from fluiddyn.util import mpi
 
-from fluidsim.base.output.spatial_means import SpatialMeansBase
+from fluidsim.util import open_patient
+from fluidsim.base.output.spatial_means import SpatialMeansBase, inner_prod
 
 
 class SpatialMeansNS3D(SpatialMeansBase):
     """Spatial means output."""
 
-    def _save_one_time(self):
-        tsim = self.sim.time_stepping.t
-        self.t_last_save = tsim
-        nrj_vx_fft, nrj_vy_fft, nrj_vz_fft = self.output.compute_energies_fft()
-        energy_fft = nrj_vx_fft + nrj_vy_fft + nrj_vz_fft
-        nrj_vx = self.sum_wavenumbers(nrj_vx_fft)
-        nrj_vy = self.sum_wavenumbers(nrj_vy_fft)
-        nrj_vz = self.sum_wavenumbers(nrj_vz_fft)
-        energy = nrj_vx + nrj_vy + nrj_vz
+    _name_file_h5 = "spatial_means.h5"
+    # saved only if the forcing is enabled (zeros in the loaded results)
+    _keys_forcing = ("PK1", "PK2", "PK_tot")
+
+    @staticmethod
+    def _complete_params_with_default(params):
+        SpatialMeansBase._complete_params_with_default(params)
+        params.output.spatial_means._set_attrib("SAVE_TXT", True)
+        params.output.spatial_means._set_doc(
+            """
+HAS_TO_PLOT_SAVED: bool (default False)
 
+    If True, the saved quantities are plotted during the simulation.
+
+SAVE_TXT: bool (default True)
+
+    The spatial means are always saved in a hdf5 file (one dataset for each
+    quantity). If True, they are also saved in the text file
+    spatial_means.txt (used by older versions of fluidsim).
+"""
+        )
+
+    def __init__(self, output):
+        try:
+            self._save_txt = output.sim.params.output.spatial_means.SAVE_TXT
+        except AttributeError:
+            # loading an old simulation?
+            self._save_txt = True
+        # keys of the datasets of the hdf5 file (read at the first save)
+        self._keys_h5 = None
+        super().__init__(output)
+
+    def _init_path_files(self):
+        super()._init_path_files()
+        self.path_file_h5 = os.path.join(self.output.path_run, self._name_file_h5)
+
+    def _init_files(self, arrays_1st_time=None):
+        if self._save_txt:
+            super()._init_files(arrays_1st_time)
+
+    def _get_weights_diss(self):
+        """Weights for the dissipation terms (computed once)"""
+        try:
+            return self._weights_diss
+        except AttributeError:
+            pass
+
+        get_weights = self.oper.get_weights_sum_wavenumbers
         f_d, f_d_hypo = self.sim.compute_freq_diss()
-        epsK = self.sum_wavenumbers(f_d * 2 * energy_fft)
-        epsK_hypo = self.sum_wavenumbers(f_d_hypo * 2 * energy_fft)
-
-        if self.sim.params.nu_4 > 0.0:
-            f_d4 = self.params.nu_4 * self.oper.K4
-            epsK4 = self.sum_wavenumbers(f_d4 * 2 * energy_fft)
-            del f_d4
-
-        if self.sim.params.nu_8 > 0.0:
-            f_d8 = self.params.nu_8 * self.oper.K8
-            epsK8 = self.sum_wavenumbers(f_d8 * 2 * energy_fft)
-            del f_d8
-
-        if self.sim.params.forcing.enable:
-            deltat = self.sim.time_stepping.deltat
-            forcing_fft = self.sim.forcing.get_forcing()
-
-            fx_fft = forcing_fft.get_var("vx_fft")
-            fy_fft = forcing_fft.get_var("vy_fft")
-            fz_fft = forcing_fft.get_var("vz_fft")
-
-            vx_fft = self.sim.state.state_spect.get_var("vx_fft")
-            vy_fft = self.sim.state.state_spect.get_var("vy_fft")
-            vz_fft = self.sim.state.state_spect.get_var("vz_fft")
-
-            PK1_fft = np.ascontiguousarray(
-                np.real(
-                    vx_fft.conj() * fx_fft
-                    + vy_fft.conj() * fy_fft
-                    + vz_fft.conj() * fz_fft
-                )
-            )
-            PK2_fft = (
-                (abs(fx_fft) ** 2 + abs(fy_fft) ** 2 + abs(fz_fft) ** 2)
-                * deltat
-                / 2
+        weights = {"": get_weights(2 * f_d), "_hypo": get_weights(2 * f_d_hypo)}
+        del f_d, f_d_hypo
+        if self.params.nu_4 > 0.0:
+            weights["4"] = get_weights(2 * self.params.nu_4 * self.oper.K4)
+        if self.params.nu_8 > 0.0:
+            weights["8"] = get_weights(2 * self.params.nu_8 * self.oper.K8)
+        self._weights_diss = weights
+        return weights
+
+    def _compute_power_injection_fft(self, keys):
+        """Compute the arrays used for the injection of energy"""
+        forcing_fft = self.sim.forcing.get_forcing()
+        get_var = self.sim.state.state_spect.get_var
+        P1_fft = np.zeros(self.oper.shapeK_loc)
+        P2_fft = np.zeros(self.oper.shapeK_loc)
+        for key in keys:
+            f_fft = forcing_fft.get_var(key)
+            P1_fft += inner_prod(get_var(key), f_fft)
+            P2_fft += abs(f_fft) ** 2
+        P2_fft *= self.sim.time_stepping.deltat / 2
+        return P1_fft, P2_fft
+
+    def _compute_values(self):
+        """Compute the spatial means (only one MPI reduction)
+
+        Returns a dictionary of floats (the order of the keys is used for the
+        hdf5 file).
+
+        """
+        energies_fft = self.output.compute_energies_fft()
+        weights_diss = self._get_weights_diss()
+
+        arrays = list(energies_fft)
+        weights = [None] * 3
+        for weight in weights_diss.values():
+            arrays.extend(energies_fft)
+            weights.extend([weight] * 3)
+        if self.params.forcing.enable:
+            arrays.extend(
+                self._compute_power_injection_fft(("vx_fft", "vy_fft", "vz_fft"))
             )
+            weights.extend([None] * 2)
+
+        sums = self.oper.sum_wavenumbers_stack(arrays, weights)
+
+        values = {}
+        values["E"] = sums[:3].sum()
+        values["Ex"], values["Ey"], values["Ez"] = sums[:3]
+        start = 3
+        for key in weights_diss:
+            values["epsK" + key] = sums[start : start + 3].sum()
+            start += 3
+        values["epsK_tot"] = values["epsK"] + values["epsK_hypo"]
+        if self.params.forcing.enable:
+            values["PK1"], values["PK2"] = sums[start : start + 2]
+            values["PK_tot"] = values["PK1"] + values["PK2"]
+        return values
+
+    def _write_txt(self, tsim, values):
+        self.file.write(
+            f"####\ntime = {tsim:11.5e}\n"
+            f"E    = {values['E']:11.5e}\n"
+            f"Ex   = {values['Ex']:11.5e} ; Ey   = {values['Ey']:11.5e} ; "
+            f"Ez   = {values['Ez']:11.5e}\n"
+            f"epsK = {values['epsK']:11.5e} ; "
+            f"epsK_hypo = {values['epsK_hypo']:11.5e} ; "
+            f"epsK_tot = {values['epsK_tot']:11.5e} \n"
+        )
 
-            PK1 = self.sum_wavenumbers(PK1_fft)
-            PK2 = self.sum_wavenumbers(PK2_fft)
+        if "epsK4" in values:
+            self.file.write(f"epsK4 = {values['epsK4']:11.5e}\n")
 
-        if mpi.rank == 0:
+        if "epsK8" in values:
+            self.file.write(f"epsK8 = {values['epsK8']:11.5e}\n")
+
+        if "PK_tot" in values:
             self.file.write(
-                f"####\ntime = {tsim:11.5e}\n"
-                f"E    = {energy:11.5e}\n"
-                f"Ex   = {nrj_vx:11.5e} ; Ey   = {nrj_vy:11.5e} ; Ez   = {nrj_vz:11.5e}\n"
-                f"epsK = {epsK:11.5e} ; epsK_hypo = {epsK_hypo:11.5e} ; "
-                f"epsK_tot = {epsK + epsK_hypo:11.5e} \n"
+                f"PK1  = {values['PK1']:11.5e} ; "
+                f"PK2       = {values['PK2']:11.5e} ; "
+                f"PK_tot   = {values['PK_tot']:11.5e} \n"
             )
 
-            if self.sim.params.nu_4 > 0.0:
-                self.file.write(f"epsK4 = {epsK4:11.5e}\n")
-
-            if self.sim.params.nu_8 > 0.0:
-                self.file.write(f"epsK8 = {epsK8:11.5e}\n")
+    def _save_values(self, tsim, values):
+        if self._save_txt:
+            self._write_txt(tsim, values)
+            self.file.flush()
 
-            if self.sim.params.forcing.enable:
-                self.file.write(
-                    f"PK1  = {PK1:11.5e} ; PK2       = {PK2:11.5e} ; "
-                    f"PK_tot   = {PK1 + PK2:11.5e} \n"
+        if os.path.exists(self.path_file_h5):
+            self._complete_keys_h5_file(values)
+            self._add_dict_arrays_to_file(self.path_file_h5, values)
+        else:
+            self._create_file_from_dict_arrays(self.path_file_h5, values, {})
+            self._keys_h5 = set(values)
+
+    def _complete_keys_h5_file(self, values):
+        """Handle values with keys different from the datasets of the file
+
+        It happens for a simulation restarted with other parameters (forcing
+        enabled or not, nu_4 or nu_8 equal to zero or not). The missing
+        datasets are created and filled with NaN for the times already saved
+        and NaN is saved for the quantities which are no longer computed.
+
+        """
+        if self._keys_h5 is None:
+            with h5py.File(self.path_file_h5, "r") as file:
+                self._keys_h5 = set(
+                    key
+                    for key, dset in file.items()
+                    if key != "times" and isinstance(dset, h5py.Dataset)
                 )
 
-            self.file.flush()
-            os.fsync(self.file.fileno())
+        keys_new = set(values) - self._keys_h5
+        if keys_new:
+            # the buffered times have to be written before adding datasets
+            self._close_hdf5_writers()
+            with open_patient(self.path_file_h5, "r+") as file:
+                dset_times = file["times"]
+                for key in sorted(keys_new):
+                    file.create_dataset(
+                        key,
+                        data=np.full(dset_times.shape, np.nan),
+                        maxshape=(None,),
+                        chunks=dset_times.chunks,
+                    )
+            self._keys_h5.update(keys_new)
+
+        for key in sorted(self._keys_h5 - set(values)):
+            values[key] = np.nan
+
+    def _save_one_time(self):
+        tsim = self.sim.time_stepping.t
+        self.t_last_save = tsim
+        values = self._compute_values()
+
+        if mpi.rank == 0:
+            self._save_values(tsim, values)
 
         if self.has_to_plot and mpi.rank == 0:
-            self.ax_a.plot(tsim, energy, "k.")
+            self.ax_a.plot(tsim, values["E"], "k.")
 
             # self.axe_b.plot(tsim, epsK_tot, 'k.')
             # if self.sim.params.forcing.enable:
@@ -108,7 +220,55 @@ class SpatialMeansNS3D(SpatialMeansBase):
                 fig = self.ax_a.get_figure()
                 fig.canvas.draw()
 
+    def _has_complete_h5_file(self):
+        """Check if the hdf5 file contains all the times of the text file
+
+        It is not the case for a simulation started with an older version of
+        fluidsim and restarted with this version.
+
+        """
+        if not os.path.exists(self.path_file_h5):
+            return False
+        if not os.path.exists(self.path_file):
+            return True
+        self._flush_hdf5_writers()
+        with h5py.File(self.path_file_h5, "r") as file:
+            time_first_h5 = file["times"][0]
+        return time_first_h5 <= SpatialMeansBase.time_first_saved(self) + 1e-12
+
+    def _load_from_h5(self):
+        self._flush_hdf5_writers()
+        results = {"name_solver": self.output.name_solver}
+        with h5py.File(self.path_file_h5, "r") as file:
+            results["t"] = file["times"][...]
+            for key, dset in file.items():
+                if key != "times" and isinstance(dset, h5py.Dataset):
+                    results[key] = dset[...]
+        for key in self._keys_forcing:
+            if key not in results:
+                results[key] = np.zeros_like(results["t"])
+        return results
+
     def load(self):
+        if self._has_complete_h5_file():
+            return self._load_from_h5()
+        return self._load_from_txt()
+
+    def time_first_saved(self) -> float:
+        if self._save_txt and os.path.exists(self.path_file):
+            return super().time_first_saved()
+        self._flush_hdf5_writers()
+        with h5py.File(self.path_file_h5, "r") as file:
+            return float(file["times"][0])
+
+    def time_last_saved(self) -> float:
+        if self._save_txt and os.path.exists(self.path_file):
+            return super().time_last_saved()
+        self._flush_hdf5_writers()
+        with h5py.File(self.path_file_h5, "r") as file:
+            return float(file["times"][-1])
+
+    def _load_from_txt(self):
         dict_results = {"name_solver": self.output.name_solver}
 
         with open(self.path_file) as file_means:
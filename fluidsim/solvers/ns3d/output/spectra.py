@@ -14,84 +14,55 @@ class SpectraNS3D(Spectra):
 
     def compute(self):
         """compute the values at one time."""
-        nrj_vx_fft, nrj_vy_fft, nrj_vz_fft = self.output.compute_energies_fft()
-
-        s_vx_kx, s_vx_ky, s_vx_kz = self.oper.compute_1dspectra(nrj_vx_fft)
-        s_vy_kx, s_vy_ky, s_vy_kz = self.oper.compute_1dspectra(nrj_vy_fft)
-        s_vz_kx, s_vz_ky, s_vz_kz = self.oper.compute_1dspectra(nrj_vz_fft)
-
-        s_kx = s_vx_kx + s_vy_kx + s_vz_kx
-        s_ky = s_vx_ky + s_vy_ky + s_vz_ky
-        s_kz = s_vx_kz + s_vy_kz + s_vz_kz
-
-        dict_spectra1d = {
-            "vx_kx": s_vx_kx,
-            "vx_ky": s_vx_ky,
-            "vx_kz": s_vx_kz,
-            "vy_kx": s_vy_kx,
-            "vy_ky": s_vy_ky,
-            "vy_kz": s_vy_kz,
-            "vz_kx": s_vz_kx,
-            "vz_ky": s_vz_ky,
-            "vz_kz": s_vz_kz,
-            "E_kx": s_kx,
-            "E_ky": s_ky,
-            "E_kz": s_kz,
-        }
-        dict_spectra1d = {"spectra_" + k: v for k, v in dict_spectra1d.items()}
-
-        s_vx = self.oper.compute_3dspectrum(nrj_vx_fft)
-        s_vy = self.oper.compute_3dspectrum(nrj_vy_fft)
-        s_vz = self.oper.compute_3dspectrum(nrj_vz_fft)
-
-        dict_spectra3d = {
-            "vx": s_vx,
-            "vy": s_vy,
-            "vz": s_vz,
-            "E": s_vx + s_vy + s_vz,
-        }
-        dict_spectra3d = {"spectra_" + k: v for k, v in dict_spectra3d.items()}
-
         get_var = self.sim.state.state_spect.get_var
         vx_fft = get_var("vx_fft")
         vy_fft = get_var("vy_fft")
+        vz_fft = get_var("vz_fft")
 
         urx_fft, ury_fft, udx_fft, udy_fft = self.sim.oper.urudfft_from_vxvyfft(
             vx_fft, vy_fft
         )
-        nrj_Khr_fft = 0.5 * (np.abs(urx_fft) ** 2 + np.abs(ury_fft) ** 2)
-        nrj_Khd_fft = 0.5 * (np.abs(udx_fft) ** 2 + np.abs(udy_fft) ** 2)
-
-        s_Khr_kx, s_Khr_ky, s_Khr_kz = self.oper.compute_1dspectra(nrj_Khr_fft)
-        s_Khd_kx, s_Khd_ky, s_Khd_kz = self.oper.compute_1dspectra(nrj_Khd_fft)
-
-        dict_spectra1d.update(
-            {
-                "Khr_kx": s_Khr_kx,
-                "Khr_ky": s_Khr_ky,
-                "Khr_kz": s_Khr_kz,
-                "Khd_kx": s_Khd_kx,
-                "Khd_ky": s_Khd_ky,
-                "Khd_kz": s_Khd_kz,
-            }
+
+        keys = ("vx", "vy", "vz", "Khr", "Khd")
+        energies_fft = self._compute_energies_stack(
+            (0.5, (vx_fft,)),
+            (0.5, (vy_fft,)),
+            (0.5, (vz_fft,)),
+            (0.5, (urx_fft, ury_fft)),
+            (0.5, (udx_fft, udy_fft)),
         )
+        del urx_fft, ury_fft, udx_fft, udy_fft
+
+        with_kzkh = self.has_to_save_kzkh()
+        (
+            spectra_kx,
+            spectra_ky,
+            spectra_kz,
+            spectra3d,
+            spectra_kzkh,
+        ) = self.oper.compute_spectra_stack(energies_fft, with_kzkh)
+
+        dict_spectra1d = {}
+        dict_spectra3d = {}
+        for index, key in enumerate(keys):
+            dict_spectra1d[key + "_kx"] = spectra_kx[index]
+            dict_spectra1d[key + "_ky"] = spectra_ky[index]
+            dict_spectra1d[key + "_kz"] = spectra_kz[index]
+            dict_spectra3d[key] = spectra3d[index]
+
+        dict_spectra1d["E_kx"] = spectra_kx[:3].sum(axis=0)
+        dict_spectra1d["E_ky"] = spectra_ky[:3].sum(axis=0)
+        dict_spectra1d["E_kz"] = spectra_kz[:3].sum(axis=0)
+        dict_spectra3d["E"] = spectra3d[:3].sum(axis=0)
 
-        s_Khr = self.oper.compute_3dspectrum(nrj_Khr_fft)
-        s_Khd = self.oper.compute_3dspectrum(nrj_Khd_fft)
+        dict_spectra1d = {"spectra_" + k: v for k, v in dict_spectra1d.items()}
+        dict_spectra3d = {"spectra_" + k: v for k, v in dict_spectra3d.items()}
 
-        dict_spectra3d.update(
-            {
-                "Khr": s_Khr,
-                "Khd": s_Khd,
-            }
-        )
-        if self.has_to_save_kzkh():
+        if with_kzkh:
             dict_kzkh = {
-                "K": self.oper.compute_spectrum_kzkh(
-                    nrj_vx_fft + nrj_vy_fft + nrj_vz_fft
-                ),
-                "Khr": self.oper.compute_spectrum_kzkh(nrj_Khr_fft),
-                "Khd": self.oper.compute_spectrum_kzkh(nrj_Khd_fft),
+                "K": spectra_kzkh[:3].sum(axis=0),
+                "Khr": spectra_kzkh[3],
+                "Khd": spectra_kzkh[4],
             }
         else:
             dict_kzkh = None
@@ -40,16 +40,23 @@ class StateNS3D(StatePseudoSpectral):
             }
         )
 
+    # number of temporary arrays in physical space
+    _nb_fields_tmp = 6
+
     def __init__(self, sim, oper=None):
         super().__init__(sim, oper)
 
-        self.fields_tmp = tuple(
-            np.empty_like(self.state_phys[0]) for n in range(6)
+        # the temporary arrays are views of stacks so that they can be
+        # transformed with one call (see oper.ifft_as_arg_stack)
+        self.fields_tmp_stack = np.empty(
+            (self._nb_fields_tmp,) + self.state_phys.shape[1:]
         )
+        self.fields_tmp = tuple(self.fields_tmp_stack)
 
-        self.fields_spect_tmp = tuple(
-            np.empty_like(self.state_spect[0]) for n in range(3)
+        self.fields_spect_tmp_stack = np.empty(
+            (3,) + self.state_spect.shape[1:], dtype=self.state_spect.dtype
         )
+        self.fields_spect_tmp = tuple(self.fields_spect_tmp_stack)
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
@@ -64,12 +71,12 @@ class StateNS3D(StatePseudoSpectral):
             vx_fft = self.get_var("vx_fft")
             vy_fft = self.get_var("vy_fft")
             rotz_fft = self.oper.rotzfft_from_vxvyfft(vx_fft, vy_fft)
-            result = self.oper.ifft3d(rotz_fft)
+            result = self.oper.ifft(rotz_fft)
         elif key == "divh":
             vx_fft = self.get_var("vx_fft")
             vy_fft = self.get_var("vy_fft")
             divh_fft = self.oper.divhfft_from_vxvyfft(vx_fft, vy_fft)
-            result = self.oper.ifft3d(divh_fft)
+            result = self.oper.ifft(divh_fft)
         elif key == "divh_fft":
             vx_fft = self.get_var("vx_fft")
             vy_fft = self.get_var("vy_fft")
@@ -81,7 +88,7 @@ class StateNS3D(StatePseudoSpectral):
             result = self.oper.vpfft_from_vecfft(vx_fft, vy_fft, vz_fft)
         elif key == "vp":
             vp_fft = self.compute("vp_fft")
-            result = self.oper.ifft3d(vp_fft)
+            result = self.oper.ifft(vp_fft)
         elif key == "vt_fft":
             vx_fft = self.get_var("vx_fft")
             vy_fft = self.get_var("vy_fft")
@@ -89,7 +96,7 @@ class StateNS3D(StatePseudoSpectral):
             result = self.oper.vtfft_from_vecfft(vx_fft, vy_fft, vz_fft)
         elif key == "vt":
             vt_fft = self.compute("vt_fft")
-            result = self.oper.ifft3d(vt_fft)
+            result = self.oper.ifft(vt_fft)
 
         else:
             to_print = f'Do not know how to compute "{key}".'
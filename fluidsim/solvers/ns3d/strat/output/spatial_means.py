@@ -7,13 +7,9 @@
 
 """
 
-import os
-
 import numpy as np
 import matplotlib.pyplot as plt
 
-from fluiddyn.util import mpi
-
 from fluidsim.solvers.ns3d.output.spatial_means import SpatialMeansNS3D
 
 
@@ -24,123 +20,97 @@ class SpatialMeansNS3DStrat(SpatialMeansNS3D):
         self.one_over_N2 = 1.0 / output.sim.params.N**2
         super().__init__(output)
 
-    def _save_one_time(self):
-        tsim = self.sim.time_stepping.t
-        self.t_last_save = tsim
-        nrj_A, nrj_Kz, nrj_Khr, nrj_Khd = self.output.compute_energies_fft()
-        energyK_fft = nrj_Kz + nrj_Khr + nrj_Khd
-        # shear modes
-        COND_SHEAR = self.oper.Kx**2 + self.oper.Ky**2 == 0.0
-        nrj_Khs = nrj_Khr * COND_SHEAR
-        nrj_As = nrj_A * COND_SHEAR
-        energyA_fft = nrj_A
-        nrj_A = self.sum_wavenumbers(nrj_A)
-        nrj_As = self.sum_wavenumbers(nrj_As)
-        nrj_Kz = self.sum_wavenumbers(nrj_Kz)
-        nrj_Khs = self.sum_wavenumbers(nrj_Khs)
-        nrj_Khr = self.sum_wavenumbers(nrj_Khr)
-        nrj_Khr = nrj_Khr - nrj_Khs
-        nrj_Khd = self.sum_wavenumbers(nrj_Khd)
-        energy = nrj_A + nrj_Kz + nrj_Khr + nrj_Khd + nrj_Khs
-
-        f_d, f_d_hypo = self.sim.compute_freq_diss()
-        epsK = self.sum_wavenumbers(f_d * 2 * energyK_fft)
-        epsK_hypo = self.sum_wavenumbers(f_d_hypo * 2 * energyK_fft)
-        epsA = self.sum_wavenumbers(f_d * 2 * energyA_fft)
-        epsA_hypo = self.sum_wavenumbers(f_d_hypo * 2 * energyA_fft)
-
-        if self.sim.params.nu_4 > 0.0:
-            f_d4 = self.params.nu_4 * self.oper.K4
-            epsK4 = self.sum_wavenumbers(f_d4 * 2 * energyK_fft)
-            epsA4 = self.sum_wavenumbers(f_d4 * 2 * energyA_fft)
-            del f_d4
-
-        if self.sim.params.nu_8 > 0.0:
-            f_d8 = self.params.nu_8 * self.oper.K8
-            epsK8 = self.sum_wavenumbers(f_d8 * 2 * energyK_fft)
-            epsA8 = self.sum_wavenumbers(f_d8 * 2 * energyA_fft)
-            del f_d8
-
-        if self.sim.params.forcing.enable:
-            deltat = self.sim.time_stepping.deltat
-            forcing_fft = self.sim.forcing.get_forcing()
-
-            fx_fft = forcing_fft.get_var("vx_fft")
-            fy_fft = forcing_fft.get_var("vy_fft")
-            fz_fft = forcing_fft.get_var("vz_fft")
-            fb_fft = forcing_fft.get_var("b_fft")
-
-            get_var = self.sim.state.state_spect.get_var
-            vx_fft = get_var("vx_fft")
-            vy_fft = get_var("vy_fft")
-            vz_fft = get_var("vz_fft")
-            b_fft = get_var("b_fft")
-
-            PK1_fft = np.real(
-                vx_fft.conj() * fx_fft
-                + vy_fft.conj() * fy_fft
-                + vz_fft.conj() * fz_fft
-            )
-            PK2_fft = abs(fx_fft) ** 2 + abs(fy_fft) ** 2 + abs(fz_fft) ** 2
-
-            PK1 = self.sum_wavenumbers(np.ascontiguousarray(PK1_fft))
-            PK2 = self.sum_wavenumbers(PK2_fft) * deltat / 2
+    _keys_forcing = ("PK1", "PK2", "PK_tot", "PA1", "PA2", "PA_tot")
 
-            PA1_fft = np.real(b_fft.conj() * fb_fft)
-            PA2_fft = abs(fb_fft) ** 2
-
-            PA1 = self.sum_wavenumbers(np.ascontiguousarray(PA1_fft))
-            PA2 = self.sum_wavenumbers(PA2_fft) * deltat / 2
+    def _get_weight_shear(self):
+        """Weights for the shear modes (computed once)"""
+        try:
+            return self._weight_shear
+        except AttributeError:
+            pass
+        COND_SHEAR = self.oper.Kx**2 + self.oper.Ky**2 == 0.0
+        self._weight_shear = self.oper.get_weights_sum_wavenumbers(COND_SHEAR)
+        return self._weight_shear
 
-            PA1 *= self.one_over_N2
-            PA2 *= self.one_over_N2
+    def _compute_values(self):
+        """Compute the spatial means (only one MPI reduction)"""
+        nrj_A, nrj_Kz, nrj_Khr, nrj_Khd = self.output.compute_energies_fft()
+        energiesK_fft = (nrj_Kz, nrj_Khr, nrj_Khd)
+        weight_shear = self._get_weight_shear()
+        weights_diss = self._get_weights_diss()
+
+        arrays = [nrj_A, nrj_A, nrj_Kz, nrj_Khr, nrj_Khr, nrj_Khd]
+        weights = [None, weight_shear, None, weight_shear, None, None]
+        for weight in weights_diss.values():
+            arrays.extend(energiesK_fft + (nrj_A,))
+            weights.extend([weight] * 4)
+        if self.params.forcing.enable:
+            keys_K = ("vx_fft", "vy_fft", "vz_fft")
+            arrays.extend(self._compute_power_injection_fft(keys_K))
+            arrays.extend(self._compute_power_injection_fft(("b_fft",)))
+            weights.extend([None] * 4)
+
+        sums = self.oper.sum_wavenumbers_stack(arrays, weights)
+
+        values = {}
+        EA, EAs, EKz, EKhs, EKhr_with_shear, EKhd = sums[:6]
+        values["E"] = EA + EKz + EKhr_with_shear + EKhd
+        values["EA"] = EA
+        values["EKz"] = EKz
+        values["EKhr"] = EKhr_with_shear - EKhs
+        values["EKhd"] = EKhd
+        values["EKhs"] = EKhs
+        values["EAs"] = EAs
+        start = 6
+        for key in weights_diss:
+            values["epsK" + key] = sums[start : start + 3].sum()
+            values["epsA" + key] = sums[start + 3]
+            start += 4
+        values["eps_tot"] = (
+            values["epsK"]
+            + values["epsK_hypo"]
+            + values["epsA"]
+            + values["epsA_hypo"]
+        )
+        if self.params.forcing.enable:
+            values["PK1"], values["PK2"] = sums[start : start + 2]
+            values["PK_tot"] = values["PK1"] + values["PK2"]
+            values["PA1"], values["PA2"] = self.one_over_N2 * sums[start + 2 :]
+            values["PA_tot"] = values["PA1"] + values["PA2"]
+        return values
+
+    def _write_txt(self, tsim, values):
+        v = values
+        self.file.write(
+            f"####\ntime = {tsim:11.5e}\n"
+            f"E    = {v['E']:11.5e}\n"
+            f"EA   = {v['EA']:11.5e} ; EKz   = {v['EKz']:11.5e} ; "
+            f"EKhr   = {v['EKhr']:11.5e} ; EKhd   = {v['EKhd']:11.5e} ; "
+            f"EKhs   = {v['EKhs']:11.5e} ; EAs    = {v['EAs']:11.5e}\n"
+            f"epsK = {v['epsK']:11.5e} ; epsK_hypo = {v['epsK_hypo']:11.5e} ; "
+            f"epsA = {v['epsA']:11.5e} ; epsA_hypo = {v['epsA_hypo']:11.5e} ; "
+            f"eps_tot = {v['eps_tot']:11.5e} \n"
+        )
 
-        if mpi.rank == 0:
+        if "epsK4" in values:
             self.file.write(
-                f"####\ntime = {tsim:11.5e}\n"
-                f"E    = {energy:11.5e}\n"
-                f"EA   = {nrj_A:11.5e} ; EKz   = {nrj_Kz:11.5e} ; "
-                f"EKhr   = {nrj_Khr:11.5e} ; EKhd   = {nrj_Khd:11.5e} ; "
-                f"EKhs   = {nrj_Khs:11.5e} ; EAs    = {nrj_As:11.5e}\n"
-                f"epsK = {epsK:11.5e} ; epsK_hypo = {epsK_hypo:11.5e} ; "
-                f"epsA = {epsA:11.5e} ; epsA_hypo = {epsA_hypo:11.5e} ; "
-                f"eps_tot = {epsK + epsK_hypo + epsA + epsA_hypo:11.5e} \n"
+                f"epsK4 = {v['epsK4']:11.5e} ; epsA4 = {v['epsA4']:11.5e}\n"
             )
 
-            if self.sim.params.nu_4 > 0.0:
-                self.file.write(
-                    f"epsK4 = {epsK4:11.5e} ; epsA4 = {epsA4:11.5e}\n"
-                )
-
-            if self.sim.params.nu_8 > 0.0:
-                self.file.write(
-                    f"epsK8 = {epsK8:11.5e} ; epsA8 = {epsA8:11.5e}\n"
-                )
-
-            if self.sim.params.forcing.enable:
-                self.file.write(
-                    f"PK1  = {PK1:11.5e} ; PK2       = {PK2:11.5e} ; "
-                    f"PK_tot   = {PK1 + PK2:11.5e} \n"
-                    f"PA1  = {PA1:11.5e} ; PA2       = {PA2:11.5e} ; "
-                    f"PA_tot   = {PA1 + PA2:11.5e} \n"
-                )
-
-            self.file.flush()
-            os.fsync(self.file.fileno())
-
-        if self.has_to_plot and mpi.rank == 0:
-            self.ax_a.plot(tsim, energy, "k.")
-
-            # self.axe_b.plot(tsim, epsK_tot, 'k.')
-            # if self.sim.params.forcing.enable:
-            #     self.axe_b.plot(tsim, PK_tot, 'm.')
+        if "epsK8" in values:
+            self.file.write(
+                f"epsK8 = {v['epsK8']:11.5e} ; epsA8 = {v['epsA8']:11.5e}\n"
+            )
 
-            if tsim - self.t_last_show >= self.period_show:
-                self.t_last_show = tsim
-                fig = self.ax_a.get_figure()
-                fig.canvas.draw()
+        if "PK_tot" in values:
+            self.file.write(
+                f"PK1  = {v['PK1']:11.5e} ; PK2       = {v['PK2']:11.5e} ; "
+                f"PK_tot   = {v['PK_tot']:11.5e} \n"
+                f"PA1  = {v['PA1']:11.5e} ; PA2       = {v['PA2']:11.5e} ; "
+                f"PA_tot   = {v['PA_tot']:11.5e} \n"
+            )
 
-    def load(self):
+    def _load_from_txt(self):
         results = {"name_solver": self.output.name_solver}
 
         with open(self.path_file) as file_means:
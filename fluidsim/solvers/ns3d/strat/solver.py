@@ -137,9 +137,6 @@ class Simul(SimulNS3D):
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
-        ifft_as_arg_destroy = oper.ifft_as_arg_destroy
-        fft_as_arg = oper.fft_as_arg
 
         if state_spect is None:
             spect_get_var = self.state.state_spect.get_var
@@ -151,32 +148,27 @@ class Simul(SimulNS3D):
         vz_fft = spect_get_var("vz_fft")
         b_fft = spect_get_var("b_fft")
 
-        omegax_fft, omegay_fft, omegaz_fft = oper.rotfft_from_vecfft(
-            vx_fft, vy_fft, vz_fft
-        )
+        omegas_fft = self.state.fields_spect_tmp_stack
+        oper.rotfft_from_vecfft_outin(vx_fft, vy_fft, vz_fft, *omegas_fft)
 
         if self.params.f is not None:
-            self._modif_omegafft_with_f(omegax_fft, omegay_fft, omegaz_fft)
-
-        omegax = self.state.fields_tmp[3]
-        omegay = self.state.fields_tmp[4]
-        omegaz = self.state.fields_tmp[5]
+            self._modif_omegafft_with_f(*omegas_fft)
 
-        ifft_as_arg_destroy(omegax_fft, omegax)
-        ifft_as_arg_destroy(omegay_fft, omegay)
-        ifft_as_arg_destroy(omegaz_fft, omegaz)
+        # the transforms of the 3 components are done with one call
+        omegas = self.state.fields_tmp_stack[4:7]
+        oper.ifft_as_arg_stack(omegas_fft, omegas, destroy=True)
+        omegax, omegay, omegaz = omegas
 
         if state_spect is None:
             vx = self.state.state_phys.get_var("vx")
             vy = self.state.state_phys.get_var("vy")
             vz = self.state.state_phys.get_var("vz")
+            b = self.state.state_phys.get_var("b")
         else:
-            vx = self.state.fields_tmp[0]
-            vy = self.state.fields_tmp[1]
-            vz = self.state.fields_tmp[2]
-            ifft_as_arg(vx_fft, vx)
-            ifft_as_arg(vy_fft, vy)
-            ifft_as_arg(vz_fft, vz)
+            # vx_fft, vy_fft, vz_fft and b_fft are the 4 first variables
+            fields = self.state.fields_tmp_stack[:4]
+            oper.ifft_as_arg_stack(state_spect[:4], fields)
+            vx, vy, vz, b = fields
 
         fx, fy, fz = vector_product(vx, vy, vz, omegax, omegay, omegaz)
 
@@ -187,22 +179,11 @@ class Simul(SimulNS3D):
         else:
             tendencies_fft = old
 
-        fx_fft = tendencies_fft.get_var("vx_fft")
-        fy_fft = tendencies_fft.get_var("vy_fft")
-        fz_fft = tendencies_fft.get_var("vz_fft")
-
-        fft_as_arg(fx, fx_fft)
-        fft_as_arg(fy, fy_fft)
-        fft_as_arg(fz, fz_fft)
+        oper.fft_as_arg_stack((fx, fy, fz), tendencies_fft[:3])
 
+        fz_fft = tendencies_fft.get_var("vz_fft")
         fz_fft += b_fft
 
-        if state_spect is None:
-            b = self.state.state_phys.get_var("b")
-        else:
-            b = self.state.fields_tmp[3]
-            ifft_as_arg(b_fft, b)
-
         div_vb_fft = oper.div_vb_fft_from_vb(vx, vy, vz, b)
         fb_fft = compute_fb_fft(div_vb_fft, self.params.N, vz_fft)
 
@@ -13,6 +13,9 @@ class StateNS3DStrat(StateNS3D):
 
     """
 
+    # one more array for b in Simul.tendencies_nonlin
+    _nb_fields_tmp = 7
+
     @classmethod
     def _complete_info_solver(cls, info_solver):
         """Complete the ParamContainer info_solver."""
@@ -57,6 +57,25 @@ class TestTendency(TestSimulBase):
 
         self.assertGreater(1e-15, abs(ratio))
 
+    def test_check_finite(self):
+        if mpi.nb_proc > 1:
+            return
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        b_fft = sim.state.state_spect.get_var("b_fft")
+        b_fft[1, 2, 3] = np.nan
+        assert time_stepping._nb_steps_check_finite == 20
+        it = time_stepping.it
+        # no check when it is not a multiple of nb_steps_check_finite
+        time_stepping.it = 21
+        time_stepping._check_finite(sim.state.state_spect)
+        time_stepping.it = 40
+        with pytest.raises(ValueError, match="nan or inf in b_fft") as info:
+            time_stepping._check_finite(sim.state.state_spect)
+        assert "index (1, 2, 3)" in str(info.value)
+        b_fft[1, 2, 3] = 0.0
+        time_stepping.it = it
+
 
 class TestOutput(TestSimulBase):
     @classproperty
@@ -135,6 +154,13 @@ class TestOutput(TestSimulBase):
 
         data = sim2.output.spatial_means.load()
         assert "EKhs" in data
+
+        spatial_means = sim2.output.spatial_means
+        data_txt = spatial_means._load_from_txt()
+        data_h5 = spatial_means._load_from_h5()
+        for key, value in data_txt.items():
+            if key != "name_solver":
+                assert np.allclose(data_h5[key], value, rtol=1e-5, atol=1e-14)
         sim2.output.spatial_means.load_dataset()
         sim2.output.spatial_means.plot(plot_injection=True, plot_hyper=True)
         sim2.output.spatial_means.plot_dt_E()
@@ -263,6 +289,8 @@ class TestNoShearModes(TestSimulBase):
         params.time_stepping.deltat0 = deltat = 0.08
 
         params.output.periods_save.spatial_means = deltat
+        # only the hdf5 file
+        params.output.spatial_means.SAVE_TXT = False
         params.output.periods_save.spectra = deltat
         params.output.spectra.kzkh_periodicity = 1
 
@@ -275,6 +303,7 @@ class TestNoShearModes(TestSimulBase):
             tmin=0.2, key_to_load=["Khd", "Kz", "Khr", "A"]
         )
         means = sim.output.spatial_means.load()
+        assert len(means["t"]) == 5
         if mpi.nb_proc > 1:
             mpi.comm.barrier()
 
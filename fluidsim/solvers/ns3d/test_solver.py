@@ -1,14 +1,18 @@
 import unittest
+import shutil
 import sys
+from copy import deepcopy
 from pathlib import Path
 from math import pi
 
 import pytest
 
 import numpy as np
+import h5py
 import matplotlib.pyplot as plt
 
 import fluiddyn.util.mpi as mpi
+from fluiddyn.io import stdout_redirected
 
 import fluidsim as fls
 from fluidsim.util import get_dataframe_from_paths
@@ -191,6 +195,12 @@ class TestOutput(TestSimulBase):
             sim2.output.print_stdout.plot()
             sim2.output.spatial_means.load()
             sim2.output.spatial_means.load_dataset()
+            spatial_means = sim2.output.spatial_means
+            data_txt = spatial_means._load_from_txt()
+            data_h5 = spatial_means._load_from_h5()
+            for key, value in data_txt.items():
+                if key != "name_solver":
+                    assert np.allclose(data_h5[key], value, rtol=1e-5, atol=1e-14)
             sim2.output.spatial_means.plot(plot_injection=True, plot_hyper=True)
             sim2.output.spatial_means.plot_dt_E()
             sim2.output.spectra.load1d_mean()
@@ -276,8 +286,28 @@ class TestOutput(TestSimulBase):
         spatiotemporal_spectra = sim3.output.spatiotemporal_spectra
         series_kxkykz = spatiotemporal_spectra.load_time_series(tmax=t_end)
 
+        path_out = Path(path_run) / "series_kxkykz.h5"
+        series_out = spatiotemporal_spectra.load_time_series(
+            tmax=t_end, path_out=path_out, nb_processes=2
+        )
+        for key, value in series_kxkykz.items():
+            assert np.array_equal(series_out[key][...], value), key
+
         spatiotemporal_spectra.get_spectra(tmax=t_end)
-        spatiotemporal_spectra.get_spectra(tmax=t_end)
+        spectra_kzkhomega, tspectra = spatiotemporal_spectra.get_spectra(
+            tmax=t_end
+        )
+
+        (
+            spectra_welch,
+            tspectra_welch,
+        ) = spatiotemporal_spectra.compute_spectra_kzkhomega_welch(
+            tmax=t_end, nperseg=series_kxkykz["times"].size, window="boxcar"
+        )
+        for key in ("spectrum_vx", "spectrum_K", "omegas"):
+            assert np.allclose(spectra_welch[key], spectra_kzkhomega[key]), key
+            assert np.allclose(tspectra_welch[key], tspectra[key]), key
+        spatiotemporal_spectra.save_spectra_kzkhomega_welch(tmax=t_end, nperseg=4)
 
         spectra_kxkykzomega = spatiotemporal_spectra.compute_spectra(tmax=t_end)
         spectra_omega_from_spatiotemp = (
@@ -408,6 +438,267 @@ class TestOutput(TestSimulBase):
         sim.output.get_mean_values(customize=customize)
 
 
+class TestOutputProbesBuffered(TestSimulBase):
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        params.init_fields.type = "dipole"
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.05
+        params.time_stepping.t_end = 0.5
+
+        params.output.periods_save.temporal_spectra = 0.05
+        params.output.periods_save.spatiotemporal_spectra = 0.05
+        p_tspec = params.output.temporal_spectra
+        p_tspec.probes_deltax = p_tspec.probes_deltay = 1.0
+        p_tspec.probes_deltaz = 1.0
+        for p_output in (p_tspec, params.output.spatiotemporal_spectra):
+            p_output.buffer_size = 4
+            p_output.aggregate = "all"
+        # to get several files
+        params.output.spatiotemporal_spectra.file_max_size = 0.01
+
+    def test_probes_buffered(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        params = deepcopy(sim.params)
+        for p_output in (
+            params.output.temporal_spectra,
+            params.output.spatiotemporal_spectra,
+        ):
+            p_output.buffer_size = 0
+            p_output.aggregate = None
+        sim_ref = self.Simul(params)
+        sim_ref.time_stepping.start()
+
+        if mpi.nb_proc > 1:
+            return
+
+        paths = sorted(
+            Path(sim.output.spatiotemporal_spectra.path_dir).glob("rank*.h5")
+        )
+        assert len(paths) > 1
+        with h5py.File(paths[0], "r") as file:
+            assert file.attrs["aggregate"] == "all"
+            assert file["vx_Fourier_loc"].chunks[1] == 4
+
+        for name in ("temporal_spectra", "spatiotemporal_spectra"):
+            series = getattr(sim.output, name).load_time_series()
+            series_ref = getattr(sim_ref.output, name).load_time_series()
+            assert series.keys() == series_ref.keys()
+            assert len(series["times"]) > 4
+            for key, value in series.items():
+                if isinstance(value, list):
+                    value = np.concatenate(value)
+                    value_ref = np.concatenate(series_ref[key])
+                else:
+                    value_ref = series_ref[key]
+                assert np.allclose(value, value_ref), key
+
+        # one-pass rearrangement (several blocks of times and processes)
+        temporal_spectra = sim.output.temporal_spectra
+        temporal_spectra.save_data_as_phys_fields(
+            max_mem_buffer=1e-3, nb_processes=2
+        )
+        paths = sorted(
+            (temporal_spectra.path_dir / "phys_fields").glob("probes_*.h5")
+        )
+        assert len(paths) == len(series_ref["times"])
+        oper = sim.oper
+        deltas = (oper.deltaz, oper.deltay, oper.deltax)
+        with h5py.File(paths[-1], "r") as file:
+            coords = (file["z"][:, 0, 0], file["y"][0, :, 0], file["x"][0, 0])
+            # the probes on the upper boundaries are not recorded
+            valid = [
+                coord < delta * n - 1e-10
+                for coord, delta, n in zip(coords, deltas, oper.shapeX_seq)
+            ]
+            indices = [
+                np.rint(coord[cond] / delta).astype(int)
+                for coord, cond, delta in zip(coords, valid, deltas)
+            ]
+            for key in sim.state.keys_state_phys:
+                field = file[key][:][np.ix_(*valid)]
+                field_state = sim.state.get_var(key)[np.ix_(*indices)]
+                assert np.allclose(field, field_state, rtol=1e-5), key
+
+        # restart with buffered and aggregated probes
+        sim3 = load_state_phys_file(sim.output.path_run, modif_save_params=False)
+        sim3.params.time_stepping.t_end += 0.2
+        sim3.time_stepping.start()
+        times = sim3.output.temporal_spectra.load_time_series()["times"]
+        assert np.allclose(np.diff(times), 0.05)
+        assert np.isclose(times[-1], 0.7)
+
+        # fake files of 2 processes, merged in decomposition independent files
+        spatiotemporal_spectra = sim_ref.output.spatiotemporal_spectra
+        series_ref = spatiotemporal_spectra.load_time_series()
+        names_probes = [f"probes_{n}_loc" for n in ("k0adim", "k1adim", "k2adim")]
+        names_probes += [f"probes_ik{index}_loc" for index in range(3)]
+        keys = [key + "_Fourier_loc" for key in sim.state.keys_state_phys]
+        path_dir = spatiotemporal_spectra.path_dir
+        for path in sorted(path_dir.glob("rank*.h5")):
+            _split_probes_file(path, names_probes, keys)
+        assert len(list(path_dir.glob("rank00001_*.h5"))) > 0
+        spatiotemporal_spectra.consolidate_files()
+        assert not list(path_dir.glob("rank00001_*.h5"))
+        assert (path_dir / "per_rank_nb_proc2").exists()
+        series = spatiotemporal_spectra.load_time_series()
+        for key, value in series.items():
+            assert np.allclose(value, series_ref[key]), key
+
+        # restart with another layout (the files are consolidated if needed)
+        series_ref = sim_ref.output.temporal_spectra.load_time_series()
+        params, Simul = load_for_restart(sim_ref.output.path_run)
+        params.time_stepping.t_end += 0.2
+        params.output.temporal_spectra.aggregate = "all"
+        sim4 = Simul(params)
+        sim4.time_stepping.start()
+        path_dir = sim4.output.temporal_spectra.path_dir
+        assert (path_dir / "per_rank_nb_proc1").exists()
+        series = sim4.output.temporal_spectra.load_time_series()
+        times = series["times"]
+        assert np.allclose(np.diff(times), 0.05)
+        assert np.isclose(times[-1], 0.7)
+
+        # run killed before the first flush in a new file (file without times)
+        for name in ("temporal_spectra", "spatiotemporal_spectra"):
+            path_dir = getattr(sim3.output, name).path_dir
+            _add_empty_probes_file(sorted(path_dir.glob("rank*.h5"))[-1])
+        sim4 = load_state_phys_file(sim.output.path_run, modif_save_params=False)
+        sim4.params.time_stepping.t_end += 0.1
+        sim4.time_stepping.start()
+        times = sim4.output.temporal_spectra.load_time_series()["times"]
+        # the times are saved as float32 (0.7 can be saved twice at restart)
+        assert np.allclose(np.diff(np.unique(times)), 0.05)
+        t_end = sim4.time_stepping.t
+        assert np.isclose(times[-1], t_end)
+        spatiotemporal_spectra = sim4.output.spatiotemporal_spectra
+        times = spatiotemporal_spectra.load_time_series()["times"]
+        assert np.isclose(times[-1], t_end)
+        nb_times = len(series_ref["times"])
+        for key, value in series_ref.items():
+            if key != "times":
+                value = np.concatenate(value)
+                assert np.allclose(
+                    np.concatenate(series[key])[:, :nb_times], value
+                ), key
+
+        # restart with another group of processes (same number of processes)
+        path_dir = sim4.output.temporal_spectra.path_dir
+        paths = sorted(path_dir.glob("rank*.h5"))
+        with h5py.File(paths[-1], "r+") as file:
+            nb_probes = file["probes_vx_loc"].shape[0]
+            assert file.attrs["nbs_probes_group"].tolist() == [nb_probes]
+            index_file = file.attrs["index_file"]
+            file.attrs["nbs_probes_group"] = [nb_probes - 1, 1]
+        sim5 = load_state_phys_file(sim.output.path_run, modif_save_params=False)
+        sim5.params.time_stepping.t_end += 0.1
+        sim5.time_stepping.start()
+        paths = sorted(path_dir.glob("rank*.h5"))
+        with h5py.File(paths[-1], "r") as file:
+            assert file.attrs["index_file"] == index_file + 1
+            assert file.attrs["nbs_probes_group"].tolist() == [nb_probes]
+        times = sim5.output.temporal_spectra.load_time_series()["times"]
+        assert np.isclose(times[-1], sim5.time_stepping.t)
+
+
+def _add_empty_probes_file(path_last):
+    """Create the next file of a probes output without times
+
+    As a file created just before a simulation is killed (before the first
+    flush of the buffer).
+
+    """
+    with h5py.File(path_last, "r") as file:
+        tmax = file["times"][-1]
+    tmin_str = path_last.name[14:-3]
+    path_new = path_last.with_name(
+        f"{path_last.name[:14]}{tmax + 0.01:0{len(tmin_str)}.3f}.h5"
+    )
+    shutil.copyfile(path_last, path_new)
+    with h5py.File(path_new, "r+") as file:
+        file.attrs["index_file"] += 1
+        for dset in file.values():
+            if dset.maxshape[-1] is None:
+                dset.resize(0, axis=dset.ndim - 1)
+
+
+def _split_probes_file(path, names_probes, keys):
+    """Replace a probes file by the files of 2 (fake) processes"""
+    paths_new = []
+    with h5py.File(path, "r") as file:
+        half = file[keys[0]].shape[0] // 2
+        for rank, slice_probes in enumerate((slice(0, half), slice(half, None))):
+            path_new = path.with_name(f"rank{rank:05}{path.name[9:]}.tmp")
+            with h5py.File(path_new, "w") as file_new:
+                file_new.attrs.update(file.attrs)
+                file_new.attrs["nb_proc"] = 2
+                for name in file.keys():
+                    value = file[name][()]
+                    if name in names_probes or name in keys:
+                        value = value[slice_probes]
+                    file_new.create_dataset(name, data=value, maxshape=None)
+            paths_new.append(path_new)
+    for path_new in paths_new:
+        path_new.rename(path_new.with_suffix(""))
+
+
+class TestSpatialMeansH5(TestSimulBase):
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.05
+        params.time_stepping.t_end = 0.5
+        params.output.periods_save.spatial_means = 0.05
+        params.output.spatial_means.SAVE_TXT = False
+        params.output.buffer_size_hdf5 = 4
+
+    def test_restart_other_keys(self):
+        if mpi.nb_proc > 1:
+            return
+        sim = self.sim
+        spatial_means = sim.output.spatial_means
+        with stdout_redirected():
+            sim.time_stepping.start()
+        nb_times = spatial_means.load()["t"].size
+        # one time saved in the buffer of the writer (not yet in the file)
+        spatial_means._save_one_time()
+        assert len(spatial_means._hdf5_writers[spatial_means.path_file_h5]._times)
+        assert spatial_means.time_last_saved() == sim.time_stepping.t
+        means = spatial_means.load()
+        assert means["t"].size == nb_times + 1
+        spatial_means._close_hdf5_writers()
+        nb_times += 1
+        assert "epsK4" in means and np.all(means["PK_tot"] == 0.0)
+
+        # restart with the forcing and without nu_4
+        params, Simul = load_for_restart(sim.output.path_run)
+        params.time_stepping.t_end += 0.5
+        params.nu_4 = 0.0
+        params.forcing.enable = True
+        params.forcing.type = "tcrandom"
+        params.forcing.key_forced = "vx_fft"
+        params.forcing.nkmin_forcing = 1
+        params.forcing.nkmax_forcing = 3
+        with stdout_redirected():
+            sim2 = Simul(params)
+            sim2.time_stepping.start()
+            means = sim2.output.spatial_means.load()
+
+        assert means["t"][-1] == sim2.time_stepping.t
+        for key in ("PK1", "PK2", "PK_tot"):
+            assert np.all(np.isnan(means[key][:nb_times])), key
+            assert not np.any(np.isnan(means[key][nb_times:])), key
+        assert not np.any(np.isnan(means["epsK4"][:nb_times]))
+        assert np.all(np.isnan(means["epsK4"][nb_times:]))
+        for key, value in means.items():
+            if key != "name_solver":
+                assert value.shape == means["t"].shape, key
+
+
 class TestInitInScript(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -439,6 +730,87 @@ class TestInitInScript(TestSimulBase):
         sim.state.init_from_vxvyvzfft(vx_fft, vy_fft, vz_fft)
         sim.state.check_energy_equal_phys_spect()
 
+    def test_cache_computed(self):
+        state = self.sim.state
+        vars_computed = state.vars_computed
+        state.init_statephys_from(
+            vx=state.oper.create_arrayX_random(),
+            vy=state.oper.create_arrayX_random(),
+        )
+        state.statespect_from_statephys()
+        vars_computed.nb_hits.clear()
+        vars_computed.nb_misses.clear()
+
+        rotz = state.get_var("rotz")
+        assert state.get_var("rotz") is rotz
+        assert vars_computed.get_stats()["rotz"] == {"hits": 1, "misses": 1}
+
+        # the cache is invalidated when the state is modified
+        state.init_statespect_from(vx_fft=2 * state.get_var("vx_fft"))
+        del rotz
+        rotz = state.get_var("rotz")
+        rotz_fft = state.oper.rotzfft_from_vxvyfft(
+            state.get_var("vx_fft"), state.get_var("vy_fft")
+        )
+        assert np.allclose(rotz, state.oper.ifft(rotz_fft))
+        assert vars_computed.nb_misses["rotz"] == 2
+
+        # an array given by the cache is never modified by the cache
+        rotz_old = rotz.copy()
+        state.init_statespect_from(vx_fft=2 * state.get_var("vx_fft"))
+        rotz_new = state.get_var("rotz")
+        assert rotz_new is not rotz
+        assert np.array_equal(rotz, rotz_old)
+        assert not np.allclose(rotz_new, rotz)
+        # the outdated value is removed from the cache
+        state.invalidate_computed()
+        assert "rotz" not in vars_computed
+        assert vars_computed.nbytes == 0
+
+        # bounded memory
+        max_nbytes = vars_computed._max_nbytes
+        vars_computed._max_nbytes = int(1.5 * state.get_var("rotz").nbytes)
+        try:
+            state.get_var("divh")
+            assert "rotz" not in vars_computed
+            assert "divh" in vars_computed
+            assert vars_computed.nbytes <= vars_computed._max_nbytes
+        finally:
+            vars_computed._max_nbytes = max_nbytes
+
+
+class TestInitFromSimul(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+
+    def test_from_simul(self):
+        sim = self.sim
+        params = deepcopy(sim.params)
+        params.init_fields.type = "from_simul"
+        params.oper.nx *= 2
+        params.oper.ny *= 2
+        params.oper.nz *= 2
+        params.output.HAS_TO_SAVE = False
+
+        with stdout_redirected():
+            sim_big = self.Simul(params)
+        sim_big.init_fields.get_state_from_simul(sim)
+
+        energy = sim.output.compute_energy()
+        assert np.allclose(sim_big.output.compute_energy(), energy)
+
+        # back to the initial resolution
+        params = deepcopy(sim.params)
+        params.init_fields.type = "from_simul"
+        with stdout_redirected():
+            sim_small = self.Simul(params)
+        sim_small.init_fields.get_state_from_simul(sim_big)
+
+        # the Nyquist modes are removed by the dealiasing
+        assert np.allclose(sim_small.state.state_spect, sim.state.state_spect)
+
 
 class TestForcingTaylorGreen(TestSimulBase):
     @classmethod
@@ -457,6 +829,35 @@ class TestForcingTaylorGreen(TestSimulBase):
         sim.time_stepping.start()
         sim.state.check_energy_equal_phys_spect()
 
+    def test_forcing_once(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        params_ts = sim.params.time_stepping
+        type_time_scheme = params_ts.type_time_scheme
+        state_spect = sim.state.state_spect
+        state_spect_init = state_spect.copy()
+        sim.forcing.compute()
+
+        results = {}
+        for type_scheme in ("RK2", "RK4"):
+            for suffix in ("", "_forcing_once"):
+                params_ts.type_time_scheme = type_scheme + suffix
+                time_stepping._init_time_scheme()
+                state_spect[:] = state_spect_init
+                time_stepping.one_time_step_computation()
+                results[type_scheme + suffix] = state_spect.copy()
+
+        params_ts.type_time_scheme = type_time_scheme
+        time_stepping._init_time_scheme()
+        state_spect[:] = state_spect_init
+        sim.state.statephys_from_statespect()
+
+        # the intermediate stages do not see the forcing (splitting error)
+        for type_scheme in ("RK2", "RK4"):
+            result = results[type_scheme]
+            diff = abs(results[type_scheme + "_forcing_once"] - result).max()
+            assert diff < 1e-2 * abs(result - state_spect_init).max()
+
 
 class TestForcingTimeCorrelatedRandomPseudoSpectralAnisotropic3D(TestSimulBase):
     @classmethod
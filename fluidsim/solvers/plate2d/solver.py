@@ -197,7 +197,7 @@ class Simul(SimulBasePseudoSpectral):
         #     tendencies_fft, w_fft, z_fft, chi_fft)
         # print('ratio:', ratio)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
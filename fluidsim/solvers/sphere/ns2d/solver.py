@@ -124,7 +124,7 @@ class SimulSphereNS2D(SimulSphericalHarmo):
             )
         )
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_sh += self.forcing.get_forcing()
 
         return tendencies_sh
@@ -178,7 +178,7 @@ class SimulSphereSW1L(SimulSphericalHarmo):
         # check_conservation(Fdiv_sh, div_sh, "div")
         # print()
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_sh += self.forcing.get_forcing()
 
         return tendencies_sh
@@ -92,7 +92,7 @@ class Simul(SimulSW1LExactLin):
         tendencies_fft.set_var("ap_fft", Np_fft)
         tendencies_fft.set_var("am_fft", Nm_fft)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
@@ -111,7 +111,7 @@ class Simul(SimulSW1L):
 
         oper.dealiasing(tendencies_fft)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
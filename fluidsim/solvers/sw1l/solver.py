@@ -240,7 +240,7 @@ class Simul(SimulBasePseudoSpectral):
 
         oper.dealiasing(tendencies_fft)
 
-        if self.params.forcing.enable:
+        if self.is_forcing_enabled:
             tendencies_fft += self.forcing.get_forcing()
 
         return tendencies_fft
@@ -16,6 +16,9 @@ Provides:
 
 .. autofunction:: load_state_phys_file
 
+.. autoclass:: LazyStatePhys
+   :members:
+
 .. autofunction:: load_for_restart
 
 .. autofunction:: load_params_simul
@@ -41,6 +44,7 @@ Provides:
 from .util import (
     load_sim_for_plot,
     load_state_phys_file,
+    LazyStatePhys,
     load_for_restart,
     load_params_simul,
     times_start_last_from_path,
@@ -61,6 +65,7 @@ from .util import (
 __all__ = [
     "load_sim_for_plot",
     "load_state_phys_file",
+    "LazyStatePhys",
     "load_for_restart",
     "load_params_simul",
     "times_start_last_from_path",
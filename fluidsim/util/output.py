@@ -1,4 +1,10 @@
+import atexit
 import datetime
+import json
+import os
+import queue
+import threading
+from pathlib import Path
 
 import numpy as np
 import h5py
@@ -15,6 +21,215 @@ else:
     ext = "nc"
     h5pack = h5netcdf
 
+name_index_state_phys = "index_state_phys.jsonl"
+
+
+def _get_path_index(path_dir):
+    return Path(path_dir) / name_index_state_phys
+
+
+def _time_from_name(name):
+    """Get the time from the name of a state_phys file"""
+    if name.startswith("state_phys_t="):
+        tmp = name[len("state_phys_t=") :]
+    else:
+        tmp = name[len("state_phys_t") :]
+    tmp = ".".join(tmp.split(".")[:2])
+    if "_" in tmp:
+        tmp = tmp[: tmp.index("_")]
+    return float(tmp)
+
+
+def _entry_from_name(name):
+    """Index entry of a file not yet indexed (no file opened)
+
+    The values of ``it``, ``variables`` and ``shape`` are None (see
+    :func:`_complete_entry`).
+
+    """
+    return dict(
+        name=name, time=_time_from_name(name), it=None, variables=None, shape=None
+    )
+
+
+def _complete_entry(path_dir, entry):
+    """Read ``it``, ``variables`` and ``shape`` in a state_phys file"""
+    with h5py.File(Path(path_dir) / entry["name"], "r") as file:
+        group = file["state_phys"]
+        variables = [
+            key
+            for key, dset in group.items()
+            # netCDF dimensions are stored as dimension scales
+            if dset.attrs.get("CLASS") != b"DIMENSION_SCALE"
+        ]
+        shape = group[variables[0]].shape if variables else ()
+        entry.update(
+            time=float(group.attrs["time"]),
+            it=int(group.attrs["it"]),
+            variables=variables,
+            shape=list(shape),
+        )
+
+
+def _read_index(path_index):
+    entries = {}
+    with open(path_index) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # truncated line (interrupted write?)
+                continue
+            entries[entry["name"]] = entry
+    return entries
+
+
+# indexes which could not be written (read-only directories)
+_indexes_in_memory = {}
+
+
+def _write_index(path_index, entries):
+    """Write the index (or keep it in memory if the directory is read-only)"""
+    if mpi.rank > 0:
+        # only the process 0 writes the index
+        _indexes_in_memory[path_index] = (
+            path_index.parent.stat().st_mtime,
+            entries,
+        )
+        return
+    path_tmp = path_index.with_name(path_index.name + ".tmp")
+    try:
+        with open(path_tmp, "w") as file:
+            for name in sorted(entries):
+                file.write(json.dumps(entries[name]) + "\n")
+        os.replace(path_tmp, path_index)
+        # the rename modifies the directory: the index has to stay newer
+        os.utime(path_index)
+    except OSError:
+        try:
+            path_tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+        _indexes_in_memory[path_index] = (
+            path_index.parent.stat().st_mtime,
+            entries,
+        )
+    else:
+        _indexes_in_memory.pop(path_index, None)
+
+
+def _rebuild_index(path_dir, entries=None):
+    """Glob the state_phys files and update the index
+
+    No file is opened: the times of the files not already in ``entries`` are
+    obtained from their names.
+
+    """
+    if entries is None:
+        entries = {}
+    path_dir = Path(path_dir)
+    entries_new = {}
+    for path_file in sorted(path_dir.glob("state_phys_t*.[hn]*")):
+        name = path_file.name
+        if name in entries:
+            entries_new[name] = entries[name]
+            continue
+        try:
+            entries_new[name] = _entry_from_name(name)
+        except ValueError:
+            # not a fluidsim file
+            continue
+    _write_index(_get_path_index(path_dir), entries_new)
+    return entries_new
+
+
+def _get_index_dict(path_dir):
+    path_index = _get_path_index(path_dir)
+    try:
+        mtime_dir = path_dir.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    try:
+        mtime_index = path_index.stat().st_mtime
+    except FileNotFoundError:
+        try:
+            mtime_memory, entries = _indexes_in_memory[path_index]
+        except KeyError:
+            return _rebuild_index(path_dir)
+        if mtime_dir > mtime_memory:
+            entries = _rebuild_index(path_dir, entries)
+        return entries
+    entries = _read_index(path_index)
+    if mtime_dir > mtime_index:
+        entries = _rebuild_index(path_dir, entries)
+    return entries
+
+
+def get_index_state_phys(path_dir, details=False):
+    """Get the index of the state_phys files of a directory
+
+    The index is a file ``index_state_phys.jsonl`` updated each time a
+    state_phys file is saved, so that no directory listing is needed. It is
+    rebuilt (by globbing, without opening the files) when it does not exist or
+    when the directory has been modified after the index. If the index cannot
+    be written (read-only directory), it is kept in memory.
+
+    Parameters
+    ----------
+
+    path_dir : str or Path
+
+    details : bool (default False)
+
+      If True, the files indexed without details (times from their names) are
+      opened to get ``it``, ``variables`` and ``shape``.
+
+    Returns
+    -------
+
+    entries : list of dict
+
+      One entry per file (sorted by name) with the keys ``name``, ``time``,
+      ``it``, ``variables`` and ``shape`` (the last 3 values can be None if
+      ``details`` is False).
+
+    """
+    path_dir = Path(path_dir)
+    entries = _get_index_dict(path_dir)
+    if details:
+        to_complete = [
+            entry for entry in entries.values() if entry["variables"] is None
+        ]
+        for entry in to_complete:
+            _complete_entry(path_dir, entry)
+        if to_complete:
+            _write_index(_get_path_index(path_dir), entries)
+    return [entries[name] for name in sorted(entries)]
+
+
+def _add_to_index(path_file, time, it, variables, shape):
+    """Add a new state_phys file to the index (process 0)"""
+    path_file = Path(path_file)
+    path_index = _get_path_index(path_file.parent)
+    entry = dict(
+        name=path_file.name,
+        time=float(time),
+        it=int(it),
+        variables=list(variables),
+        shape=[int(n) for n in shape],
+    )
+    if not path_index.exists():
+        # files saved before the index existed have to be indexed
+        entries = _get_index_dict(path_file.parent)
+        entries[entry["name"]] = entry
+        _write_index(path_index, entries)
+        return
+    try:
+        with open(path_index, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+
 
 def _create_variable(group, key, field):
     if ext == "nc":
@@ -44,6 +259,57 @@ def _create_variable(group, key, field):
             )
 
 
+def _create_group_state_phys(h5file, name_type_variables, time, it):
+    group_state_phys = h5file.create_group("state_phys")
+    group_state_phys.attrs["what"] = "obj state_phys for fluidsim"
+    group_state_phys.attrs["name_type_variables"] = name_type_variables
+    group_state_phys.attrs["time"] = time
+    group_state_phys.attrs["it"] = it
+    return group_state_phys
+
+
+def _save_attrs_and_info(
+    h5file, sim_info, output_name_run, axes, particular_attr=None
+):
+    h5file.attrs["date saving"] = str(datetime.datetime.now()).encode()
+    h5file.attrs["name_solver"] = sim_info.solver.short_name
+    h5file.attrs["name_run"] = output_name_run
+    h5file.attrs["axes"] = np.array(axes, dtype="|S9")
+    if particular_attr is not None:
+        h5file.attrs["particular_attr"] = particular_attr
+
+    sim_info._save_as_hdf5(hdf5_parent=h5file)
+    gp_info = h5file["info_simul"]
+    gf_params = gp_info["params"]
+    gf_params.attrs["SAVE"] = 1
+    gf_params.attrs["NEW_DIR_RESULTS"] = 1
+
+
+def save_file_seq(
+    path_file,
+    fields_seq,
+    name_type_variables,
+    sim_info,
+    output_name_run,
+    axes,
+    time,
+    it,
+    particular_attr=None,
+):
+    """Save sequential fields (given as a dict) in a file (only one process)"""
+    with h5pack.File(str(path_file), "w") as h5file:
+        group_state_phys = _create_group_state_phys(
+            h5file, name_type_variables, time, it
+        )
+        for key, field_seq in fields_seq.items():
+            _create_variable(group_state_phys, key, field_seq)
+        _save_attrs_and_info(
+            h5file, sim_info, output_name_run, axes, particular_attr
+        )
+    field_seq = next(iter(fields_seq.values()))
+    _add_to_index(path_file, time, it, fields_seq.keys(), field_seq.shape)
+
+
 def save_file(
     path_file,
     state_phys,
@@ -55,12 +321,7 @@ def save_file(
     particular_attr=None,
 ):
     def create_group_with_attrs(h5file):
-        group_state_phys = h5file.create_group("state_phys")
-        group_state_phys.attrs["what"] = "obj state_phys for fluidsim"
-        group_state_phys.attrs["name_type_variables"] = state_phys.info
-        group_state_phys.attrs["time"] = time
-        group_state_phys.attrs["it"] = it
-        return group_state_phys
+        return _create_group_state_phys(h5file, state_phys.info, time, it)
 
     if mpi.nb_proc == 1 or not cfg_h5py.mpi:
         if mpi.rank == 0:
@@ -74,12 +335,14 @@ def save_file(
         for k in state_phys.keys:
             field_seq = state_phys.get_var(k)
             _create_variable(group_state_phys, k, field_seq)
+        shape_seq = field_seq.shape
     elif not cfg_h5py.mpi:
         for k in state_phys.keys:
             field_loc = state_phys.get_var(k)
             field_seq = oper.gather_Xspace(field_loc)
             if mpi.rank == 0:
                 _create_variable(group_state_phys, k, field_seq)
+        shape_seq = field_seq.shape
     else:
         h5file.atomic = False
         ndim = len(oper.shapeX_loc)
@@ -106,18 +369,167 @@ def save_file(
         h5file.close()
         if mpi.rank == 0:
             h5file = h5pack.File(str(path_file), "r+")
+        shape_seq = oper.shapeX_seq
 
     if mpi.rank == 0:
-        h5file.attrs["date saving"] = str(datetime.datetime.now()).encode()
-        h5file.attrs["name_solver"] = sim_info.solver.short_name
-        h5file.attrs["name_run"] = output_name_run
-        h5file.attrs["axes"] = np.array(oper.axes, dtype="|S9")
-        if particular_attr is not None:
-            h5file.attrs["particular_attr"] = particular_attr
-
-        sim_info._save_as_hdf5(hdf5_parent=h5file)
-        gp_info = h5file["info_simul"]
-        gf_params = gp_info["params"]
-        gf_params.attrs["SAVE"] = 1
-        gf_params.attrs["NEW_DIR_RESULTS"] = 1
+        _save_attrs_and_info(
+            h5file, sim_info, output_name_run, oper.axes, particular_attr
+        )
         h5file.close()
+        _add_to_index(path_file, time, it, state_phys.keys, shape_seq)
+
+
+class BackgroundSaver:
+    """Save state_phys files in a writer thread
+
+    The fields are copied (sequential runs) or gathered on the process 0
+    (parallel runs) in one of ``nb_buffers`` buffers and the time loop can
+    continue while the file is written by a thread of the process 0. When all
+    buffers are waiting to be written, :meth:`save` blocks until one of them
+    is available, so that the memory used is bounded.
+
+    With MPI, the writes are done by the process 0 (without the mpio driver).
+    :meth:`save` and :meth:`close` have to be called by all processes: an
+    error in the writer thread is broadcast before any collective
+    communication so that it is raised by all processes together.
+
+    """
+
+    def __init__(self, nb_buffers=2):
+        if nb_buffers < 1:
+            raise ValueError("nb_buffers has to be larger than 0")
+        self.nb_buffers = nb_buffers
+        self._nb_allocated = 0
+        self._free_buffers = queue.Queue()
+        self._tasks = queue.Queue()
+        self._pending = {}
+        self._error = None
+        self._thread = None
+
+    def _start_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="fluidsim-background-saver", daemon=True
+        )
+        self._thread.start()
+        # unregistered in close
+        atexit.register(self._close_at_exit)
+
+    def _stop_thread(self):
+        """Write the pending files, stop the thread and free the buffers"""
+        if self._thread is not None and self._thread.is_alive():
+            self._tasks.put(None)
+            self._thread.join()
+        self._thread = None
+        while True:
+            try:
+                self._free_buffers.get_nowait()
+            except queue.Empty:
+                break
+        self._nb_allocated = 0
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                self._tasks.task_done()
+                break
+            path_file, buffer, keys, kwargs = task
+            try:
+                save_file_seq(path_file, dict(zip(keys, buffer)), **kwargs)
+            except Exception as error:
+                self._error = error
+            finally:
+                self._pending.pop(str(path_file), None)
+                self._free_buffers.put(buffer)
+                self._tasks.task_done()
+
+    def _get_buffer(self, shape, dtype):
+        try:
+            buffer = self._free_buffers.get_nowait()
+        except queue.Empty:
+            if self._nb_allocated < self.nb_buffers:
+                self._nb_allocated += 1
+                return np.empty(shape, dtype=dtype)
+            # back-pressure: wait for the writer thread
+            buffer = self._free_buffers.get()
+        if buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def _raise_if_error(self):
+        """Raise the error of the writer thread on all processes"""
+        error = self._error
+        self._error = None
+        if mpi.nb_proc > 1:
+            message = None if error is None else repr(error)
+            message = mpi.comm.bcast(message, root=0)
+            if message is not None and mpi.rank > 0:
+                raise RuntimeError(
+                    f"Error in the background saver of the process 0: {message}"
+                )
+        if error is not None:
+            raise error
+
+    def get_pending_it(self, path_file):
+        """Return the it of a file still to be written (or None)"""
+        return self._pending.get(str(path_file))
+
+    def save(
+        self,
+        path_file,
+        state_phys,
+        sim_info,
+        output_name_run,
+        oper,
+        time,
+        it,
+        particular_attr=None,
+    ):
+        """Copy the fields and ask the thread to write them"""
+        self._raise_if_error()
+        keys = list(state_phys.keys)
+
+        if mpi.nb_proc == 1:
+            buffer = self._get_buffer(state_phys.shape, state_phys.dtype)
+            np.copyto(buffer, state_phys)
+        else:
+            buffer = None
+            if mpi.rank == 0:
+                shape = (len(keys),) + tuple(oper.shapeX_seq)
+                buffer = self._get_buffer(shape, state_phys.dtype)
+            for index, key in enumerate(keys):
+                field_seq = oper.gather_Xspace(state_phys.get_var(key))
+                if mpi.rank == 0:
+                    buffer[index] = field_seq
+
+        if mpi.rank > 0:
+            return
+
+        kwargs = dict(
+            name_type_variables=state_phys.info,
+            sim_info=sim_info,
+            output_name_run=output_name_run,
+            axes=oper.axes,
+            time=time,
+            it=it,
+            particular_attr=particular_attr,
+        )
+        self._pending[str(path_file)] = it
+        self._start_thread()
+        self._tasks.put((path_file, buffer, keys, kwargs))
+
+    def close(self):
+        """Write the pending files, stop the thread and free the buffers"""
+        atexit.unregister(self._close_at_exit)
+        self._stop_thread()
+        self._raise_if_error()
+
+    def _close_at_exit(self):
+        # no collective communication at exit
+        self._stop_thread()
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
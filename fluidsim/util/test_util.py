@@ -1,8 +1,10 @@
 from pathlib import Path
 import unittest
+from unittest.mock import patch
 
 import numpy as np
 import h5py
+import h5netcdf
 
 from fluiddyn.util import mpi
 
@@ -15,6 +17,13 @@ from fluidsim.solvers.ns3d.test_solver import (
 from fluidsim.util import (
     modif_resolution_from_dir,
     modif_resolution_from_dir_memory_efficient,
+    load_state_phys_file,
+)
+from fluidsim.util.util import name_file_from_time_approx
+from fluidsim.util.output import (
+    get_index_state_phys,
+    name_index_state_phys,
+    _rebuild_index,
 )
 
 
@@ -55,6 +64,17 @@ class TestModifResol3d(TestSimulBase):
 
         assert np.allclose(field_old, field)
 
+        # Finally, the implementation for distributed fields
+        path_big.unlink()
+        modif_resolution_from_dir_memory_efficient(
+            path_run, t_approx, coef_modif_resol, distributed=True
+        )
+
+        with h5py.File(path_big, "r") as file:
+            field = file["/state_phys"][key][...]
+
+        assert np.allclose(field_old, field)
+
 
 class TestModifResol2d(TestModifResol3d):
     @classproperty
@@ -62,3 +82,133 @@ class TestModifResol2d(TestModifResol3d):
         from fluidsim.solvers.ns2d.solver import Simul
 
         return Simul
+
+
+class TestIndexStatePhys(TestSimulBase):
+    def test_index(self):
+        sim = self.sim
+        phys_fields = sim.output.phys_fields
+        phys_fields.save()
+        sim.time_stepping.t = 1.0
+        sim.time_stepping.it = 2
+        phys_fields.save()
+
+        # collective (the index is read by the process 0)
+        name_file = name_file_from_time_approx(sim.output.path_run, 0.9)
+
+        if mpi.rank > 0:
+            return
+
+        path_run = Path(sim.output.path_run)
+        path_index = path_run / name_index_state_phys
+        assert path_index.exists()
+
+        entries = get_index_state_phys(path_run)
+        assert [entry["it"] for entry in entries] == [0, 2]
+        assert [entry["time"] for entry in entries] == [0.0, 1.0]
+        entry = entries[-1]
+        assert (path_run / entry["name"]).exists()
+        assert set(entry["variables"]) == set(sim.state.state_phys.keys)
+        assert entry["shape"] == list(sim.oper.shapeX_seq)
+
+        assert name_file == entry["name"]
+
+        set_of_files = phys_fields.set_of_phys_files
+        set_of_files.update_times()
+        assert np.allclose(set_of_files.times, [0.0, 1.0])
+
+        # rebuilt when missing, without opening the files
+        path_index.unlink()
+        entries_rebuilt = get_index_state_phys(path_run)
+        assert path_index.exists()
+        assert [entry["time"] for entry in entries_rebuilt] == [0.0, 1.0]
+        assert all(entry["variables"] is None for entry in entries_rebuilt)
+        # the files are opened only if the details are needed
+        assert get_index_state_phys(path_run, details=True) == entries
+        assert get_index_state_phys(path_run) == entries
+
+        # read-only directory: the index is kept in memory
+        path_index.unlink()
+        with (
+            patch("fluidsim.util.output.os.replace", side_effect=PermissionError),
+            patch(
+                "fluidsim.util.output._rebuild_index", wraps=_rebuild_index
+            ) as rebuild,
+        ):
+            assert get_index_state_phys(path_run, details=True) == entries
+            assert get_index_state_phys(path_run, details=True) == entries
+        assert rebuild.call_count == 1
+        assert not path_index.exists()
+
+
+class TestLazyStatePhys(TestSimulBase):
+    def test_lazy(self):
+        sim = self.sim
+        sim.output.phys_fields.save()
+
+        if mpi.rank > 0:
+            return
+
+        path_run = Path(sim.output.path_run)
+        path_file = next(path_run.glob("state_phys*"))
+        with h5py.File(path_file, "r") as file:
+            group_state_phys = file["/state_phys"]
+            attrs = dict(group_state_phys.attrs)
+            fields = {
+                key: dset[...]
+                for key, dset in group_state_phys.items()
+                if dset.attrs.get("CLASS") != b"DIMENSION_SCALE"
+            }
+        shape = sim.oper.shapeX_seq
+
+        # copies of the file written with h5py and h5netcdf, with contiguous
+        # and chunked datasets
+        for name, chunks in (("contiguous", None), ("chunked", (2, 4, 4))):
+            with h5py.File(path_run / f"state_phys_{name}.h5", "w") as file:
+                group = file.create_group("state_phys")
+                group.attrs.update(attrs)
+                for key, field in fields.items():
+                    group.create_dataset(key, data=field, chunks=chunks)
+
+            with h5netcdf.File(path_run / f"state_phys_{name}.nc", "w") as file:
+                group = file.create_group("state_phys")
+                group.attrs.update(attrs)
+                group.dimensions = dict(zip(("z", "y", "x"), shape))
+                for key, field in fields.items():
+                    group.create_variable(
+                        key, ("z", "y", "x"), data=field, chunks=chunks
+                    )
+
+        key = "vx"
+        field = sim.state.get_var(key)
+        paths = [path_file] + [
+            path_run / f"state_phys_{name}.{ext}"
+            for name in ("contiguous", "chunked")
+            for ext in ("h5", "nc")
+        ]
+        for path in paths:
+            with load_state_phys_file(path, hide_stdout=True, lazy=True) as state:
+                assert set(state.keys) == set(fields)
+                assert state.it == sim.time_stepping.it
+                assert state.time == sim.time_stepping.t
+
+                array = state.get_var(key)
+                if "chunked" in path.name:
+                    assert isinstance(array, h5py.Dataset)
+                    assert array.chunks == (2, 4, 4)
+                else:
+                    assert isinstance(array, np.memmap)
+                assert state.get_var(key) is array
+
+                # read of a sub-region
+                assert np.allclose(array[1:3, 2:5, 3:7], field[1:3, 2:5, 3:7])
+                assert np.allclose(
+                    state.get_var_fft(key), sim.state.get_var(key + "_fft")
+                )
+
+                with self.assertRaises(ValueError):
+                    state.get_var("not_a_key")
+
+            # the memory-mapped arrays remain usable after close
+            if isinstance(array, np.memmap):
+                assert np.allclose(array[1], field[1])
@@ -129,6 +129,7 @@ class TestSimulConserve(TestSimul):
     @cached_property
     def tendencies_fft(self):
         self.sim.params.forcing.enable = False
+        self.sim.is_forcing_enabled = False
         return self.sim.tendencies_nonlin()
 
     def assertAlmostZero(
@@ -36,10 +36,11 @@ from fluidsim.base.params import (
     load_params_simul,
     merge_params,
 )
+from fluidsim.base.init_fields import FillFieldFFTDistributed
 from fluidsim.base.solvers.info_base import create_info_simul
 from fluidsim.extend_simul import _extend_simul_class_from_path
 
-from .output import save_file
+from .output import save_file, get_index_state_phys
 
 available_solvers = partial(
     loader.available_solvers, entrypoint_grp="fluidsim.solvers"
@@ -127,42 +128,29 @@ def name_file_from_time_approx(path_dir, t_approx=None):
 
       Approximate time of the file to be loaded.
 
-    .. todo::
-
-        Can be elegantly implemented using regex as done in
-        ``fluidsim.base.output.phys_fields.time_from_path``
+    The files are found with the index of the state_phys files (see
+    :func:`fluidsim.util.output.get_index_state_phys`).
 
     """
-    if not isinstance(path_dir, Path):
-        path_dir = Path(path_dir)
-
-    path_files = sorted(path_dir.glob("state_phys_t*"))
+    if mpi.rank == 0:
+        entries = get_index_state_phys(path_dir)
+    else:
+        entries = None
+    if mpi.nb_proc > 1:
+        entries = mpi.comm.bcast(entries, root=0)
 
-    nb_files = len(path_files)
-    if nb_files == 0 and mpi.rank == 0:
+    if not entries:
         raise ValueError("No state file in the dir\n" + str(path_dir))
 
     if t_approx is None:
         # should be the last one but not 100% sure
-        return path_files[-1].name
+        return entries[-1]["name"]
 
-    name_files = [path.name for path in path_files]
-    if "state_phys_t=" in name_files[0]:
-        ind_start_time = len("state_phys_t=")
-    else:
-        ind_start_time = len("state_phys_t")
-
-    times = np.empty([nb_files])
-    for ii, name in enumerate(name_files):
-        tmp = ".".join(name[ind_start_time:].split(".")[:2])
-        if "_" in tmp:
-            tmp = tmp[: tmp.index("_")]
-        times[ii] = float(tmp)
+    times = np.array([entry["time"] for entry in entries])
     if t_approx == "last":
         t_approx = times.max()
     i_file = abs(times - t_approx).argmin()
-    name_file = path_files[i_file].name
-    return name_file
+    return entries[i_file]["name"]
 
 
 def load_sim_for_plot(
@@ -260,11 +248,15 @@ def load_state_phys_file(
     merge_missing_params=False,
     init_with_initialized_state=True,
     hide_stdout=False,
+    lazy=False,
 ):
     """Create a simulation from a file.
 
     For large resolution, creating a simulation object with this function can
-    be slow because the state is initialized with the output file.
+    be slow because the state is initialized with the output file. With
+    ``lazy=True``, the state is not initialized and an object
+    :class:`LazyStatePhys` is returned: the variables are read only when
+    they are used.
 
     Parameters
     ----------
@@ -300,8 +292,20 @@ def load_state_phys_file(
 
       If True, without stdout.
 
+    lazy : bool (optional, default == False)
+
+      If True, return a :class:`LazyStatePhys` (with a simulation object
+      created as with :func:`load_sim_for_plot`).
+
     """
 
+    if lazy:
+        path_file = _path_file_from_time_approx(name_dir, t_approx)
+        sim = load_sim_for_plot(
+            path_file.parent, merge_missing_params, hide_stdout
+        )
+        return LazyStatePhys(path_file, sim)
+
     params, Simul = load_for_restart(name_dir, t_approx, merge_missing_params)
 
     if modif_save_params:
@@ -324,6 +328,98 @@ def load_state_phys_file(
     return sim
 
 
+class LazyStatePhys:
+    """State of a simulation read lazily from a state_phys file
+
+    The file is opened once. The variables returned by :meth:`get_var` are
+    views on the file: memory-mapped arrays for contiguous datasets and h5py
+    datasets (read chunk by chunk on demand) otherwise, so that slicing
+    them reads only the needed data. The spectral form of a variable is
+    computed only by :meth:`get_var_fft` (with a full sequential operator
+    created on first use).
+
+    >>> state = load_state_phys_file(path_dir, lazy=True)
+    >>> b_slice = state.get_var("b")[:, 10, :]
+
+    """
+
+    def __init__(self, path_file, sim):
+        self.path_file = Path(path_file)
+        self.sim = sim
+        self.params = sim.params
+        self._oper = None
+        self._arrays = {}
+        self._arrays_fft = {}
+
+        self._h5file = h5py.File(self.path_file, "r")
+        group_state_phys = self._h5file["/state_phys"]
+        self.keys = [
+            key
+            for key, dset in group_state_phys.items()
+            # netCDF dimensions are stored as dimension scales
+            if dset.attrs.get("CLASS") != b"DIMENSION_SCALE"
+        ]
+        self.time = float(group_state_phys.attrs["time"])
+        self.it = int(group_state_phys.attrs["it"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the file (the memory-mapped arrays remain usable)"""
+        self._h5file.close()
+
+    def get_var(self, key):
+        """Get a variable as a memory-mapped array or a h5py dataset"""
+        try:
+            return self._arrays[key]
+        except KeyError:
+            pass
+
+        if key not in self.keys:
+            raise ValueError(f'"{key}" not in state_phys ({self.keys})')
+
+        dset = self._h5file["/state_phys"][key]
+        offset = dset.id.get_offset()
+        if offset is None or dset.chunks is not None:
+            # chunked or not allocated: read on demand through h5py
+            array = dset
+        else:
+            array = np.memmap(
+                self.path_file,
+                dtype=dset.dtype,
+                mode="r",
+                offset=offset,
+                shape=dset.shape,
+            )
+        self._arrays[key] = array
+        return array
+
+    @property
+    def oper(self):
+        """Full sequential operator (created on first use)"""
+        if self._oper is None:
+            params = _deepcopy(self.params)
+            params.ONLY_COARSE_OPER = False
+            Operators = self.sim.info_solver.import_classes()["Operators"]
+            self._oper = Operators(params=params)
+        return self._oper
+
+    def get_var_fft(self, key):
+        """Compute (once) the spectral form of a variable"""
+        try:
+            return self._arrays_fft[key]
+        except KeyError:
+            pass
+        field = np.ascontiguousarray(self.get_var(key)[...], dtype=np.float64)
+        field_fft = self.oper.fft(field)
+        self._arrays_fft[key] = field_fft
+        return field_fft
+
+
 def _path_file_from_time_approx(thing, t_approx):
     if thing is not None and Path(thing).is_file():
         path_file = Path(thing)
@@ -517,22 +613,85 @@ class StatePhysLike:
         return self.field2
 
 
+class StatePhysLikeDistributed(StatePhysLike):
+    """Like :class:`StatePhysLike` but for fields distributed with MPI
+
+    Each process reads only its local part of the input fields (collectively
+    with the mpio driver when possible).
+
+    """
+
+    def __init__(self, path_file, oper, oper2):
+        self.path_file = path_file
+        self.oper = oper
+        self.oper2 = oper2
+        self.info = "state_phys"
+
+        self.field = oper.create_arrayX()
+        self.field_spect = oper.create_arrayK()
+        self.field2 = oper2.create_arrayX()
+        self.field2_spect = oper2.create_arrayK(0)
+        self.fill_field_fft = FillFieldFFTDistributed(oper, oper2)
+
+        self.slices_loc = tuple(
+            slice(start, start + size)
+            for start, size in zip(oper.seq_indices_first_X, oper.shapeX_loc)
+        )
+
+        if path_file.suffix == ".nc":
+            self.h5pack = h5netcdf
+        else:
+            self.h5pack = h5py
+
+        with self.h5pack.File(self.path_file, "r") as h5file:
+            group_state_phys = h5file["/state_phys"]
+            self.keys = list(group_state_phys.keys())
+            self.time = float(group_state_phys.attrs["time"])
+            self.it = int(group_state_phys.attrs["it"])
+            self.name_run = h5file.attrs["name_run"]
+
+    def get_var(self, key):
+        mpi.printby0(f'get_var("{key}")', flush=True)
+        if mpi.nb_proc > 1 and self.h5pack is h5py and h5py.h5.get_config().mpi:
+            with h5py.File(
+                self.path_file, "r", driver="mpio", comm=mpi.comm
+            ) as h5file:
+                dset = h5file["/state_phys"][key]
+                with dset.collective:
+                    self.field[:] = dset[self.slices_loc]
+        else:
+            with self.h5pack.File(self.path_file, "r") as h5file:
+                self.field[:] = h5file["/state_phys"][key][self.slices_loc]
+
+        self.oper.fft_as_arg(self.field, self.field_spect)
+        self.fill_field_fft(self.field_spect, self.field2_spect)
+        self.oper2.ifft_as_arg(self.field2_spect, self.field2)
+        return self.field2
+
+
 def modif_resolution_from_dir_memory_efficient(
-    name_dir=None, t_approx="last", coef_modif_resol=2
+    name_dir=None, t_approx="last", coef_modif_resol=2, distributed=None
 ):
     """Save a file with a modified resolution.
 
     Faster and more memory efficient than ``modif_resolution_from_dir`` (but
     not plot).
 
+    With MPI (or if ``distributed`` is True), the solver operators are used
+    with distributed FFTs: each process reads, transforms and writes only
+    its part of the fields, so that the memory needed per process is
+    proportional to the size of the local arrays.
+
     """
     t_start = perf_counter()
 
-    if mpi.nb_proc > 1:
-        raise NotImplementedError
+    if distributed is None:
+        distributed = mpi.nb_proc > 1
+    elif not distributed and mpi.nb_proc > 1:
+        raise ValueError("distributed=False is not supported with MPI")
 
     path_file = _path_file_from_time_approx(name_dir, t_approx)
-    print(f"Changing resolution of the state contained in\n{path_file}")
+    mpi.printby0(f"Changing resolution of the state contained in\n{path_file}")
     path_dir = path_file.parent
 
     solver = _import_solver_from_path(path_dir)
@@ -568,18 +727,24 @@ def modif_resolution_from_dir_memory_efficient(
         shape = (params.oper.nz, params.oper.ny, params.oper.nx)
         shape2 = (nz2, ny2, nx2)
 
-    from .mini_oper_modif_resol import MiniOperModifResol
+    info2 = create_info_simul(info_solver, params2)
 
-    oper = MiniOperModifResol(shape)
-    print_memory_usage_seq(
-        'Memory usage after init operator "input": ', flush=True
-    )
-    oper2 = MiniOperModifResol(shape2)
+    if distributed:
+        Operators = info_solver.import_classes()["Operators"]
+        oper = Operators(params=params)
+        oper2 = Operators(params=params2)
+        state_phys = StatePhysLikeDistributed(path_file, oper, oper2)
+    else:
+        from .mini_oper_modif_resol import MiniOperModifResol
 
-    print_memory_usage_seq('Memory usage after init operator "output":')
-    info2 = create_info_simul(info_solver, params2)
+        oper = MiniOperModifResol(shape)
+        print_memory_usage_seq(
+            'Memory usage after init operator "input": ', flush=True
+        )
+        oper2 = MiniOperModifResol(shape2)
 
-    state_phys = StatePhysLike(path_file, oper, oper2)
+        print_memory_usage_seq('Memory usage after init operator "output":')
+        state_phys = StatePhysLike(path_file, oper, oper2)
 
     if dimension == 3:
         dir_new_new = f"State_phys_{nx2}x{ny2}x{nz2}"
@@ -588,7 +753,7 @@ def modif_resolution_from_dir_memory_efficient(
 
     path_file_out = path_file.parent / dir_new_new / path_file.name
     path_file_out.parent.mkdir(exist_ok=True)
-    print(f"Saving file {path_file_out.name}...", flush=True)
+    mpi.printby0(f"Saving file {path_file_out.name}...", flush=True)
     save_file(
         path_file_out,
         state_phys,
@@ -599,7 +764,7 @@ def modif_resolution_from_dir_memory_efficient(
         state_phys.it,
         particular_attr="modif_resolution",
     )
-    print(
+    mpi.printby0(
         f"File {path_file_out.name} saved in:\n{path_file_out.parent}\n"
         f"total duration: {timedelta(seconds=perf_counter() - t_start)}"
     )